@@ -0,0 +1,19 @@
+import os
+
+from simple_injection import ServiceCollection
+
+from src._types import Logger, DataManager
+from src.app import logger_factory, register_data_layer
+from src.data import SqlAlchemyDataManager
+from src.data.images import ImageVariantBackfiller
+
+# for logging and other DI switching
+os.environ["ENVIRONMENT"] = "TEST"
+
+logger = logger_factory()
+ioc = ServiceCollection()
+ioc.add_instance(Logger, logger)
+ioc.add_instance(DataManager, SqlAlchemyDataManager(logger=logger))
+register_data_layer(ioc)
+failed_keys = ioc.resolve(ImageVariantBackfiller).backfill()
+print(f"variants could not be rendered for {', '.join(failed_keys)}" if failed_keys else "every image has its variants")
@@ -0,0 +1,35 @@
+import dataclasses
+import timeit
+
+from src.crosscutting import AutoFixture, JsonSnakeToCamelSerializer, JsonCamelToSnakeCaseDeserializer, \
+    StandardJsonBackend, OrjsonBackend, camel_case_to_snake_case, snake_case_to_camel_case, orjson
+from src.web.views import BrandResponseDto
+
+ITEMS = 1000
+REPEAT = 5
+NUMBER = 20
+
+
+def measure(name: str, function):
+    best = min(timeit.repeat(function, repeat=REPEAT, number=NUMBER)) / NUMBER
+    print(f"{name:<48}{best * 1000:>10.3f} ms")
+
+
+def main():
+    body = [dataclasses.asdict(dto) for dto in AutoFixture().create_many(dto=BrandResponseDto, ammount=ITEMS)]
+    backends = [StandardJsonBackend()] + ([OrjsonBackend()] if orjson is not None else [])
+    keys = [snake_case_to_camel_case(key) for item in body for key in item.keys()]
+
+    print(f"{ITEMS} x {BrandResponseDto.__name__}")
+    measure("keys uncached", lambda: [camel_case_to_snake_case.__wrapped__(key) for key in keys])
+    measure("keys cached", lambda: [camel_case_to_snake_case(key) for key in keys])
+    for backend in backends:
+        serializer = JsonSnakeToCamelSerializer(backend=backend)
+        deserializer = JsonCamelToSnakeCaseDeserializer(backend=backend)
+        payload = serializer.serialize(body)
+        measure(f"serialize ({backend.name})", lambda: serializer.serialize(body))
+        measure(f"deserialize ({backend.name})", lambda: deserializer.deserialize(payload))
+
+
+if __name__ == "__main__":
+    main()
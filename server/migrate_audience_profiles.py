@@ -0,0 +1,18 @@
+import os
+
+from src.app import logger_factory
+from src.data import SqlAlchemyDataManager
+from src.data.entities import create_mappings, audience_profile_table
+from src.data.repositories import migrate_audience_rows_to_profiles
+
+# for logging and other DI switching
+os.environ["ENVIRONMENT"] = "TEST"
+
+logger = logger_factory()
+data_manager = SqlAlchemyDataManager(logger=logger)
+# only creates the audience_profile table when it is missing
+audience_profile_table.create(bind=data_manager.engine, checkfirst=True)
+create_mappings(logger=logger)
+migrated = migrate_audience_rows_to_profiles(session=data_manager.session)
+data_manager.session.commit()
+print(f"{migrated} audience profiles migrated, set AUDIENCE_STORAGE=columns to read and write them")
@@ -0,0 +1,25 @@
+import os
+
+from src.app import logger_factory, claims_cache, aws_client_factory
+from src.data import SqlAlchemyDataManager
+from src.data.entities import add_missing_columns, brand_table, influencer_table, USER_CLAIM_COLUMNS, create_mappings
+from src.data.repositories import CognitoAuthUserRepository, CognitoAuthService, backfill_user_claims
+
+# for logging and other DI switching
+os.environ["ENVIRONMENT"] = "TEST"
+
+logger = logger_factory()
+data_manager = SqlAlchemyDataManager(logger=logger)
+added = [*add_missing_columns(engine=data_manager.engine, table=brand_table, column_names=USER_CLAIM_COLUMNS),
+         *add_missing_columns(engine=data_manager.engine, table=influencer_table, column_names=USER_CLAIM_COLUMNS)]
+print(f"added {', '.join(added)}" if added else "user claim columns already present")
+
+# rows written before the columns existed would otherwise fall back to cognito on every read
+create_mappings(logger=logger)
+auth_user_repository = CognitoAuthUserRepository(auth_service=CognitoAuthService(logger=logger,
+                                                                                 client_factory=aws_client_factory),
+                                                 claims_cache=claims_cache,
+                                                 logger=logger)
+backfilled = backfill_user_claims(session=data_manager.session, auth_user_repository=auth_user_repository)
+data_manager.session.commit()
+print(f"{backfilled} users backfilled with their cognito claims")
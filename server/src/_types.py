@@ -1,7 +1,8 @@
-from typing import Protocol, Optional, Union
+from datetime import datetime
+from typing import Protocol, Optional, Union, Iterator
 
 from src.domain.models import Brand, Influencer, Listing, User, Notification, Collaboration, AudienceAgeSplit, \
-    AudienceGenderSplit, BrandListing, InfluencerListing
+    AudienceGenderSplit, BrandListing, InfluencerListing, ImageUpload
 
 
 class AuthUserRepository(Protocol):
@@ -15,6 +16,21 @@ class AuthUserRepository(Protocol):
     def get_by_id(self, _id: str) -> User:
         ...
 
+    def get_by_ids(self, ids: list[str]) -> dict[str, User]:
+        ...
+
+
+class ClaimsCache(Protocol):
+
+    def get(self, key: str) -> Optional[User]:
+        ...
+
+    def set(self, key: str, value: User) -> None:
+        ...
+
+    def invalidate(self, key: str) -> None:
+        ...
+
 
 class AudienceAgeRepository(Protocol):
 
@@ -27,6 +43,11 @@ class AudienceAgeRepository(Protocol):
                             auth_user_id: str) -> AudienceAgeSplit:
         ...
 
+    def save_for_influencer(self,
+                            payload: AudienceAgeSplit,
+                            auth_user_id: str) -> AudienceAgeSplit:
+        ...
+
     def save(self):
         ...
 
@@ -42,6 +63,11 @@ class AudienceGenderRepository(Protocol):
                             auth_user_id: str) -> AudienceGenderSplit:
         ...
 
+    def save_for_influencer(self,
+                            payload: AudienceGenderSplit,
+                            auth_user_id: str) -> AudienceGenderSplit:
+        ...
+
     def save(self):
         ...
 
@@ -192,12 +218,36 @@ class DataManager(Protocol):
     def session(self) -> SessionAdapter:
         ...
 
+    def remove_session(self):
+        ...
+
 
 class ImageRepository(Protocol):
 
     def upload(self, path: str, image_base64_encoded: str) -> str:
         pass
 
+    def create_upload(self, path: str, content_type: str, content_length: int) -> ImageUpload:
+        pass
+
+    def create_variants(self, key: str) -> dict[str, str]:
+        pass
+
+    def list_keys(self, modified_before: datetime) -> list[str]:
+        pass
+
+    def delete(self, keys: list[str]) -> None:
+        pass
+
+    def exists(self, key: str) -> bool:
+        pass
+
+
+class ImageReferenceRepository(Protocol):
+
+    def load_referenced_keys(self) -> set[str]:
+        ...
+
 
 UserModel = Union[Brand, Influencer]
 
@@ -215,12 +265,18 @@ class Serializer(Protocol):
     def serialize(self, data: Union[dict, list]) -> str:
         ...
 
+    def serialize_chunks(self, data: Union[dict, list]) -> Iterator[str]:
+        ...
+
 
 class Deserializer(Protocol):
 
     def deserialize(self, data: str) -> Union[dict, list]:
         ...
 
+    def deserialize_fields(self, data: str, to: type) -> dict:
+        ...
+
 
 class Logger(Protocol):
 
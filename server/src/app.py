@@ -1,3 +1,4 @@
+import dataclasses
 import os
 
 from simple_injection import ServiceCollection
@@ -5,16 +6,23 @@ from simple_injection import ServiceCollection
 from src import ServiceLocator
 from src._types import DataManager, BrandRepository, InfluencerRepository, ListingRepository, ImageRepository, \
     Deserializer, Serializer, AuthUserRepository, Logger, NotificationRepository, AudienceAgeRepository, \
-    AudienceGenderRepository, BrandListingRepository, CollaborationRepository, InfluencerListingRepository
+    AudienceGenderRepository, BrandListingRepository, CollaborationRepository, InfluencerListingRepository, \
+    ClaimsCache, ImageReferenceRepository
 from src.crosscutting import JsonCamelToSnakeCaseDeserializer, JsonSnakeToCamelSerializer, \
-    PinfluencerObjectMapper, FlexiUpdater, ConsoleLogger, DummyLogger
+    PinfluencerObjectMapper, FlexiUpdater, ConsoleLogger, DummyLogger, TimedLruCache, server_timing, \
+    warm_key_caches
 from src.data import SqlAlchemyDataManager
+from src.data.aws import AwsClientFactory
+from src.data.images import ImageVariantRenderer, ImageGarbageCollector, ImageVariantBackfiller
 from src.data.repositories import SqlAlchemyBrandRepository, SqlAlchemyInfluencerRepository, \
     SqlAlchemyListingRepository, S3ImageRepository, CognitoAuthUserRepository, CognitoAuthService, \
-    SqlAlchemyNotificationRepository, SqlAlchemyAudienceAgeRepository, SqlAlchemyAudienceGenderRepository, \
-    SqlAlchemyBrandListingRepository, SqlAlchemyCollaborationRepository, SqlAlchemyInfluencerListingRepository
-from src.domain.validation import BrandValidator, ListingValidator, InfluencerValidator
-from src.web import PinfluencerResponse, PinfluencerContext, Route
+    SqlAlchemyNotificationRepository, SqlAlchemyBrandListingRepository, SqlAlchemyCollaborationRepository, \
+    SqlAlchemyInfluencerListingRepository, SqlAlchemyImageReferenceRepository, audience_repositories
+from src.domain.validation import BrandValidator, ListingValidator, InfluencerValidator, ImageUploadValidator, \
+    BatchValidator
+from src.web import PinfluencerResponse, PinfluencerContext, Route, server_timing_requested, requested_fields, \
+    views
+from src.web.compression import accepted_encodings
 from src.web.controllers import BrandController, InfluencerController, ListingController, NotificationController, \
     AudienceAgeController, AudienceGenderController, BrandListingController, CollaborationController, \
     InfluencerListingController
@@ -24,8 +32,9 @@ from src.web.hooks import HooksFacade, CommonBeforeHooks, BrandAfterHooks, Influ
     AudienceAgeAfterHooks, AudienceGenderAfterHooks, AudienceGenderBeforeHooks, InfluencerOnBoardingAfterHooks, \
     CollaborationBeforeHooks, CollaborationAfterHooks
 from src.web.mapping import MappingRules
+from src.web.metrics import PipelineMetrics
 from src.web.middleware import MiddlewarePipeline
-from src.web.routing import Dispatcher
+from src.web.routing import Dispatcher, resolve_route, BatchDispatcher, BatchSequenceBuilder
 from src.web.sequences import PreGenericUpdateCreateSubsequenceBuilder, PreUpdateCreateListingSubsequenceBuilder, \
     PostSingleUserSubsequenceBuilder, \
     PostMultipleUserSubsequenceBuilder, UpdateImageForListingSequenceBuilder, NotImplementedSequenceBuilder, \
@@ -39,18 +48,48 @@ from src.web.sequences import PreGenericUpdateCreateSubsequenceBuilder, PreUpdat
     GetAudienceGenderSequenceBuilder, UpdateAudienceGenderSequenceBuilder, CreateInfluencerProfileSequenceBuilder, \
     UpdateInfluencerProfileSequenceBuilder, GetInfluencerProfileSequenceBuilder, \
     GetBrandListingsForBrandSequenceBuilder, CreateCollaborationForInfluencerSequenceBuilder, \
-    GetListingsForInfluencerSequenceBuilder
+    GetListingsForInfluencerSequenceBuilder, CreateImageUploadForListingSequenceBuilder, \
+    ConfirmImageUploadForListingSequenceBuilder, CreateInfluencerImageUploadSequenceBuilder, \
+    ConfirmInfluencerImageUploadSequenceBuilder, CreateBrandImageUploadSequenceBuilder, \
+    ConfirmBrandImageUploadSequenceBuilder
+
+CLAIMS_CACHE_TTL_SECONDS = 300
+CLAIMS_CACHE_MAX_SIZE = 1024
+
+# lives for the lifetime of the lambda container so cognito lookups are shared across invocations
+claims_cache = TimedLruCache(ttl_seconds=CLAIMS_CACHE_TTL_SECONDS,
+                             max_size=CLAIMS_CACHE_MAX_SIZE)
+
+# lives for the lifetime of the lambda container so aws clients and their connection pools are built once
+aws_client_factory = AwsClientFactory()
+
+# dto keys are translated once per container instead of on every request
+warm_key_caches(dtos=[dto for dto in vars(views).values() if isinstance(dto, type) and dataclasses.is_dataclass(dto)])
 
 
 def lambda_handler(event, context):
+    data_manager = SqlAlchemyDataManager(logger=logger_factory())
     return bootstrap(event=event,
                      context=context,
 
                      # infra for testability
-                     middleware=MiddlewarePipeline(logger=logger_factory()),
+                     middleware=MiddlewarePipeline(logger=logger_factory(),
+                                                   metrics=metrics_factory(),
+                                                   data_manager=data_manager),
                      ioc=ServiceCollection(),
-                     data_manager=SqlAlchemyDataManager(logger=logger_factory()),
-                     cognito_auth_service=CognitoAuthService(logger=logger_factory()))
+                     data_manager=data_manager,
+                     cognito_auth_service=CognitoAuthService(logger=logger_factory(),
+                                                             client_factory=aws_client_factory))
+
+
+def image_garbage_collection_handler(event, context):
+    ioc = ServiceCollection()
+    ioc.add_instance(Logger, logger_factory())
+    ioc.add_instance(DataManager, SqlAlchemyDataManager(logger=logger_factory()))
+    register_data_layer(ioc)
+    deleted_keys = ioc.resolve(ImageGarbageCollector).collect()
+    logger_factory().log_debug(f"deleted {len(deleted_keys)} images")
+    return {"deleted": len(deleted_keys)}
 
 
 def logger_factory():
@@ -60,12 +99,20 @@ def logger_factory():
     return ConsoleLogger()
 
 
+def metrics_factory():
+    if "ENVIRONMENT" in os.environ:
+        if os.environ["ENVIRONMENT"] == "TEST":
+            return PipelineMetrics(sink=lambda record: None)
+    return PipelineMetrics()
+
+
 def bootstrap(event: dict,
               context: dict,
               middleware: MiddlewarePipeline,
               ioc: ServiceCollection,
               data_manager: DataManager,
               cognito_auth_service: CognitoAuthService) -> dict:
+    server_timing.begin(enabled=server_timing_requested(event=event))
     try:
         register_dependencies(cognito_auth_service,
                               data_manager,
@@ -78,7 +125,7 @@ def bootstrap(event: dict,
 
         # dispatch route to function
         dispatcher = ioc.resolve(Dispatcher)
-        route = event['routeKey']
+        route = resolve_route(event=event)
         logger_factory().log_debug(f'Route: {route}')
         logger_factory().log_trace(f'Event: {event}')
         routes = dispatcher.dispatch_route_to_ctr
@@ -93,7 +140,8 @@ def bootstrap(event: dict,
                                                      event=event,
                                                      body={},
                                                      auth_user_id="",
-                                                     route_key=route)
+                                                     route_key=route,
+                                                     fields=requested_fields(event=event))
             route_desc: Route = routes[route]
 
             # middleware execution
@@ -102,9 +150,14 @@ def bootstrap(event: dict,
     except Exception as e:
         logger_factory().log_error(str(e))
         response = PinfluencerResponse.as_500_error()
+    middleware.emit_metrics()
     logger_factory().log_debug(f"status: {response.status_code}")
     logger_factory().log_trace(f"output body: {response.body}")
-    return response.as_json(serializer=ioc.resolve(Serializer))
+    try:
+        return response.as_json(serializer=ioc.resolve(Serializer), accept_encoding=accepted_encodings(event=event))
+    finally:
+        # closes the main thread's session so its connection goes back to the pool with the response
+        data_manager.remove_session()
 
 
 def register_dependencies(cognito_auth_service, data_manager, ioc, middleware):
@@ -152,6 +205,7 @@ def register_middleware(ioc):
 
 
 def register_auth(ioc):
+    ioc.add_instance(ClaimsCache, claims_cache)
     ioc.add_singleton(AuthUserRepository, CognitoAuthUserRepository)
 
 
@@ -170,6 +224,7 @@ def register_controllers(ioc):
     ioc.add_singleton(BrandListingController)
     ioc.add_singleton(InfluencerListingController)
     ioc.add_singleton(CollaborationController)
+    ioc.add_singleton(BatchDispatcher)
 
 
 def register_object_mapping(ioc):
@@ -181,22 +236,31 @@ def register_domain(ioc):
     ioc.add_singleton(BrandValidator)
     ioc.add_singleton(ListingValidator)
     ioc.add_singleton(InfluencerValidator)
+    ioc.add_singleton(ImageUploadValidator)
+    ioc.add_singleton(BatchValidator)
 
 
 def register_data_layer(ioc):
+    ioc.add_instance(AwsClientFactory, aws_client_factory)
+
     # sql alchemy
     ioc.add_singleton(BrandRepository, SqlAlchemyBrandRepository)
     ioc.add_singleton(InfluencerRepository, SqlAlchemyInfluencerRepository)
     ioc.add_singleton(ListingRepository, SqlAlchemyListingRepository)
     ioc.add_singleton(NotificationRepository, SqlAlchemyNotificationRepository)
-    ioc.add_singleton(AudienceAgeRepository, SqlAlchemyAudienceAgeRepository)
-    ioc.add_singleton(AudienceGenderRepository, SqlAlchemyAudienceGenderRepository)
+    (audience_age_repository, audience_gender_repository) = audience_repositories()
+    ioc.add_singleton(AudienceAgeRepository, audience_age_repository)
+    ioc.add_singleton(AudienceGenderRepository, audience_gender_repository)
     ioc.add_singleton(BrandListingRepository, SqlAlchemyBrandListingRepository)
     ioc.add_singleton(InfluencerListingRepository, SqlAlchemyInfluencerListingRepository)
     ioc.add_singleton(CollaborationRepository, SqlAlchemyCollaborationRepository)
 
     # s3
+    ioc.add_singleton(ImageVariantRenderer)
     ioc.add_singleton(ImageRepository, S3ImageRepository)
+    ioc.add_singleton(ImageReferenceRepository, SqlAlchemyImageReferenceRepository)
+    ioc.add_singleton(ImageGarbageCollector)
+    ioc.add_singleton(ImageVariantBackfiller)
 
 
 def register_sequences(ioc: ServiceCollection):
@@ -204,19 +268,26 @@ def register_sequences(ioc: ServiceCollection):
     ioc.add_singleton(PreGenericUpdateCreateSubsequenceBuilder)
     ioc.add_singleton(PostSingleUserSubsequenceBuilder)
     ioc.add_singleton(PostMultipleUserSubsequenceBuilder)
+    ioc.add_singleton(BatchSequenceBuilder)
     ioc.add_singleton(UpdateImageForListingSequenceBuilder)
+    ioc.add_singleton(CreateImageUploadForListingSequenceBuilder)
+    ioc.add_singleton(ConfirmImageUploadForListingSequenceBuilder)
     ioc.add_singleton(NotImplementedSequenceBuilder)
     ioc.add_singleton(UpdateListingSequenceBuilder)
     ioc.add_singleton(CreateListingSequenceBuilder)
     ioc.add_singleton(GetListingByIdSequenceBuilder)
     ioc.add_singleton(GetListingsForBrandSequenceBuilder)
     ioc.add_singleton(UpdateInfluencerImageSequenceBuilder)
+    ioc.add_singleton(CreateInfluencerImageUploadSequenceBuilder)
+    ioc.add_singleton(ConfirmInfluencerImageUploadSequenceBuilder)
     ioc.add_singleton(UpdateInfluencerSequenceBuilder)
     ioc.add_singleton(CreateInfluencerSequenceBuilder)
     ioc.add_singleton(GetAuthInfluencerSequenceBuilder)
     ioc.add_singleton(GetInfluencerByIdSequenceBuilder)
     ioc.add_singleton(GetAllInfluencersSequenceBuilder)
     ioc.add_singleton(UpdateBrandImageSequenceBuilder)
+    ioc.add_singleton(CreateBrandImageUploadSequenceBuilder)
+    ioc.add_singleton(ConfirmBrandImageUploadSequenceBuilder)
     ioc.add_singleton(UpdateBrandSequenceBuilder)
     ioc.add_singleton(CreateBrandSequenceBuilder)
     ioc.add_singleton(GetAuthBrandSequenceBuilder)
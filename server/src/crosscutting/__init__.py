@@ -1,20 +1,103 @@
+import dataclasses
 import datetime
 import inspect
 import json
+import os
 import random
 import re
+import threading
+import time
+import types
 import typing
 import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
 from dataclasses import dataclass
+from functools import wraps, lru_cache
 from enum import Enum
+from types import MappingProxyType, CodeType
 from typing import Union
 
 from src._types import Logger
-from src.exceptions import AutoFixtureException, AutoMapperException
+from src.domain.models import DataModel
+from src.exceptions import AutoFixtureException, AutoMapperException, RequestDecodeException
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 T = typing.TypeVar("T")
 
 
+class ServerTiming:
+
+    def __init__(self, clock: typing.Callable[[], float] = time.perf_counter):
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__local = threading.local()
+        self.__durations: dict[str, float] = {}
+        self.__started = clock()
+        self.__enabled = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.__enabled
+
+    def begin(self, enabled: bool):
+        with self.__lock:
+            self.__durations = {}
+            self.__started = self.__clock()
+            self.__enabled = enabled
+
+    def now(self) -> float:
+        return self.__clock()
+
+    def add(self, phase: str, started: float):
+        milliseconds = (self.__clock() - started) * 1000
+        with self.__lock:
+            self.__durations[phase] = self.__durations.get(phase, 0.0) + milliseconds
+
+    @contextmanager
+    def measure(self, phase: str):
+        depth = getattr(self.__local, "depth", None)
+        if depth is None:
+            depth = self.__local.depth = {}
+        # only the outermost call is measured so recursive mapping is not counted twice
+        if not self.__enabled or depth.get(phase, 0):
+            yield
+            return
+        depth[phase] = 1
+        started = self.__clock()
+        try:
+            yield
+        finally:
+            depth[phase] = 0
+            self.add(phase=phase, started=started)
+
+    def header(self) -> str:
+        with self.__lock:
+            durations = list(self.__durations.items())
+        durations.append(("total", (self.__clock() - self.__started) * 1000))
+        return ", ".join(f"{phase};dur={milliseconds:.1f}" for (phase, milliseconds) in durations)
+
+
+# one invocation runs at a time per lambda container, so the timings are reset by bootstrap for every request
+server_timing = ServerTiming()
+
+
+def timed(phase: str):
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with server_timing.measure(phase=phase):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
 @dataclass(unsafe_hash=True)
 class Rule:
     to: type = None
@@ -24,6 +107,98 @@ class Rule:
     expression: typing.Callable[[typing.Any, typing.Any], None] = None
 
 
+MAPPING_COPY = "copy"
+MAPPING_RULE = "rule"
+MAPPING_NESTED = "nested"
+MAPPING_LIST = "list"
+
+
+@dataclass(frozen=True)
+class MappingStep:
+    kind: str = MAPPING_COPY
+    to: type = None
+    expression: typing.Callable[[typing.Any, typing.Any], None] = None
+
+
+@lru_cache(maxsize=None)
+def target_mapping_steps(to: type) -> typing.Mapping[str, MappingStep]:
+    # depends only on the annotations of the target, so it is shared by every mapper and outlives the container
+    steps = {}
+    for (property, annotation) in all_annotations(to).items():
+        if bool(typing.get_type_hints(annotation)):
+            steps[property] = MappingStep(kind=MAPPING_NESTED, to=annotation)
+        elif (typing.get_origin(annotation) is list and
+              bool(typing.get_type_hints(typing.get_args(annotation)[0]))):
+            steps[property] = MappingStep(kind=MAPPING_LIST, to=typing.get_args(annotation)[0])
+        else:
+            steps[property] = MappingStep(kind=MAPPING_COPY)
+    return MappingProxyType(steps)
+
+
+def mapping_step_source(property: str, step: MappingStep) -> list[str]:
+    if step.kind == MAPPING_COPY:
+        return [f"dto_values[{property!r}] = values[{property!r}]"]
+    lines = [f"if fields is None or {property!r} in fields:",
+             f"    nested_fields = fields.get({property!r}) if fields else None"]
+    if step.kind == MAPPING_NESTED:
+        return lines + [f"    new_dto.{property} = map_callback(mapper.map(_from=values[{property!r}], "
+                        f"to=type_{property}, fields=nested_fields))"]
+    return lines + [f"    new_dto.{property} = [map_callback(mapper.map(_from=item, to=type_{property}, "
+                    f"fields=nested_fields)) for item in values[{property!r}]]"]
+
+
+@lru_cache(maxsize=None)
+def mapping_function_code(_from: type, to: type, rule_fields: tuple[str, ...]) -> tuple[str, CodeType]:
+    # straight line equivalent of running the generic plan, properties in the order vars() yields them
+    steps = target_mapping_steps(to)
+    source_order = [f.name for f in dataclasses.fields(_from)] if dataclasses.is_dataclass(_from) \
+        else list(all_annotations(_from))
+    properties = [property for property in [*source_order, *steps, *rule_fields]
+                  if property in steps or property in rule_fields]
+    properties = list(dict.fromkeys(properties))
+    if not all(property.isidentifier() for property in properties):
+        raise AutoMapperException()
+    function_name = f"map_{_from.__name__}_to_{to.__name__}"
+    lines = [f"def {function_name}(_from, map_callback, fields):",
+             "    new_dto = to()",
+             "    dto_values = new_dto.__dict__",
+             "    values = _from.__dict__"]
+    for property in properties:
+        if property in rule_fields:
+            lines += [f"    if values.get({property!r}) is not None:",
+                      "        try:",
+                      f"            rule_{property}(new_dto, _from)",
+                      "        except IndexError:"]
+            fallback = [f"            {line}" for line in mapping_step_source(property=property,
+                                                                               step=steps[property])] \
+                if property in steps else ["            pass"]
+            lines += fallback
+        else:
+            lines += [f"    if {property!r} in values:"]
+            lines += [f"        {line}" for line in mapping_step_source(property=property, step=steps[property])]
+    lines += ["    return map_callback(new_dto)"]
+    return function_name, compile("\n".join(lines), f"<{function_name}>", "exec")
+
+
+def identity(value):
+    return value
+
+
+def as_dict(value):
+    return value.__dict__
+
+
+def slotted(cls: type) -> type:
+    # dataclass(slots=True) for python 3.9, the class is rebuilt with a slot per field and without the class
+    # attributes holding the defaults, the generated __init__ already carries them
+    field_names = tuple(dto_field.name for dto_field in dataclasses.fields(cls))
+    namespace = dict(cls.__dict__)
+    for name in [*field_names, "__dict__", "__weakref__"]:
+        namespace.pop(name, None)
+    namespace["__slots__"] = field_names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
 def fullname(o):
     klass = o.__class__
     module = klass.__module__
@@ -37,22 +212,50 @@ class PinfluencerObjectMapper:
     def __init__(self, logger: Logger):
         self.__logger = logger
         self.__maps: list[Rule] = []
+        self.__rule_table: dict[tuple[type, type], dict[str, Rule]] = {}
+        self.__plans: dict[tuple[type, type], typing.Mapping[str, MappingStep]] = {}
+        self.__compiled: dict[tuple[type, type], typing.Callable] = {}
 
     @property
     def rules(self) -> list[Rule]:
         return self.__maps
 
+    def rule_for(self, _type_from: type, _type_to: type, field: str) -> typing.Optional[Rule]:
+        return self.__rule_table.get((_type_from, _type_to), {}).get(field)
+
+    @property
+    def compiled_pairs(self) -> list[tuple[type, type]]:
+        return list(self.__compiled)
+
+    def compile(self, _type_from: type, _type_to: type):
+        # generates a specialised function for a hot pair, map calls for the pair then use it transparently
+        rules = self.__rule_table.get((_type_from, _type_to), {})
+        (function_name, code) = mapping_function_code(_type_from, _type_to, tuple(sorted(rules)))
+        bindings = {"to": _type_to,
+                    "mapper": self,
+                    **{f"rule_{field}": rule.expression for (field, rule) in rules.items()},
+                    **{f"type_{property}": step.to for (property, step) in target_mapping_steps(_type_to).items()
+                       if step.kind in [MAPPING_NESTED, MAPPING_LIST]}}
+        exec(code, bindings)
+        self.__compiled[(_type_from, _type_to)] = bindings[function_name]
+
     def add_rule(self,
                  _type_from: type,
                  _type_to: type,
                  field: str,
                  expression: typing.Callable[[typing.Any, typing.Any], None],
                  update=False):
-        self.__maps.append(Rule(to=_type_to,
-                                _from=_type_from,
-                                field=field,
-                                expression=expression,
-                                update=update))
+        rule = Rule(to=_type_to,
+                    _from=_type_from,
+                    field=field,
+                    expression=expression,
+                    update=update)
+        self.__maps.append(rule)
+        # the first rule added for a field wins
+        self.__rule_table.setdefault((_type_from, _type_to), {}).setdefault(field, rule)
+        self.__plans.pop((_type_from, _type_to), None)
+        if (_type_from, _type_to) in self.__compiled:
+            self.compile(_type_from=_type_from, _type_to=_type_to)
 
     def add_rules(self,
                   _type_from: list[type],
@@ -73,11 +276,10 @@ class PinfluencerObjectMapper:
                           field=single_field,
                           expression=expression)
 
+    @timed(phase="mapping")
     def map_to_dict_and_ignore_none_fields(self, _from, to: typing.Type[T]) -> dict:
         self.__logger.log_trace(f"{vars(_from).items()}")
-        mapped = self.__generic_map(_from=_from,
-                                    to=to,
-                                    propValues=vars(_from).items())
+        mapped = self.__map_object(_from=_from, to=to)
         new_dict = mapped.__dict__
         self.__to_dict_and_ignore_none_fields(new_dict=new_dict, mapped=mapped)
         return new_dict
@@ -94,53 +296,79 @@ class PinfluencerObjectMapper:
             if value is None:
                 new_dict.pop(property)
 
-    def map(self, _from, to: typing.Type[T]) -> T:
+    @timed(phase="mapping")
+    def map(self, _from, to: typing.Type[T], fields: dict = None) -> T:
         self.__logger.log_trace(f"{vars(_from).items()}")
-        return self.__generic_map(_from=_from,
-                                  to=to,
-                                  propValues=vars(_from).items())
+        return self.__map_object(_from=_from, to=to, fields=fields)
 
+    @timed(phase="mapping")
     def map_from_dict(self, _from, to: typing.Type[T]) -> T:
         self.__logger.log_trace(_from.items())
         return self.__generic_map(_from=_from,
                                   to=to,
                                   propValues=_from.items())
 
-    def map_to_dict(self, _from, to: typing.Type[T]) -> dict:
+    @timed(phase="mapping")
+    def map_to_dict(self, _from, to: typing.Type[T], fields: dict = None) -> dict:
         self.__logger.log_trace(f"{vars(_from).items()}")
+        return self.__map_object(_from=_from, to=to, map_callback=as_dict, fields=fields)
+
+    def __map_object(self, _from, to, map_callback=identity, fields: dict = None):
+        compiled = self.__compiled.get((type(_from), to))
+        if compiled is not None:
+            return compiled(_from, map_callback, fields)
         return self.__generic_map(_from=_from,
                                   to=to,
                                   propValues=vars(_from).items(),
-                                  map_callback=lambda x: x.__dict__)
-
-    def __generic_map(self, _from, to, propValues, map_callback=lambda x: x):
+                                  map_callback=map_callback,
+                                  fields=fields)
+
+    def plan(self, _type_from: type, _type_to: type) -> typing.Mapping[str, MappingStep]:
+        return self.__plan(_from=_type_from, to=_type_to)
+
+    def __plan(self, _from: type, to: type) -> typing.Mapping[str, MappingStep]:
+        plan = self.__plans.get((_from, to))
+        if plan is None:
+            rules = self.__rule_table.get((_from, to), {})
+            plan = {**target_mapping_steps(to),
+                    **{field: MappingStep(kind=MAPPING_RULE, expression=rule.expression)
+                       for (field, rule) in rules.items()}}
+            self.__plans[(_from, to)] = plan
+        return plan
+
+    def __generic_map(self, _from, to, propValues, map_callback=identity, fields: dict = None):
         new_dto = to()
-        dict_to = all_annotations(to)
+        plan = self.__plan(_from=type(_from), to=to)
         self.__logger.log_trace("START MAPPING")
-        self.__logger.log_trace(f"all annotations from DTO {dict_to}")
         self.__logger.log_trace(f"all props from _from {propValues}")
         for property, value in propValues:
-            try:
-                rule_match = \
-                    list(filter(lambda x:
-                                x._from == type(_from) and
-                                x.to == to and
-                                x.field == property, self.__maps))[0]
-                if value is not None:
-                    rule_match.expression(new_dto, _from)
-            except IndexError:
-                if property in dict_to:
-                    if bool(typing.get_type_hints(dict_to[property])):
-                        setattr(new_dto, property, map_callback(self.map(_from=value, to=dict_to[property])))
-                    elif (typing.get_origin(dict_to[property]) is list and
-                         (bool(typing.get_type_hints(typing.get_args(dict_to[property])[0])))):
-                        collection = []
-                        sub_item_to = typing.get_args(dict_to[property])[0]
-                        for item in value:
-                            collection.append(map_callback(self.map(_from=item, to=sub_item_to)))
-                        setattr(new_dto, property, collection)
-                    else:
-                        new_dto.__dict__[property] = value
+            step = plan.get(property)
+            if step is None:
+                continue
+            if step.kind == MAPPING_RULE:
+                if value is None:
+                    continue
+                try:
+                    step.expression(new_dto, _from)
+                    continue
+                except IndexError:
+                    # rules that find nothing to map fall back to the default mapping of the property
+                    step = target_mapping_steps(to).get(property)
+                    if step is None:
+                        continue
+            if step.kind == MAPPING_COPY:
+                new_dto.__dict__[property] = value
+            elif fields is not None and property not in fields:
+                # unrequested nested dtos are never mapped, scalars are kept as after hooks may still read them
+                continue
+            elif step.kind == MAPPING_NESTED:
+                setattr(new_dto, property, map_callback(self.map(_from=value,
+                                                                 to=step.to,
+                                                                 fields=fields.get(property) if fields else None)))
+            else:
+                nested_fields = fields.get(property) if fields else None
+                setattr(new_dto, property, [map_callback(self.map(_from=item, to=step.to, fields=nested_fields))
+                                            for item in value])
         self.__logger.log_trace(f"__generic_map from {type(_from)} {to} and mapped {_from} out -> {new_dto}")
         return map_callback(new_dto)
 
@@ -194,33 +422,81 @@ class ConsoleLogger:
         self.__log(_type="TRACE", message=message)
 
 
+# children are matched on what they hold, not on the identity columns every row gets
+CHILD_IDENTITY_FIELDS = frozenset(f.name for f in dataclasses.fields(DataModel))
+
+
+def child_content(child) -> typing.Any:
+    if not dataclasses.is_dataclass(child):
+        return child
+    return type(child), tuple(getattr(child, f.name) for f in dataclasses.fields(child)
+                              if f.name not in CHILD_IDENTITY_FIELDS)
+
+
+def fingerprint(value) -> typing.Any:
+    if isinstance(value, list):
+        return tuple(child_content(child) for child in value)
+    return value
+
+
 class FlexiUpdater:
 
     def __init__(self, mapper: PinfluencerObjectMapper):
         self.__mapper = mapper
 
-    def update(self, request, object_to_update):
-        values = list(vars(object_to_update).items())
-        for key, value in values:
-            try:
-                try:
-                    matching_rule = list(filter(lambda x:
-                                                x._from == type(request) and
-                                                x.to == type(object_to_update) and
-                                                x.field == key, self.__mapper.rules))[0]
-
+    def update(self, request, object_to_update) -> bool:
+        # rules run against a scratch copy so only what actually changed is written back to the entity,
+        # returns whether anything changed
+        snapshot = {key: value for (key, value) in vars(object_to_update).items() if not key.startswith("_sa_")}
+        fingerprints = {key: fingerprint(value) for (key, value) in snapshot.items() if isinstance(value, list)}
+        scratch = types.SimpleNamespace(**snapshot)
+        for key in snapshot:
+            matching_rule = self.__mapper.rule_for(_type_from=type(request),
+                                                   _type_to=type(object_to_update),
+                                                   field=key)
+            if matching_rule is not None:
+                value_in_request = getattr(request, key, None)
+                if value_in_request is not None or not hasattr(request, key):
                     try:
-                        value_in_request = getattr(request, key)
-                        if value_in_request is not None:
-                            matching_rule.expression(object_to_update, request)
+                        matching_rule.expression(scratch, request)
                     except AttributeError:
-                        matching_rule.expression(object_to_update, request)
-                except IndexError:
-                    value_in_request = getattr(request, key)
-                    if value_in_request is not None:
-                        setattr(object_to_update, key, getattr(request, key))
-            except AttributeError:
-                ...
+                        ...
+                continue
+            value_in_request = getattr(request, key, None)
+            if value_in_request is not None:
+                setattr(scratch, key, value_in_request)
+        changed = False
+        for (key, value) in vars(scratch).items():
+            original = snapshot.get(key)
+            if key in snapshot and value is original:
+                # mutated in place by a rule
+                changed = changed or (key in fingerprints and fingerprint(value) != fingerprints[key])
+            elif isinstance(value, list) and isinstance(original, list):
+                changed = self.__update_collection(collection=original, desired=value) or changed
+            elif key not in snapshot or value != original:
+                setattr(object_to_update, key, value)
+                changed = True
+        return changed
+
+    @staticmethod
+    def __update_collection(collection: list, desired: list) -> bool:
+        # children that are still wanted are kept, so delete-orphan cascades only delete and insert the difference
+        remaining = list(collection)
+        kept = []
+        added = False
+        for child in desired:
+            match = next((existing for existing in remaining if child_content(existing) == child_content(child)),
+                         None)
+            if match is None:
+                kept.append(child)
+                added = True
+            else:
+                remaining.remove(match)
+                kept.append(match)
+        if not added and not remaining:
+            return False
+        collection[:] = kept
+        return True
 
 
 class AutoFixture:
@@ -508,46 +784,240 @@ def all_annotations(cls):
     return d
 
 
-class JsonSnakeToCamelSerializer:
+JSON_BACKEND_ENVIRONMENT_VARIABLE = "JSON_BACKEND"
 
-    def serialize(self, data: Union[dict, list]) -> str:
-        return json.dumps(self.__snake_case_to_camel_case_dict(d=data), default=str)
+# keys come from the dto fields, the bound only stops arbitrary client keys from growing the caches forever
+KEY_CACHE_SIZE = 4096
 
-    def __snake_case_to_camel_case_dict(self, d):
-        if isinstance(d, list):
-            return [self.__snake_case_to_camel_case_dict(i) if isinstance(i, (dict, list)) else self.__format_value(i) for i in d]
-        return {self.__snake_case_key_to_camel_case(a): self.__snake_case_to_camel_case_dict(b) if isinstance(b, (
-            dict, list)) else self.__format_value(b) for a, b in d.items()}
 
-    @staticmethod
-    def __format_value(value) -> typing.Any:
-        if(isinstance(value, Enum)):
-            return value.value
-        return value
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def snake_case_to_camel_case(key: str) -> str:
+    components = key.split('_')
+    return components[0] + ''.join(x.title() for x in components[1:])
 
 
-    @staticmethod
-    def __snake_case_key_to_camel_case(key: str) -> str:
-        components = key.split('_')
-        return components[0] + ''.join(x.title() for x in components[1:])
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def camel_case_to_snake_case(key: str) -> str:
+    words = re.findall(r'[A-Z]?[a-z]+|[A-Z]{2,}(?=[A-Z][a-z]|\d|\W|$)|\d+', key)
+    return '_'.join(map(str.lower, words))
 
 
-class JsonCamelToSnakeCaseDeserializer:
+def warm_key_caches(dtos: typing.Iterable[type]):
+    for dto in dtos:
+        for dto_field in dataclasses.fields(dto):
+            camel_case_to_snake_case(snake_case_to_camel_case(dto_field.name))
 
-    def deserialize(self, data: str) -> Union[dict, list]:
-        data_dict = json.loads(data)
-        return self.__camel_case_to_snake_case_dict(d=data_dict)
 
-    def __camel_case_to_snake_case_dict(self, d):
+@dataclass(frozen=True)
+class SerializedJson:
+    # a body already written as camel cased json, collections hold one chunk per item
+    chunks: tuple[str, ...]
+
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+
+def json_default(value) -> typing.Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, SerializedJson):
+        # only reached when a written body is nested in another response, such as a batch
+        return json.loads(value.text())
+    return str(value)
+
+
+def snake_case_keys_hook(pairs: list[tuple[str, typing.Any]]) -> dict:
+    return {camel_case_to_snake_case(key): value for (key, value) in pairs}
+
+
+class StandardJsonBackend:
+    name = "json"
+
+    def dumps(self, data) -> str:
+        return json.dumps(data, default=json_default)
+
+    def loads(self, data: str, object_pairs_hook: typing.Callable[[list], dict] = None) -> typing.Any:
+        return json.loads(data, object_pairs_hook=object_pairs_hook)
+
+
+class OrjsonBackend:
+    name = "orjson"
+
+    def dumps(self, data) -> str:
+        # datetimes and written bodies go through json_default to be encoded as the standard backend encodes them
+        return orjson.dumps(data,
+                            default=json_default,
+                            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS |
+                            orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+    def loads(self, data: str, object_pairs_hook: typing.Callable[[list], dict] = None) -> typing.Any:
+        if object_pairs_hook is None:
+            return orjson.loads(data)
+        # orjson has no pairs hook, rebuilding every parsed object in python is slower than the standard parser
+        return json.loads(data, object_pairs_hook=object_pairs_hook)
+
+
+def json_backend(name: str = None):
+    # selected per container from the environment, orjson is only used when it is installed
+    name = name if name is not None else os.environ.get(JSON_BACKEND_ENVIRONMENT_VARIABLE, StandardJsonBackend.name)
+    if name == OrjsonBackend.name and orjson is not None:
+        return OrjsonBackend()
+    return StandardJsonBackend()
+
+
+@lru_cache(maxsize=None)
+def field_decoder(annotation) -> typing.Optional[typing.Callable[[typing.Any], typing.Any]]:
+    # converts a parsed json value to the annotated type, None when the value is used as it is
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return lambda value: annotation[value]
+    if typing.get_origin(annotation) is list:
+        item_decoder = field_decoder(next(iter(typing.get_args(annotation)), None))
+        if item_decoder is None:
+            return None
+        return lambda value: [item_decoder(item) for item in value]
+    if dataclasses.is_dataclass(annotation):
+        return lambda value: annotation(**decode_fields(values=value, to=annotation))
+    return None
+
+
+@lru_cache(maxsize=None)
+def request_fields(to: type) -> typing.Mapping[str, tuple[str, typing.Optional[typing.Callable]]]:
+    # camel cased json keys to the dto field they fill and the decoder for its annotation
+    annotations = all_annotations(to)
+    return MappingProxyType({snake_case_to_camel_case(dto_field.name): (dto_field.name,
+                                                                       field_decoder(annotations.get(dto_field.name)))
+                             for dto_field in dataclasses.fields(to)})
+
+
+def decode_fields(values: dict, to: type) -> dict:
+    if not isinstance(values, dict):
+        raise TypeError(f"expected an object for {to.__name__}")
+    known = request_fields(to)
+    decoded = {}
+    for (key, value) in values.items():
+        # keys that are not camel cased are normalised the way the deserializer would have done it
+        (name, decoder) = known.get(key) or known.get(snake_case_to_camel_case(camel_case_to_snake_case(key)),
+                                                      (None, None))
+        if name is None:
+            continue
+        decoded[name] = decoder(value) if decoder is not None and value is not None else value
+    return decoded
+
+
+class JsonSnakeToCamelSerializer:
+
+    def __init__(self, backend=None):
+        self.__backend = backend if backend is not None else json_backend()
+
+    def serialize(self, data: Union[dict, list]) -> str:
+        return "".join(self.serialize_chunks(data=data))
+
+    def serialize_chunks(self, data: Union[dict, list]) -> typing.Iterator[str]:
+        # collections are converted and encoded an item at a time so a camel cased copy of the whole body never exists
+        if isinstance(data, SerializedJson):
+            yield from data.chunks
+            return
+        dumps = self.__backend.dumps
+        if not isinstance(data, list):
+            yield dumps(self.__snake_case_to_camel_case_dict(d=data))
+            return
+        yield "["
+        for (index, item) in enumerate(data):
+            converted = self.__snake_case_to_camel_case_dict(item) if isinstance(item, (dict, list)) else item
+            yield dumps(converted) if index == 0 else f", {dumps(converted)}"
+        yield "]"
+
+    def __snake_case_to_camel_case_dict(self, d):
+        # keys are renamed in one pass, values such as enums are left to the encoder's default hook
         if isinstance(d, list):
-            return [self.__camel_case_to_snake_case_dict(i) if isinstance(i, (dict, list)) else i for i in d]
-        return {self.__camel_case_key_to_snake_case(a): self.__camel_case_to_snake_case_dict(b) if isinstance(b, (
+            return [self.__snake_case_to_camel_case_dict(i) if isinstance(i, (dict, list)) else i for i in d]
+        return {snake_case_to_camel_case(a): self.__snake_case_to_camel_case_dict(b) if isinstance(b, (
             dict, list)) else b for a, b in d.items()}
 
-    @staticmethod
-    def __camel_case_key_to_snake_case(key: str) -> str:
-        words = re.findall(r'[A-Z]?[a-z]+|[A-Z]{2,}(?=[A-Z][a-z]|\d|\W|$)|\d+', key)
-        return '_'.join(map(str.lower, words))
+
+class JsonCamelToSnakeCaseDeserializer:
+
+    def __init__(self, backend=None):
+        self.__backend = backend if backend is not None else json_backend()
+
+    @timed(phase="deserialize")
+    def deserialize(self, data: str) -> Union[dict, list]:
+        # keys are renamed as the parser builds each object instead of copying the parsed tree afterwards
+        return self.__backend.loads(data, object_pairs_hook=snake_case_keys_hook)
+
+    @timed(phase="deserialize")
+    def deserialize_fields(self, data: str, to: typing.Type[T]) -> dict:
+        # keys are renamed, enums converted and unknown keys dropped in a single pass driven by the dto annotations
+        try:
+            return decode_fields(values=self.__backend.loads(data), to=to)
+        except (ValueError, TypeError, KeyError) as e:
+            raise RequestDecodeException(f"body could not be decoded to {to.__name__}: {e!r}") from e
+
+
+class TimedLruCache:
+
+    def __init__(self, ttl_seconds: float,
+                 max_size: int,
+                 clock: typing.Callable[[], float] = time.monotonic):
+        self.__ttl_seconds = ttl_seconds
+        self.__max_size = max_size
+        self.__clock = clock
+        self.__entries: OrderedDict = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key) -> typing.Optional[typing.Any]:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self.__clock():
+                del self.__entries[key]
+                return None
+            self.__entries.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        with self.__lock:
+            self.__entries[key] = (self.__clock() + self.__ttl_seconds, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+
+    def invalidate(self, key) -> None:
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+
+class BatchLoader:
+
+    def __init__(self, batch_load: typing.Callable[[list], dict],
+                 max_batch_size: int = 100):
+        self.__batch_load = batch_load
+        self.__max_batch_size = max_batch_size
+        self.__loaded: dict = {}
+        # batched get requests share a loader across threads, so a key is loaded once however many ask for it
+        self.__lock = threading.Lock()
+
+    def load(self, key) -> typing.Any:
+        return self.load_many(keys=[key])[0]
+
+    def load_many(self, keys: list) -> list:
+        with self.__lock:
+            missing_keys = list(dict.fromkeys(key for key in keys if key not in self.__loaded))
+            for start in range(0, len(missing_keys), self.__max_batch_size):
+                batch = missing_keys[start:start + self.__max_batch_size]
+                results = self.__batch_load(batch)
+                for key in batch:
+                    self.__loaded[key] = results.get(key)
+            return [self.__loaded[key] for key in keys]
 
 
 def valid_uuid(id_, logger: Logger):
@@ -1,22 +1,39 @@
 import os
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session
 
 from src._types import Logger
+from src.crosscutting import server_timing
+
+QUERY_STARTED_KEY = "server_timing_query_started"
 
 Base = declarative_base()
 
 
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if server_timing.enabled:
+        conn.info.setdefault(QUERY_STARTED_KEY, []).append(server_timing.now())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get(QUERY_STARTED_KEY)
+    if started:
+        server_timing.add(phase="db", started=started.pop())
+
+
 class SqlAlchemyDataManager:
     def __init__(self, logger: Logger):
         logger.log_debug("new data manager constructed")
         engine_str = f"mysql+pymysql://{os.environ['DB_USER']}:{os.environ['DB_PASSWORD']}@{os.environ['DB_URL']}/{os.environ['DB_NAME']}"
         engine = create_engine(engine_str)
         self.__engine = engine
-        session = sessionmaker(bind=self.__engine)
-        self.__session = session()
+        # commands in parallel groups query from executor threads, sessions cannot be shared between threads
+        self.__session = scoped_session(sessionmaker(bind=self.__engine))
 
     @property
     def engine(self):
@@ -24,4 +41,7 @@ class SqlAlchemyDataManager:
 
     @property
     def session(self):
-        return self.__session
+        return self.__session()
+
+    def remove_session(self):
+        self.__session.remove()
@@ -0,0 +1,59 @@
+import threading
+from typing import Any, Callable
+
+import boto3
+from botocore.config import Config
+
+from src.crosscutting import server_timing
+
+AWS_CLIENT_CONFIG = Config(max_pool_connections=50,
+                           connect_timeout=2,
+                           read_timeout=10,
+                           tcp_keepalive=True,
+                           retries={
+                               "max_attempts": 3,
+                               "mode": "adaptive"
+                           })
+
+AWS_CALL_STARTED_KEY = "server_timing_call_started"
+
+# server timing phases reported for each service, anything else is reported under its service name
+AWS_TIMING_PHASES = {"cognito-idp": "cognito", "s3": "s3"}
+
+
+def build_aws_client(service_name: str, config: Config) -> Any:
+    client = boto3.session.Session().client(service_name, config=config)
+    instrument_aws_client(client=client, phase=AWS_TIMING_PHASES.get(service_name, service_name))
+    return client
+
+
+def instrument_aws_client(client: Any, phase: str):
+    def start_call_timer(context: dict, **kwargs):
+        if server_timing.enabled:
+            context[AWS_CALL_STARTED_KEY] = server_timing.now()
+
+    def stop_call_timer(context: dict, **kwargs):
+        started = context.pop(AWS_CALL_STARTED_KEY, None)
+        if started is not None:
+            server_timing.add(phase=phase, started=started)
+
+    client.meta.events.register_first("before-call.*.*", start_call_timer)
+    client.meta.events.register("after-call.*.*", stop_call_timer)
+    client.meta.events.register("after-call-error.*.*", stop_call_timer)
+
+
+class AwsClientFactory:
+
+    def __init__(self, client_builder: Callable[[str, Config], Any] = build_aws_client,
+                 config: Config = AWS_CLIENT_CONFIG):
+        self.__client_builder = client_builder
+        self.__config = config
+        self.__clients = {}
+        self.__lock = threading.Lock()
+
+    def client(self, service_name: str) -> Any:
+        # botocore clients are thread safe once built, building them is not and is the expensive part
+        with self.__lock:
+            if service_name not in self.__clients:
+                self.__clients[service_name] = self.__client_builder(service_name, self.__config)
+            return self.__clients[service_name]
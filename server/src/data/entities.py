@@ -1,13 +1,13 @@
 from typing import Type
 
 import sqlalchemy.orm
-from sqlalchemy import Column, String, DateTime, Float, Table, Integer, Boolean, Enum, orm, and_
+from sqlalchemy import Column, String, DateTime, Float, Table, Integer, Boolean, Enum, orm, and_, inspect, text
 
 from src import T
 from src.data import Base
 from src.domain.models import Brand, Influencer, Listing, Collaboration, Notification, ValueEnum, Value, CategoryEnum, \
     Category, GenderEnum, AudienceAge, AudienceGender, CollaborationStateEnum, BrandListing, InfluencerListing, \
-    BrandCollaboration, InfluencerCollaboration
+    BrandCollaboration, InfluencerCollaboration, AudienceProfile, AUDIENCE_AGE_BANDS, AUDIENCE_GENDER_FIELDS
 
 
 class SqlAlchemyBaseEntity:
@@ -42,6 +42,14 @@ audience_gender_table = Table('audience_gender', Base.metadata,
                               Column('split', Float),
                               Column('influencer_auth_user_id', String(length=64)))
 
+# the columnar audience, one row per influencer with a column per band in place of a row per band
+audience_profile_table = Table('audience_profile', Base.metadata,
+                               Column('id', String(length=36), primary_key=True),
+                               Column('created', DateTime),
+                               Column('influencer_auth_user_id', String(length=64), nullable=False, unique=True),
+                               *[Column(band.field, Float) for band in AUDIENCE_AGE_BANDS],
+                               *[Column(gender_field, Float) for gender_field in AUDIENCE_GENDER_FIELDS.values()])
+
 category_table = Table('category', Base.metadata,
                        Column('id', String(length=36), primary_key=True),
                        Column('created', DateTime),
@@ -59,7 +67,10 @@ brand_table = Table('brand', Base.metadata,
                     Column('header_image', String(length=360)),
                     Column('insta_handle', String(length=30)),
                     Column('website', String(length=120)),
-                    Column('logo', String(length=360)))
+                    Column('logo', String(length=360)),
+                    Column('given_name', String(length=120)),
+                    Column('family_name', String(length=120)),
+                    Column('email', String(length=360)))
 
 influencer_table = Table('influencer', Base.metadata,
                          Column('id', String(length=36), primary_key=True),
@@ -69,7 +80,10 @@ influencer_table = Table('influencer', Base.metadata,
                          Column('bio', String(length=500)),
                          Column('image', String(length=360)),
                          Column('insta_handle', String(length=30)),
-                         Column('address', String(length=500)))
+                         Column('address', String(length=500)),
+                         Column('given_name', String(length=120)),
+                         Column('family_name', String(length=120)),
+                         Column('email', String(length=360)))
 
 listing_table = Table('listing', Base.metadata,
                       Column('id', String(length=36), primary_key=True),
@@ -102,9 +116,28 @@ notifications_table = Table('notification', Base.metadata,
                             Column('read', Boolean))
 
 
+# added to brand and influencer after the first deployments, see migrate_user_claims.py
+USER_CLAIM_COLUMNS = ("given_name", "family_name", "email")
+
+
+def add_missing_columns(engine, table: Table, column_names) -> list[str]:
+    # brings a table created by an older schema up to date, columns already present are skipped so it can be rerun
+    existing = {column["name"] for column in inspect(engine).get_columns(table.name)}
+    added = []
+    with engine.begin() as connection:
+        for name in column_names:
+            if name in existing:
+                continue
+            column_type = table.c[name].type.compile(dialect=engine.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {name} {column_type}"))
+            added.append(f"{table.name}.{name}")
+    return added
+
+
 def create_single_mappings():
     sqlalchemy.orm.mapper(AudienceGender, audience_gender_table)
     sqlalchemy.orm.mapper(AudienceAge, audience_age_table)
+    sqlalchemy.orm.mapper(AudienceProfile, audience_profile_table)
     sqlalchemy.orm.mapper(Value, value_table)
     sqlalchemy.orm.mapper(Category, category_table)
     sqlalchemy.orm.mapper(Brand, brand_table, properties={
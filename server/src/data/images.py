@@ -0,0 +1,125 @@
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+from src._types import Logger, ImageRepository, ImageReferenceRepository
+from src.exceptions import ImageException
+
+
+@dataclass(frozen=True)
+class ImageVariant:
+    name: str
+    max_size: Optional[int] = None
+    format: str = "WEBP"
+    extension: str = "webp"
+    quality: int = 80
+
+
+IMAGE_VARIANTS = [
+    ImageVariant(name="thumbnail", max_size=256),
+    ImageVariant(name="medium", max_size=1024),
+    ImageVariant(name="webp")
+]
+
+# presigned uploads are stored before they are confirmed, so recent objects are never collected
+GARBAGE_COLLECTION_GRACE_PERIOD = timedelta(days=1)
+# the bucket prefixes images are uploaded under, anything else in the bucket is never listed for collection
+IMAGE_KEY_PREFIXES = ["brands/", "influencers/", "listings/"]
+
+shared_executor: Optional[Executor] = None
+
+
+def variant_key(key: str, variant: ImageVariant) -> str:
+    return f"{os.path.splitext(key)[0]}_{variant.name}.{variant.extension}"
+
+
+def render_variant(source_path: str, variant: ImageVariant) -> str:
+    with Image.open(source_path) as source:
+        image = ImageOps.exif_transpose(source)
+        if variant.max_size is not None:
+            image.thumbnail((variant.max_size, variant.max_size))
+        if image.mode not in ["RGB", "RGBA"]:
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        target_path = variant_key(key=source_path, variant=variant)
+        image.save(target_path, format=variant.format, quality=variant.quality)
+    return target_path
+
+
+def variant_executor() -> Executor:
+    global shared_executor
+    if shared_executor is None:
+        try:
+            shared_executor = ProcessPoolExecutor(max_workers=os.cpu_count())
+        except (OSError, NotImplementedError):
+            # lambda has no /dev/shm so process pools cannot be created, pillow releases the gil while encoding
+            shared_executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+    return shared_executor
+
+
+class ImageVariantRenderer:
+
+    def __init__(self, logger: Logger, executor=None):
+        self.__logger = logger
+        self.__executor = executor
+
+    def render(self, source_path: str) -> dict[ImageVariant, str]:
+        executor = self.__executor if self.__executor is not None else variant_executor()
+        futures = {variant: executor.submit(render_variant, source_path, variant) for variant in IMAGE_VARIANTS}
+        self.__logger.log_debug(f"rendering {len(futures)} variants of {source_path}")
+        return {variant: future.result() for variant, future in futures.items()}
+
+
+class ImageGarbageCollector:
+
+    def __init__(self, image_repository: ImageRepository,
+                 image_reference_repository: ImageReferenceRepository,
+                 logger: Logger):
+        self.__image_repository = image_repository
+        self.__image_reference_repository = image_reference_repository
+        self.__logger = logger
+
+    def collect(self, now: datetime = None) -> list[str]:
+        now = now if now is not None else datetime.now(tz=timezone.utc)
+        referenced_keys = self.__load_referenced_keys()
+        stale_keys = [key for key in self.__image_repository.list_keys(
+            modified_before=now - GARBAGE_COLLECTION_GRACE_PERIOD) if key not in referenced_keys]
+        # a deduplicated upload reuses an old object without touching it, so it can be referenced while listing
+        referenced_keys = self.__load_referenced_keys()
+        stale_keys = [key for key in stale_keys if key not in referenced_keys]
+        self.__logger.log_debug(f"collecting {len(stale_keys)} unreferenced images")
+        self.__image_repository.delete(keys=stale_keys)
+        return stale_keys
+
+    def __load_referenced_keys(self) -> set[str]:
+        referenced_keys = self.__image_reference_repository.load_referenced_keys()
+        referenced_keys.update({variant_key(key=key, variant=variant)
+                                for key in list(referenced_keys)
+                                for variant in IMAGE_VARIANTS})
+        return referenced_keys
+
+
+class ImageVariantBackfiller:
+
+    def __init__(self, image_repository: ImageRepository,
+                 image_reference_repository: ImageReferenceRepository,
+                 logger: Logger):
+        self.__image_repository = image_repository
+        self.__image_reference_repository = image_reference_repository
+        self.__logger = logger
+
+    def backfill(self) -> list[str]:
+        # images stored before variants were rendered on upload, keys that already have every variant are skipped
+        failed_keys = []
+        referenced_keys = sorted(self.__image_reference_repository.load_referenced_keys())
+        self.__logger.log_debug(f"backfilling variants of {len(referenced_keys)} images")
+        for key in referenced_keys:
+            try:
+                self.__image_repository.create_variants(key=key)
+            except ImageException:
+                self.__logger.log_error(f"variants of {key} could not be rendered")
+                failed_keys.append(key)
+        return failed_keys
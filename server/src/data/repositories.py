@@ -1,19 +1,46 @@
 import base64
-import io
+import hashlib
 import os
+import tempfile
 import uuid
-from typing import Type, TypeVar, Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import fields
+from datetime import datetime
+from typing import Type, TypeVar, Callable, Iterator, Optional
 
-import boto3
 from botocore.exceptions import ClientError, ParamValidationError
+from PIL import Image
 from filetype import filetype
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 
-from src._types import DataManager, ImageRepository, Model, UserModel, Logger
+from src._types import DataManager, ImageRepository, Model, UserModel, Logger, ClaimsCache, AuthUserRepository
+from src.data.aws import AwsClientFactory
 from src.data.entities import create_mappings
+from src.data.images import ImageVariantRenderer, variant_key, IMAGE_VARIANTS, IMAGE_KEY_PREFIXES
 from src.domain.models import Brand, Influencer, Listing, User, Notification, AudienceAgeSplit, AudienceAge, \
-    AudienceGenderSplit, AudienceGender, BrandListing, Collaboration, CollaborationStateEnum, InfluencerListing
+    AudienceGenderSplit, AudienceGender, BrandListing, Collaboration, CollaborationStateEnum, InfluencerListing, \
+    ImageUpload, AudienceProfile, index_audience_ages, index_audience_genders, profile_audience_ages, \
+    profile_audience_genders
 from src.exceptions import AlreadyExistsException, ImageException, NotFoundException
 
+COGNITO_MAX_CONCURRENCY = 8
+# filetype only inspects the leading bytes of a file to work out its type
+IMAGE_HEADER_SIZE = 8192
+BASE64_DECODE_CHUNK_SIZE = 256 * 1024
+MULTIPART_UPLOAD_THRESHOLD = 8 * 1024 * 1024
+# s3 rejects multipart parts under 5MiB other than the last one
+MULTIPART_UPLOAD_PART_SIZE = 8 * 1024 * 1024
+PRESIGNED_UPLOAD_EXPIRY_SECONDS = 300
+# s3 caps delete_objects at 1000 keys per request
+DELETE_OBJECTS_BATCH_SIZE = 1000
+
+AUDIENCE_STORAGE_ENVIRONMENT_VARIABLE = "AUDIENCE_STORAGE"
+AUDIENCE_STORAGE_ROWS = "rows"
+AUDIENCE_STORAGE_COLUMNS = "columns"
+# users whose claims are fetched from cognito per backfill batch
+USER_CLAIMS_BACKFILL_BATCH_SIZE = 100
+
 TPayload = TypeVar("TPayload")
 TParent = TypeVar("TParent")
 
@@ -134,6 +161,12 @@ class SqlAlchemyAudienceAgeRepository(BaseSqlAlchemyOwnerRepository):
                                                                      model_entity_field=AudienceAge.influencer_auth_user_id,
                                                                      model=AudienceAge))
 
+    def save_for_influencer(self,
+                            payload: AudienceAgeSplit,
+                            auth_user_id: str) -> AudienceAgeSplit:
+        # loaded rows are tracked by the session already, only bands added by an update become new rows
+        return self.write_new_for_influencer(payload=payload, auth_user_id=auth_user_id)
+
     def __set_audience_age_auth_user_id(self, audience_age: AudienceAge, auth_user_id: str):
         audience_age.influencer_auth_user_id = auth_user_id
 
@@ -163,10 +196,153 @@ class SqlAlchemyAudienceGenderRepository(BaseSqlAlchemyOwnerRepository):
                                                                            model_entity_field=AudienceGender.influencer_auth_user_id,
                                                                            model=AudienceGender))
 
+    def save_for_influencer(self,
+                            payload: AudienceGenderSplit,
+                            auth_user_id: str) -> AudienceGenderSplit:
+        # loaded rows are tracked by the session already, only bands added by an update become new rows
+        return self.write_new_for_influencer(payload=payload, auth_user_id=auth_user_id)
+
     def __set_audience_gender_auth_user_id(self, audience_age: AudienceGender, auth_user_id: str):
         audience_age.influencer_auth_user_id = auth_user_id
 
 
+class SqlAlchemyAudienceProfileRepository(BaseSqlAlchemyOwnerRepository):
+
+    # the columnar audience, every band of an influencer is read and written through its single profile row
+    def __init__(self, data_manager: DataManager,
+                 logger: Logger):
+        super().__init__(data_manager,
+                         AudienceProfile,
+                         logger=logger)
+
+    def load_profile(self, auth_user_id: str, for_update: bool = False) -> Optional[AudienceProfile]:
+        query = self._data_manager \
+            .session \
+            .query(AudienceProfile) \
+            .filter(AudienceProfile.influencer_auth_user_id == auth_user_id)
+        return (query.with_for_update() if for_update else query).first()
+
+    def _profile_for_write(self, auth_user_id: str) -> AudienceProfile:
+        profile = self.load_profile(auth_user_id=auth_user_id)
+        if profile is not None:
+            return profile
+        # concurrent first writes race on the unique auth user id, the savepoint lets the loser reuse the winner's row
+        try:
+            with self._data_manager.session.begin_nested():
+                profile = self._write_new_for_owner(payload=AudienceProfile(),
+                                                    foreign_key_setter=lambda x:
+                                                    self.__set_profile_auth_user_id(profile=x,
+                                                                                    auth_user_id=auth_user_id))
+            return profile
+        except IntegrityError:
+            self._logger.log_debug(f"audience profile for {auth_user_id} written concurrently, reloading")
+            # a locking read sees the committed row, a plain read would reuse the snapshot that missed it
+            return self.load_profile(auth_user_id=auth_user_id, for_update=True)
+
+    def __set_profile_auth_user_id(self, profile: AudienceProfile, auth_user_id: str):
+        profile.influencer_auth_user_id = auth_user_id
+
+
+class SqlAlchemyColumnarAudienceAgeRepository(SqlAlchemyAudienceProfileRepository):
+
+    def write_new_for_influencer(self,
+                                 payload: AudienceAgeSplit,
+                                 auth_user_id: str) -> AudienceAgeSplit:
+        return self.save_for_influencer(payload=payload, auth_user_id=auth_user_id)
+
+    def load_for_influencer(self,
+                            auth_user_id: str) -> AudienceAgeSplit:
+        return AudienceAgeSplit(audience_ages=profile_audience_ages(profile=self.load_profile(auth_user_id=auth_user_id)))
+
+    def save_for_influencer(self,
+                            payload: AudienceAgeSplit,
+                            auth_user_id: str) -> AudienceAgeSplit:
+        profile = self._profile_for_write(auth_user_id=auth_user_id)
+        for (band_field, audience_age) in index_audience_ages(payload.audience_ages).items():
+            audience_age.influencer_auth_user_id = auth_user_id
+            setattr(profile, band_field, audience_age.split)
+        return payload
+
+
+class SqlAlchemyColumnarAudienceGenderRepository(SqlAlchemyAudienceProfileRepository):
+
+    def write_new_for_influencer(self,
+                                 payload: AudienceGenderSplit,
+                                 auth_user_id: str) -> AudienceGenderSplit:
+        return self.save_for_influencer(payload=payload, auth_user_id=auth_user_id)
+
+    def load_for_influencer(self,
+                            auth_user_id: str) -> AudienceGenderSplit:
+        return AudienceGenderSplit(
+            audience_genders=profile_audience_genders(profile=self.load_profile(auth_user_id=auth_user_id)))
+
+    def save_for_influencer(self,
+                            payload: AudienceGenderSplit,
+                            auth_user_id: str) -> AudienceGenderSplit:
+        profile = self._profile_for_write(auth_user_id=auth_user_id)
+        for (gender_field, audience_gender) in index_audience_genders(payload.audience_genders).items():
+            audience_gender.influencer_auth_user_id = auth_user_id
+            setattr(profile, gender_field, audience_gender.split)
+        return payload
+
+
+def audience_repositories(storage: str = None) -> tuple[type, type]:
+    # rows until the existing audiences have been copied over by migrate_audience_rows_to_profiles
+    storage = storage if storage is not None else os.environ.get(AUDIENCE_STORAGE_ENVIRONMENT_VARIABLE,
+                                                                 AUDIENCE_STORAGE_ROWS)
+    if storage == AUDIENCE_STORAGE_COLUMNS:
+        return SqlAlchemyColumnarAudienceAgeRepository, SqlAlchemyColumnarAudienceGenderRepository
+    return SqlAlchemyAudienceAgeRepository, SqlAlchemyAudienceGenderRepository
+
+
+def migrate_audience_rows_to_profiles(session) -> int:
+    # copies the age and gender rows of every influencer into its profile, columns already written in the columnar
+    # format are kept so the migration can be rerun, the rows are left in place for switching back
+    profiles = {profile.influencer_auth_user_id: profile for profile in session.query(AudienceProfile).all()}
+    (ages, genders) = ({}, {})
+    for audience_age in session.query(AudienceAge).all():
+        ages.setdefault(audience_age.influencer_auth_user_id, []).append(audience_age)
+    for audience_gender in session.query(AudienceGender).all():
+        genders.setdefault(audience_gender.influencer_auth_user_id, []).append(audience_gender)
+    migrated = 0
+    for auth_user_id in dict.fromkeys([*ages, *genders]):
+        if auth_user_id is None:
+            continue
+        profile = profiles.get(auth_user_id)
+        if profile is None:
+            profile = AudienceProfile(influencer_auth_user_id=auth_user_id)
+            session.add(profile)
+        columns = {**{field: row.split for (field, row) in index_audience_ages(ages.get(auth_user_id, [])).items()},
+                   **{field: row.split for (field, row) in index_audience_genders(genders.get(auth_user_id, [])).items()}}
+        missing = [column for column in columns if getattr(profile, column) is None]
+        for column in missing:
+            setattr(profile, column, columns[column])
+        if missing:
+            migrated += 1
+    return migrated
+
+
+def backfill_user_claims(session, auth_user_repository: AuthUserRepository) -> int:
+    # copies the cognito claims of brands and influencers written before the claim columns existed, claims already
+    # stored are kept so the backfill can be rerun
+    claims = [user_field.name for user_field in fields(User)]
+    backfilled = 0
+    for model in [Brand, Influencer]:
+        users = session.query(model) \
+            .filter(or_(*[getattr(model, claim).is_(None) for claim in claims])) \
+            .all()
+        for start in range(0, len(users), USER_CLAIMS_BACKFILL_BATCH_SIZE):
+            batch = users[start:start + USER_CLAIMS_BACKFILL_BATCH_SIZE]
+            auth_users = auth_user_repository.get_by_ids(ids=[user.auth_user_id for user in batch])
+            for user in batch:
+                auth_user = auth_users[user.auth_user_id]
+                for claim in claims:
+                    if getattr(user, claim) is None:
+                        setattr(user, claim, getattr(auth_user, claim))
+                backfilled += 1
+    return backfilled
+
+
 class SqlAlchemyBrandRepository(BaseSqlAlchemyUserRepository):
     def __init__(self,
                  data_manager: DataManager,
@@ -274,47 +450,217 @@ class SqlAlchemyNotificationRepository(BaseSqlAlchemyRepository):
 
 class S3ImageRepository:
 
-    def __init__(self, logger: Logger):
+    def __init__(self, logger: Logger, variant_renderer: ImageVariantRenderer, client_factory: AwsClientFactory):
+        self.__variant_renderer = variant_renderer
         self.__logger = logger
         self.__bucket_name = 'pinfluencer-product-images'
-        self.__s3_client = boto3.client('s3')
+        self.__s3_client = client_factory.client(service_name='s3')
 
     def upload(self, path, image_base64_encoded):
-        self.__logger.log_trace(f"uploading image to S3 repo {image_base64_encoded}")
-        image = base64.b64decode(image_base64_encoded)
-        f = io.BytesIO(image)
-        file_type = filetype.get_type(ext='jpg')
-        try:
-            file_type = filetype.guess(f)
-        except Exception:
-            ...
+        self.__logger.log_trace(f"uploading image to S3 repo of {len(image_base64_encoded)} base64 characters")
+        # first pass only hashes, so the key is known before anything is sent and duplicates are never re-uploaded
+        digest = hashlib.sha256()
+        header = None
+        for chunk in self.__decode_base64(image_base64_encoded=image_base64_encoded):
+            if header is None:
+                header = chunk[:IMAGE_HEADER_SIZE]
+            digest.update(chunk)
+        file_type = self.__guess_file_type(header=header if header is not None else b"")
         self.__logger.log_debug(f'image uploading to {path}/ of {file_type}')
-        if file_type is not None:
-            self.__logger.log_trace(f"file type {file_type}")
-            mime = file_type.MIME
-        else:
-            mime = 'image/jpg'
-        image_id = str(uuid.uuid4())
-        file = f'{image_id}.{file_type.EXTENSION}'
+        mime = file_type.MIME
+        file = f'{digest.hexdigest()}.{file_type.EXTENSION}'
         self.__logger.log_trace(f'image {file}')
         key = f'{path}/{file}'
         self.__logger.log_trace(f'key {key}')
+        if self.exists(key=key):
+            self.__logger.log_debug(f'image {key} already stored, skipping upload')
+            self.__refresh(key=key, mime=mime)
+            return key
+        chunks = self.__decode_base64(image_base64_encoded=image_base64_encoded)
         try:
-            self.__s3_client.put_object(Bucket=self.__bucket_name,
-                                        Key=key, Body=image,
-                                        ContentType=mime,
-                                        Tagging='public=yes')
+            if len(image_base64_encoded) * 3 // 4 > MULTIPART_UPLOAD_THRESHOLD:
+                self.__multipart_upload(key=key, chunks=chunks, mime=mime)
+            else:
+                self.__s3_client.put_object(Bucket=self.__bucket_name,
+                                            Key=key, Body=b"".join(chunks),
+                                            ContentType=mime,
+                                            Tagging='public=yes')
             return key
         except ClientError:
             raise ImageException
 
+    def create_upload(self, path: str, content_type: str, content_length: int) -> ImageUpload:
+        file_type = filetype.get_type(mime=content_type)
+        key = f'{path}/{uuid.uuid4()}.{file_type.EXTENSION}'
+        self.__logger.log_debug(f'creating presigned upload for {key} of {content_type}')
+        # every header in params is signed, so s3 rejects uploads with a different type, size or tagging
+        upload_url = self.__s3_client.generate_presigned_url(ClientMethod='put_object',
+                                                             Params={
+                                                                 "Bucket": self.__bucket_name,
+                                                                 "Key": key,
+                                                                 "ContentType": content_type,
+                                                                 "ContentLength": content_length,
+                                                                 "Tagging": 'public=yes'
+                                                             },
+                                                             ExpiresIn=PRESIGNED_UPLOAD_EXPIRY_SECONDS)
+        return ImageUpload(image_key=key,
+                           upload_url=upload_url,
+                           headers={
+                               "Content-Type": content_type,
+                               "Content-Length": str(content_length),
+                               "x-amz-tagging": 'public=yes'
+                           })
+
+    def create_variants(self, key: str) -> dict[str, str]:
+        variant_keys = {variant.name: variant_key(key=key, variant=variant) for variant in IMAGE_VARIANTS}
+        if all(self.exists(key=stored_key) for stored_key in variant_keys.values()):
+            self.__logger.log_debug(f'variants of {key} already stored, skipping render')
+            return variant_keys
+        with tempfile.TemporaryDirectory() as directory:
+            source_path = os.path.join(directory, os.path.basename(key))
+            try:
+                self.__s3_client.download_file(Bucket=self.__bucket_name, Key=key, Filename=source_path)
+                rendered_paths = self.__variant_renderer.render(source_path=source_path)
+                variant_keys = {}
+                for variant, rendered_path in rendered_paths.items():
+                    variant_keys[variant.name] = variant_key(key=key, variant=variant)
+                    self.__logger.log_trace(f"uploading variant {variant_keys[variant.name]}")
+                    with open(rendered_path, "rb") as body:
+                        self.__s3_client.put_object(Bucket=self.__bucket_name,
+                                                    Key=variant_keys[variant.name],
+                                                    Body=body,
+                                                    ContentType=f"image/{variant.extension}",
+                                                    Tagging='public=yes')
+                return variant_keys
+            # decompression bombs are not os errors, oversized images are rejected like undecodable ones
+            except (ClientError, OSError, Image.DecompressionBombError) as e:
+                self.__logger.log_exception(e)
+                raise ImageException
+
+    def list_keys(self, modified_before: datetime) -> list[str]:
+        keys = []
+        for prefix in IMAGE_KEY_PREFIXES:
+            request = {"Bucket": self.__bucket_name, "Prefix": prefix}
+            while True:
+                response = self.__s3_client.list_objects_v2(**request)
+                keys.extend(stored_object["Key"] for stored_object in response.get("Contents", [])
+                            if stored_object["LastModified"] < modified_before)
+                if not response.get("IsTruncated"):
+                    break
+                request["ContinuationToken"] = response["NextContinuationToken"]
+        return keys
+
+    def delete(self, keys: list[str]) -> None:
+        for start in range(0, len(keys), DELETE_OBJECTS_BATCH_SIZE):
+            batch = keys[start:start + DELETE_OBJECTS_BATCH_SIZE]
+            self.__logger.log_debug(f"deleting {len(batch)} images")
+            self.__s3_client.delete_objects(Bucket=self.__bucket_name,
+                                            Delete={
+                                                "Objects": [{"Key": key} for key in batch],
+                                                "Quiet": True
+                                            })
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.__s3_client.head_object(Bucket=self.__bucket_name, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ["404", "NoSuchKey", "NotFound"]:
+                return False
+            raise ImageException
+
+    def __refresh(self, key: str, mime: str) -> None:
+        # a reused object may be older than the garbage collection grace period, copying it onto itself resets
+        # LastModified so it is not collected before the row referencing it is committed
+        try:
+            self.__s3_client.copy_object(Bucket=self.__bucket_name,
+                                         Key=key,
+                                         CopySource={"Bucket": self.__bucket_name, "Key": key},
+                                         ContentType=mime,
+                                         MetadataDirective='REPLACE')
+        except ClientError:
+            raise ImageException
+
+    def __multipart_upload(self, key: str, chunks: Iterator[bytes], mime: str) -> None:
+        upload_id = self.__s3_client.create_multipart_upload(Bucket=self.__bucket_name,
+                                                             Key=key,
+                                                             ContentType=mime,
+                                                             Tagging='public=yes')["UploadId"]
+        try:
+            parts = []
+            for part_number, part in enumerate(self.__rechunk(chunks=chunks, size=MULTIPART_UPLOAD_PART_SIZE),
+                                               start=1):
+                self.__logger.log_trace(f"uploading part {part_number} of {key}")
+                response = self.__s3_client.upload_part(Bucket=self.__bucket_name,
+                                                        Key=key,
+                                                        UploadId=upload_id,
+                                                        PartNumber=part_number,
+                                                        Body=part)
+                parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+            self.__s3_client.complete_multipart_upload(Bucket=self.__bucket_name,
+                                                       Key=key,
+                                                       UploadId=upload_id,
+                                                       MultipartUpload={"Parts": parts})
+        except Exception:
+            self.__s3_client.abort_multipart_upload(Bucket=self.__bucket_name,
+                                                    Key=key,
+                                                    UploadId=upload_id)
+            raise
+
+    @staticmethod
+    def __guess_file_type(header: bytes):
+        try:
+            file_type = filetype.guess(header)
+        except Exception:
+            file_type = None
+        return file_type if file_type is not None else filetype.get_type(ext='jpg')
+
+    @staticmethod
+    def __decode_base64(image_base64_encoded: str) -> Iterator[bytes]:
+        remainder = ""
+        for start in range(0, len(image_base64_encoded), BASE64_DECODE_CHUNK_SIZE):
+            chunk = remainder + "".join(image_base64_encoded[start:start + BASE64_DECODE_CHUNK_SIZE].split())
+            # base64 only decodes cleanly in blocks of 4 characters, carry the rest into the next chunk
+            decodable_length = len(chunk) - len(chunk) % 4
+            remainder = chunk[decodable_length:]
+            if decodable_length:
+                yield base64.b64decode(chunk[:decodable_length])
+        if remainder:
+            yield base64.b64decode(remainder)
+
+    @staticmethod
+    def __rechunk(chunks: Iterator[bytes], size: int) -> Iterator[bytes]:
+        buffer = bytearray()
+        for chunk in chunks:
+            buffer.extend(chunk)
+            while len(buffer) >= size:
+                yield bytes(buffer[:size])
+                del buffer[:size]
+        if buffer:
+            yield bytes(buffer)
+
+
+class SqlAlchemyImageReferenceRepository:
+
+    def __init__(self, data_manager: DataManager, logger: Logger):
+        self.__data_manager = data_manager
+        self.__logger = logger
+        create_mappings(logger=self.__logger)
+
+    def load_referenced_keys(self) -> set[str]:
+        keys = set()
+        for column in [Brand.logo, Brand.header_image, Influencer.image, Listing.product_image]:
+            keys.update(key for (key,) in self.__data_manager.session.query(column).filter(column.isnot(None)))
+        self.__logger.log_debug(f"{len(keys)} images are referenced")
+        return keys
+
 
 class CognitoAuthService:
 
-    def __init__(self, logger: Logger):
+    def __init__(self, logger: Logger, client_factory: AwsClientFactory):
         self.__logger = logger
         self.__logger.log_trace(f"user pool id: {os.environ['USER_POOL_ID']}")
-        self.__client = boto3.client('cognito-idp')
+        self.__client = client_factory.client(service_name='cognito-idp')
 
     def update_user_claims(self, username: str, attributes: list[dict]) -> None:
         self.__client.admin_update_user_attributes(
@@ -335,12 +681,41 @@ class CognitoAuthService:
 class CognitoAuthUserRepository:
 
     def __init__(self, auth_service: CognitoAuthService,
+                 claims_cache: ClaimsCache,
                  logger: Logger):
         self.__logger = logger
         self.__auth_service = auth_service
+        self.__claims_cache = claims_cache
 
     def get_by_id(self, _id: str) -> User:
         self.__logger.log_trace(f"username is {_id}")
+        cached_user = self.__claims_cache.get(_id)
+        if cached_user is not None:
+            self.__logger.log_trace(f"claims cache hit for {_id}")
+            return cached_user
+        user = self.__load_user(_id=_id)
+        self.__claims_cache.set(_id, user)
+        return user
+
+    def get_by_ids(self, ids: list[str]) -> dict[str, User]:
+        users = {}
+        missing_ids = []
+        for _id in ids:
+            cached_user = self.__claims_cache.get(_id)
+            if cached_user is not None:
+                users[_id] = cached_user
+            else:
+                missing_ids.append(_id)
+        if missing_ids:
+            self.__logger.log_debug(f"fetching {len(missing_ids)} users from cognito")
+            with ThreadPoolExecutor(max_workers=min(COGNITO_MAX_CONCURRENCY, len(missing_ids))) as executor:
+                loaded_users = list(executor.map(lambda x: self.__load_user(_id=x), missing_ids))
+            for _id, user in zip(missing_ids, loaded_users):
+                self.__claims_cache.set(_id, user)
+                users[_id] = user
+        return users
+
+    def __load_user(self, _id: str) -> User:
         auth_user = self.__auth_service.get_user(username=_id)
         first_name = self.__get_cognito_attribute(user=auth_user,
                                                   attribute_name='given_name')
@@ -373,6 +748,12 @@ class CognitoAuthUserRepository:
             self.__auth_service.update_user_claims(username=auth_user_id, attributes=list_of_attributes)
         except ParamValidationError:
             ...
+        except ClientError as e:
+            # claims are persisted with the user row, cognito is only kept in sync on a best effort basis
+            self.__logger.log_error(f"failed to sync claims to cognito for {auth_user_id}")
+            self.__logger.log_exception(e)
+        finally:
+            self.__claims_cache.invalidate(auth_user_id)
 
     def __flexi_update_claims(self, user: User) -> list[dict]:
         attributes = []
@@ -2,6 +2,7 @@ import uuid
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
+from typing import Optional
 
 
 def uuid4_str():
@@ -71,6 +72,9 @@ class Brand(DataModel):
     categories: list[Category] = field(default_factory=list)
     values: list[Value] = field(default_factory=list)
     auth_user_id: str = None
+    given_name: str = None
+    family_name: str = None
+    email: str = None
 
 
 @dataclass(unsafe_hash=True)
@@ -80,6 +84,13 @@ class User:
     email: str = None
 
 
+@dataclass
+class ImageUpload:
+    image_key: str = None
+    upload_url: str = None
+    headers: dict = None
+
+
 @dataclass(unsafe_hash=True)
 class Influencer(DataModel):
     insta_handle: str = None
@@ -90,6 +101,9 @@ class Influencer(DataModel):
     values: list[Value] = field(default_factory=list)
     address: str = None
     auth_user_id: str = None
+    given_name: str = None
+    family_name: str = None
+    email: str = None
 
 
 class GenderEnum(Enum):
@@ -123,6 +137,88 @@ class AudienceGenderSplit:
     audience_genders: list[AudienceGender] = field(default_factory=list)
 
 
+@dataclass(unsafe_hash=True)
+class AudienceProfile(DataModel):
+    influencer_auth_user_id: str = None
+    audience_age_13_to_17_split: float = None
+    audience_age_18_to_24_split: float = None
+    audience_age_25_to_34_split: float = None
+    audience_age_35_to_44_split: float = None
+    audience_age_45_to_54_split: float = None
+    audience_age_55_to_64_split: float = None
+    audience_age_65_plus_split: float = None
+    audience_male_split: float = None
+    audience_female_split: float = None
+
+
+@dataclass(frozen=True)
+class AudienceAgeBand:
+    field: str
+    min_age: int
+    max_age: Optional[int] = None
+
+
+# each band is a field of the age view and a column of the audience profile under the same name
+AUDIENCE_AGE_BANDS = (AudienceAgeBand(field="audience_age_13_to_17_split", min_age=13, max_age=17),
+                      AudienceAgeBand(field="audience_age_18_to_24_split", min_age=18, max_age=24),
+                      AudienceAgeBand(field="audience_age_25_to_34_split", min_age=25, max_age=34),
+                      AudienceAgeBand(field="audience_age_35_to_44_split", min_age=35, max_age=44),
+                      AudienceAgeBand(field="audience_age_45_to_54_split", min_age=45, max_age=54),
+                      AudienceAgeBand(field="audience_age_55_to_64_split", min_age=55, max_age=64),
+                      AudienceAgeBand(field="audience_age_65_plus_split", min_age=65))
+
+AUDIENCE_AGE_BANDS_BY_RANGE = {(band.min_age, band.max_age): band for band in AUDIENCE_AGE_BANDS}
+
+AUDIENCE_GENDER_FIELDS = {GenderEnum.MALE: "audience_male_split",
+                          GenderEnum.FEMALE: "audience_female_split"}
+
+
+def audience_age_band(min_age: int, max_age: Optional[int]) -> Optional[AudienceAgeBand]:
+    # the open ended band is matched on its lower bound alone
+    return AUDIENCE_AGE_BANDS_BY_RANGE.get((min_age, max_age)) or AUDIENCE_AGE_BANDS_BY_RANGE.get((min_age, None))
+
+
+def index_audience_ages(audience_ages: list[AudienceAge]) -> dict[str, AudienceAge]:
+    # keyed by band field, the first row of a band wins as it did when bands were looked up by scanning
+    index = {}
+    for audience_age in audience_ages:
+        band = audience_age_band(min_age=audience_age.min_age, max_age=audience_age.max_age)
+        if band is not None:
+            index.setdefault(band.field, audience_age)
+    return index
+
+
+def index_audience_genders(audience_genders: list[AudienceGender]) -> dict[str, AudienceGender]:
+    index = {}
+    for audience_gender in audience_genders:
+        gender_field = AUDIENCE_GENDER_FIELDS.get(audience_gender.gender)
+        if gender_field is not None:
+            index.setdefault(gender_field, audience_gender)
+    return index
+
+
+def profile_audience_ages(profile: Optional[AudienceProfile]) -> list[AudienceAge]:
+    # bands without a split were never written, so a profile holding only genders has no ages
+    if profile is None:
+        return []
+    return [AudienceAge(created=profile.created,
+                        min_age=band.min_age,
+                        max_age=band.max_age,
+                        split=getattr(profile, band.field),
+                        influencer_auth_user_id=profile.influencer_auth_user_id)
+            for band in AUDIENCE_AGE_BANDS if getattr(profile, band.field) is not None]
+
+
+def profile_audience_genders(profile: Optional[AudienceProfile]) -> list[AudienceGender]:
+    if profile is None:
+        return []
+    return [AudienceGender(created=profile.created,
+                           gender=gender,
+                           split=getattr(profile, gender_field),
+                           influencer_auth_user_id=profile.influencer_auth_user_id)
+            for (gender, gender_field) in AUDIENCE_GENDER_FIELDS.items() if getattr(profile, gender_field) is not None]
+
+
 @dataclass(unsafe_hash=True)
 class Listing(DataModel):
     brand_auth_user_id: str = None
@@ -2,6 +2,8 @@ import validators
 from jsonschema.exceptions import ValidationError
 from jsonschema.validators import validate
 
+from src.crosscutting import timed
+
 # TODO: do actual validation and write tests for it
 
 common_user_schema = {
@@ -59,9 +61,92 @@ listing_payload_schema = {
     "required": []
 }
 
+ALLOWED_IMAGE_CONTENT_TYPES = ["image/jpeg", "image/png", "image/gif", "image/webp"]
+MAX_IMAGE_UPLOAD_SIZE = 10 * 1024 * 1024
+
+image_upload_payload_schema = {
+    "type": "object",
+    "properties":
+        {
+            "content_type": {
+                "type": "string",
+                "enum": ALLOWED_IMAGE_CONTENT_TYPES
+            },
+            "content_length": {
+                "type": "integer",
+                "minimum": 1,
+                "maximum": MAX_IMAGE_UPLOAD_SIZE
+            }
+        },
+    "required": ["content_type", "content_length"]
+}
+
+image_upload_confirm_payload_schema = {
+    "type": "object",
+    "properties":
+        {
+            "image_key": {
+                "type": "string",
+                "pattern": "^[^.][^.]*\\.[a-z]+$"
+            }
+        },
+    "required": ["image_key"]
+}
+
+MAX_BATCH_REQUESTS = 20
+
+batch_payload_schema = {
+    "type": "object",
+    "properties":
+        {
+            "requests": {
+                "type": "array",
+                "minItems": 1,
+                "maxItems": MAX_BATCH_REQUESTS,
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "method": {
+                            "type": "string",
+                            "enum": ["GET", "POST", "PATCH", "PUT", "DELETE"]
+                        },
+                        "path": {
+                            "type": "string",
+                            "pattern": "^/"
+                        },
+                        "body": {
+                            "type": ["object", "array"]
+                        }
+                    },
+                    "required": ["method", "path"]
+                }
+            }
+        },
+    "required": ["requests"]
+}
+
+
+class BatchValidator:
+
+    @timed(phase="validation")
+    def validate_batch(self, payload):
+        validate(instance=payload, schema=batch_payload_schema)
+
+
+class ImageUploadValidator:
+
+    @timed(phase="validation")
+    def validate_image_upload(self, payload):
+        validate(instance=payload, schema=image_upload_payload_schema)
+
+    @timed(phase="validation")
+    def validate_image_upload_confirm(self, payload):
+        validate(instance=payload, schema=image_upload_confirm_payload_schema)
+
 
 class ListingValidator:
 
+    @timed(phase="validation")
     def validate_listing(self, payload):
         validate(instance=payload, schema=listing_payload_schema)
 
@@ -79,11 +164,13 @@ class BaseValidator:
 
 class BrandValidator(BaseValidator):
 
+    @timed(phase="validation")
     def validate_brand(self, payload):
         self._common_user_validate(payload=payload, schema_input=brand_payload_schema)
 
 
 class InfluencerValidator(BaseValidator):
 
+    @timed(phase="validation")
     def validate_influencer(self, payload):
         self._common_user_validate(payload=payload, schema_input=influencer_payload_schema)
@@ -15,4 +15,7 @@ class AutoFixtureException(Exception):
 
 
 class AutoMapperException(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class RequestDecodeException(Exception):
+    pass
@@ -1,14 +1,26 @@
+import inspect
+import os
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Union, OrderedDict, Callable, Protocol
+from functools import lru_cache
+from itertools import chain
+from typing import Union, OrderedDict, Callable, Protocol, Optional, Any
 
 from src._types import Serializer, Logger
-from src.crosscutting import valid_uuid
+from src.crosscutting import valid_uuid, server_timing, camel_case_to_snake_case, slotted
+from src.web.compression import COMPRESSION_THRESHOLD_BYTES, negotiate_encoding, compress_for_proxy, buffer_chunks
 
 SUBSEQUENCE = "subsequence"
 
 COMMAND = "command"
 
+PARALLEL_GROUP = "parallel_group"
+
+SERVER_TIMING_HEADER = "x-server-timing"
+SERVER_TIMING_ENVIRONMENT_VARIABLE = "SERVER_TIMING"
+
+FIELDS_QUERY_PARAMETER = "fields"
+
 BRAND_ID_PATH_KEY = 'brand_id'
 INFLUENCER_ID_PATH_KEY = 'influencer_id'
 
@@ -27,6 +39,8 @@ class ErrorCapsule:
 
 
 class PinfluencerResponse:
+    __slots__ = ("status_code", "body")
+
     def __init__(self, status_code: int = 200, body: Union[dict, list] = {}) -> None:
         self.status_code = status_code
         self.body = body
@@ -34,14 +48,35 @@ class PinfluencerResponse:
     def is_ok(self):
         return 200 <= self.status_code < 300
 
-    def as_json(self, serializer: Serializer) -> dict:
+    def as_json(self, serializer: Serializer, accept_encoding: str = "") -> dict:
+        chunks = serializer.serialize_chunks(self.body)
+        with server_timing.measure(phase="serialization"):
+            (head, compressible) = buffer_chunks(chunks=chunks, threshold=COMPRESSION_THRESHOLD_BYTES)
+        headers = {"Content-Type": "application/json",
+                   'Access-Control-Allow-Origin': "*",
+                   "Access-Control-Allow-Headers": "*",
+                   "Access-Control-Allow-Methods": "*"}
+        response = {}
+        encoding = negotiate_encoding(accept_encoding=accept_encoding) if compressible else None
+        if compressible:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding is not None:
+            # the rest of the body is serialized as it is compressed, the uncompressed json is never held whole
+            with server_timing.measure(phase="compression"):
+                body = compress_for_proxy(chunks=chain(head, chunks), encoding=encoding)
+            headers["Content-Encoding"] = encoding
+            response["isBase64Encoded"] = True
+        else:
+            with server_timing.measure(phase="serialization"):
+                body = "".join(chain(head, chunks))
+        if server_timing.enabled:
+            headers["Server-Timing"] = server_timing.header()
+            headers["Timing-Allow-Origin"] = "*"
         return {
             "statusCode": self.status_code,
-            "body": serializer.serialize(self.body),
-            "headers": {"Content-Type": "application/json",
-                        'Access-Control-Allow-Origin': "*",
-                        "Access-Control-Allow-Headers": "*",
-                        "Access-Control-Allow-Methods": "*"},
+            "body": body,
+            "headers": headers,
+            **response
         }
 
     @staticmethod
@@ -57,8 +92,47 @@ def get_cognito_user(event):
     return event['requestContext']['authorizer']['jwt']['claims']['cognito:username']
 
 
-
-
+def server_timing_requested(event: dict) -> bool:
+    if os.environ.get(SERVER_TIMING_ENVIRONMENT_VARIABLE, "").lower() in ["1", "true"]:
+        return True
+    headers = event.get("headers") or {}
+    return str(headers.get(SERVER_TIMING_HEADER, "")).lower() in ["1", "true"]
+
+
+def requested_fields(event: dict) -> Optional[dict]:
+    # ?fields=firstName,brand.brandName becomes {"first_name": None, "brand": {"brand_name": None}},
+    # None meaning the whole value is wanted
+    query = event.get("queryStringParameters") or {}
+    paths = [path.strip() for path in str(query.get(FIELDS_QUERY_PARAMETER) or "").split(",") if path.strip()]
+    if not paths:
+        return None
+    fields = {}
+    for path in paths:
+        node = fields
+        names = [camel_case_to_snake_case(key=name) for name in path.split(".")]
+        for (index, name) in enumerate(names):
+            if name in node and node[name] is None:
+                break
+            if index == len(names) - 1:
+                node[name] = None
+            else:
+                node = node.setdefault(name, {})
+    return fields
+
+
+def project_fields(body, fields: Optional[dict]):
+    if fields is None:
+        return body
+    if isinstance(body, list):
+        return [project_fields(body=item, fields=fields) for item in body]
+    if isinstance(body, dict):
+        return {name: project_fields(body=body[name], fields=nested_fields)
+                for (name, nested_fields) in fields.items()
+                if body.get(name) is not None}
+    return body
+
+
+@slotted
 @dataclass(unsafe_hash=True)
 class PinfluencerContext:
     response: PinfluencerResponse = None,
@@ -70,12 +144,57 @@ class PinfluencerContext:
     id: str = ""
     error_capsule: list[ErrorCapsule] = field(default_factory=list)
     cached_values: OrderedDict = field(default_factory=dict)
+    loaders: dict = field(default_factory=dict)
+    fields: Optional[dict] = None
+    request: Any = None
 
 
 PinfluencerCommand = Callable[[PinfluencerContext], None]
 
+
+@lru_cache(maxsize=1024)
+def function_name(function: Callable) -> str:
+    try:
+        return f"{inspect.getmodule(function).__name__}.{function.__name__}"
+    except Exception:
+        return "anonymous"
+
+
+def command_name(command: PinfluencerCommand) -> str:
+    # bound methods are rebuilt with every container, the function underneath them lives for the whole process,
+    # the cache is bounded as lambdas built inside sequences are new functions every invocation
+    return function_name(getattr(command, "__func__", command))
+
+
+@dataclass(frozen=True)
+class SequencePlan:
+    steps: tuple[tuple[str, Union[PinfluencerCommand, 'ParallelGroup']], ...] = ()
+
+    @property
+    def commands(self) -> tuple[PinfluencerCommand, ...]:
+        commands = []
+        for (_, step) in self.steps:
+            if isinstance(step, ParallelGroup):
+                commands.extend(command for branch in step.branches for command in branch.commands)
+            else:
+                commands.append(step)
+        return tuple(commands)
+
+
+@dataclass(frozen=True)
+class ParallelGroup:
+    branches: tuple[SequencePlan, ...] = ()
+
+    @property
+    def name(self) -> str:
+        return f"parallel[{'|'.join(branch.steps[0][0] for branch in self.branches if branch.steps)}]"
+
+
 class PinfluencerSequenceBuilder(Protocol):
 
+    def compile(self) -> SequencePlan:
+        ...
+
     def generate_sequence(self) -> list[PinfluencerCommand]:
         ...
 
@@ -107,6 +226,7 @@ class FluentSequenceBuilder(ABC):
 
     def __init__(self):
         self.__components: list[(str, PinfluencerSequenceComponent)] = []
+        self.__plan: Optional[SequencePlan] = None
 
     def _add_command(self, command: PinfluencerCommand) -> 'FluentSequenceBuilder':
         self.__components.append((COMMAND, command))
@@ -116,17 +236,40 @@ class FluentSequenceBuilder(ABC):
         self.__components.append((SUBSEQUENCE, sequence_builder))
         return self
 
+    def _add_parallel_group(self, branches: list[list[PinfluencerSequenceComponent]]) -> 'FluentSequenceBuilder':
+        # each branch runs in order on its own context slice, branches must not depend on each other
+        self.__components.append((PARALLEL_GROUP, branches))
+        return self
+
+    def compile(self) -> SequencePlan:
+        if self.__plan is None:
+            self.__components = []
+            self.build()
+            steps = []
+            for (name, component) in self.__components:
+                if name == COMMAND:
+                    steps.append((command_name(command=component), component))
+                if name == SUBSEQUENCE:
+                    sequence_component: PinfluencerSequenceBuilder = component
+                    steps.extend(sequence_component.compile().steps)
+                if name == PARALLEL_GROUP:
+                    group = ParallelGroup(branches=tuple(self.__compile_branch(branch=branch) for branch in component))
+                    steps.append((group.name, group))
+            self.__plan = SequencePlan(steps=tuple(steps))
+        return self.__plan
+
+    @staticmethod
+    def __compile_branch(branch: list[PinfluencerSequenceComponent]) -> SequencePlan:
+        steps = []
+        for component in branch:
+            if isinstance(component, FluentSequenceBuilder):
+                steps.extend(component.compile().steps)
+            else:
+                steps.append((command_name(command=component), component))
+        return SequencePlan(steps=tuple(steps))
+
     def generate_sequence(self) -> list[PinfluencerCommand]:
-        self.build()
-        new_list = []
-        for (name, component) in self.__components:
-            if name == COMMAND:
-                new_list.append(component)
-            if name == SUBSEQUENCE:
-                sequence_component: PinfluencerSequenceBuilder = component
-                commands = sequence_component.generate_sequence()
-                new_list.extend(commands)
-        return new_list
+        return list(self.compile().commands)
 
     @abstractmethod
     def build(self):
@@ -0,0 +1,75 @@
+import base64
+import zlib
+from typing import Optional, Iterable, Iterator
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ACCEPT_ENCODING_HEADER = "accept-encoding"
+
+# bodies smaller than a single packet gain nothing from compression
+COMPRESSION_THRESHOLD_BYTES = 1024
+
+# tuned for dynamic responses, higher levels cost far more cpu for a few percent
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# deflate with a gzip header and trailer
+GZIP_WINDOW_BITS = 16 + zlib.MAX_WBITS
+
+
+def supported_encodings() -> list[str]:
+    # in order of preference when the client weights them equally
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def accepted_encodings(event: dict) -> str:
+    headers = event.get("headers") or {}
+    return str(headers.get(ACCEPT_ENCODING_HEADER) or "")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    weights = {}
+    for token in accept_encoding.split(","):
+        (coding, *parameters) = [part.strip() for part in token.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for parameter in parameters:
+            if parameter.lower().startswith("q="):
+                try:
+                    quality = float(parameter[2:])
+                except ValueError:
+                    quality = 0.0
+        weights[coding.lower()] = quality
+    candidates = [(weights.get(encoding, weights.get("*", 0.0)), -preference, encoding)
+                  for (preference, encoding) in enumerate(supported_encodings())]
+    (quality, _, encoding) = max(candidates)
+    return encoding if quality > 0 else None
+
+
+def buffer_chunks(chunks: Iterator[str], threshold: int) -> tuple[list[str], bool]:
+    # reads just enough of a serialized body to know whether it is worth compressing
+    (head, size) = ([], 0)
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size >= threshold:
+            return head, True
+    return head, False
+
+
+def compress(chunks: Iterable[bytes], encoding: str) -> bytes:
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return b"".join([*(compressor.process(chunk) for chunk in chunks), compressor.finish()])
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, GZIP_WINDOW_BITS)
+    return b"".join([*(compressor.compress(chunk) for chunk in chunks), compressor.flush()])
+
+
+def compress_for_proxy(chunks: Iterable[str], encoding: str) -> str:
+    # the lambda proxy integration only carries text, api gateway decodes it when isBase64Encoded is set
+    return base64.b64encode(compress(chunks=(chunk.encode("utf-8") for chunk in chunks),
+                                     encoding=encoding)).decode("ascii")
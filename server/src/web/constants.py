@@ -1,3 +1,5 @@
 AudienceAgeCacheKey = "audience_age_cache"
 AudienceGenderCacheKey = "audience_gender_cache"
-InfluencerDetailsCacheKey = "influencer_details_cache"
\ No newline at end of file
+InfluencerDetailsCacheKey = "influencer_details_cache"
+AuthUserClaimsLoaderKey = "auth_user_claims_loader"
+S3_URL = "https://pinfluencer-product-images.s3.eu-west-2.amazonaws.com"
@@ -15,6 +15,14 @@ from src.web.views import BrandRequestDto, BrandResponseDto, ImageRequestDto, In
     NotificationResponseDto, AudienceAgeViewDto, AudienceGenderViewDto, BrandListingResponseDto, \
     CollaborationResponseDto, CollaborationInfluencerCreateRequestDto, InfluencerListingResponseDto, \
     CollaborationBrandUpdateRequestDto
+from src.web.writers import EntityJsonWriter
+
+
+class UnitOfWork:
+
+    def __init__(self):
+        # set false by updates that found nothing to change, so the commit is skipped
+        self.changed = True
 
 
 class BaseController:
@@ -31,15 +39,25 @@ class BaseController:
         self._flexi_updater = flexi_updater
         self._mapper = mapper
         self._repository = repository
+        self._writer = EntityJsonWriter(mapper=mapper)
 
     def _get_all(self, context: PinfluencerContext, response) -> None:
         users = self._repository.load_collection()
         context.response.status_code = 200
-        context.response.body = (list(map(lambda x: self._mapper.map_to_dict(_from=x, to=response), users)))
+        context.response.body = (list(map(lambda x: self._mapper.map_to_dict(_from=x, to=response, fields=context.fields), users)))
 
     def get_all(self, context: PinfluencerContext) -> None:
         self._get_all(context=context, response=self._response)
 
+    def _write_all(self, context: PinfluencerContext, response, image_fields: list[str]) -> None:
+        # read path that opts out of response dtos, the body is written as json straight from the entities
+        entities = self._repository.load_collection()
+        context.response.status_code = 200
+        context.response.body = self._writer.write_collection(_from=entities,
+                                                              to=response,
+                                                              image_fields=image_fields,
+                                                              fields=context.fields)
+
     def _generic_update_image_field(self,
                                     context: PinfluencerContext,
                                     response,
@@ -70,7 +88,7 @@ class BaseController:
         try:
             user = self._repository.load_by_id(id_=context.id)
             context.response.status_code = 200
-            context.response.body = self._mapper.map(_from=user, to=response).__dict__
+            context.response.body = self._mapper.map(_from=user, to=response, fields=context.fields).__dict__
             return
         except NotFoundException as e:
             self._logger.log_exception(e)
@@ -78,11 +96,33 @@ class BaseController:
             context.response.status_code = 404
             context.response.body = {}
 
+    def _request_dto(self, context: PinfluencerContext, request):
+        # routes that decode their body straight to the request dto skip mapping it from the dict again
+        if isinstance(context.request, request):
+            return context.request
+        return self._mapper.map_from_dict(_from=context.body, to=request)
+
+    def _write_by_id(self, context: PinfluencerContext, response, image_fields: list[str]) -> None:
+        try:
+            entity = self._repository.load_by_id(id_=context.id)
+            context.response.status_code = 200
+            context.response.body = self._writer.write(_from=entity,
+                                                       to=response,
+                                                       image_fields=image_fields,
+                                                       fields=context.fields)
+        except NotFoundException as e:
+            self._logger.log_exception(e)
+            context.short_circuit = True
+            context.response.status_code = 404
+            context.response.body = {}
+
     @contextmanager
     def _unit_of_work(self):
         try:
-            yield
-            self._repository.save()
+            unit_of_work = UnitOfWork()
+            yield unit_of_work
+            if unit_of_work.changed:
+                self._repository.save()
         except Exception:
             raise
 
@@ -98,14 +138,12 @@ class BaseController:
                         request,
                         response,
                         repo_func: Callable[[], Model]):
-        payload_dict = context.body
-        with self._unit_of_work():
+        with self._unit_of_work() as unit_of_work:
             try:
-                request = self._mapper.map_from_dict(_from=payload_dict,
-                                                     to=request)
+                request = self._request_dto(context=context, request=request)
                 entity_in_db = repo_func()
-                self._flexi_updater.update(request=request,
-                                           object_to_update=entity_in_db)
+                unit_of_work.changed = self._flexi_updater.update(request=request,
+                                                                  object_to_update=entity_in_db)
             except NotFoundException as e:
                 self._logger.log_exception(e)
                 context.short_circuit = True
@@ -122,11 +160,9 @@ class BaseController:
                 request,
                 response):
         auth_user_id = context.auth_user_id
-        payload_dict = context.body
         with self._unit_of_work():
             try:
-                entity = self._mapper.map(_from=self._mapper.map_from_dict(_from=payload_dict,
-                                                                           to=request),
+                entity = self._mapper.map(_from=self._request_dto(context=context, request=request),
                                           to=model)
 
                 entity_to_return = self._repository.write_new_for_auth_user(auth_user_id=auth_user_id, payload=entity)
@@ -162,7 +198,7 @@ class BaseUserController(BaseController):
             try:
                 brand = self._repository.load_for_auth_user(auth_user_id=auth_user_id)
                 context.response.status_code = 200
-                context.response.body = self._mapper.map(_from=brand, to=response).__dict__
+                context.response.body = self._mapper.map(_from=brand, to=response, fields=context.fields).__dict__
                 return
             except NotFoundException as e:
                 self._logger.log_exception(e)
@@ -208,7 +244,15 @@ class BaseOwnerController(BaseUserController):
         children = self._repository.load_for_auth_brand(context.auth_user_id)
         context.response.status_code = 200
         context.response.body = (list(
-            map(lambda x: self._mapper.map_to_dict(_from=x, to=response), children)))
+            map(lambda x: self._mapper.map_to_dict(_from=x, to=response, fields=context.fields), children)))
+
+    def _write_for_auth_user(self, context: PinfluencerContext, response, image_fields: list[str]):
+        children = self._repository.load_for_auth_brand(context.auth_user_id)
+        context.response.status_code = 200
+        context.response.body = self._writer.write_collection(_from=children,
+                                                              to=response,
+                                                              image_fields=image_fields,
+                                                              fields=context.fields)
 
     def _create_for_owner(self,
                           context: PinfluencerContext,
@@ -217,9 +261,7 @@ class BaseOwnerController(BaseUserController):
                           response,
                           model) -> None:
         returned_model = repo_method(self._mapper.map(
-            _from=self._mapper.map_from_dict(
-                _from=context.body,
-                to=request),
+            _from=self._request_dto(context=context, request=request),
             to=model),
             context.auth_user_id)
         self._logger.log_trace(f"{returned_model}")
@@ -256,9 +298,11 @@ class BaseAudienceController(BaseOwnerController):
             context.error_capsule.append(AudienceDataNotFoundErrorCapsule(type=type,
                                                                           auth_user_id=context.auth_user_id))
         else:
-            self._flexi_updater.update(request=self._mapper.map_from_dict(_from=context.body,
-                                                                          to=view),
-                                       object_to_update=audience_splits)
+            if self._flexi_updater.update(request=self._mapper.map_from_dict(_from=context.body,
+                                                                             to=view),
+                                          object_to_update=audience_splits):
+                # the columnar storage folds the splits back into the profile, new bands become rows otherwise
+                self._repository.save_for_influencer(payload=audience_splits, auth_user_id=context.auth_user_id)
             context.response.body = self._mapper.map(_from=audience_splits, to=view).__dict__
 
     def _get_for_influencer(self,
@@ -386,6 +430,12 @@ class ListingController(BaseOwnerController):
     def get_for_brand(self, context: PinfluencerContext) -> None:
         self._get_for_auth_user(context=context, response=ListingResponseDto)
 
+    def write_for_brand(self, context: PinfluencerContext) -> None:
+        self._write_for_auth_user(context=context, response=ListingResponseDto, image_fields=["product_image"])
+
+    def write_by_id(self, context: PinfluencerContext) -> None:
+        self._write_by_id(context=context, response=ListingResponseDto, image_fields=["product_image"])
+
     def update_listing(self, context: PinfluencerContext):
         self._generic_update(context=context,
                              request=ListingRequestDto,
@@ -441,6 +491,9 @@ class InfluencerListingController(BaseController):
                          response=InfluencerListingResponseDto,
                          request=None)
 
+    def write_all(self, context: PinfluencerContext) -> None:
+        self._write_all(context=context, response=InfluencerListingResponseDto, image_fields=[])
+
 
 class BrandListingController(BaseOwnerController):
 
@@ -460,6 +513,9 @@ class BrandListingController(BaseOwnerController):
     def get_for_brand(self, context: PinfluencerContext) -> None:
         self._get_for_auth_user(context=context, response=BrandListingResponseDto)
 
+    def write_for_brand(self, context: PinfluencerContext) -> None:
+        self._write_for_auth_user(context=context, response=BrandListingResponseDto, image_fields=["product_image"])
+
 
 class NotificationController(BaseController):
 
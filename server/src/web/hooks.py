@@ -1,3 +1,5 @@
+import threading
+from dataclasses import fields
 from typing import Any, Callable
 
 from jsonschema.exceptions import ValidationError
@@ -5,18 +7,21 @@ from jsonschema.exceptions import ValidationError
 from src._types import AuthUserRepository, Deserializer, BrandRepository, ImageRepository, Logger, \
     NotificationRepository, AudienceAgeRepository, InfluencerRepository, ListingRepository, Repository, \
     AudienceGenderRepository, CollaborationRepository
-from src.crosscutting import PinfluencerObjectMapper
+from src.crosscutting import PinfluencerObjectMapper, BatchLoader
 from src.domain.models import CategoryEnum, ValueEnum, User
-from src.domain.validation import BrandValidator, InfluencerValidator, ListingValidator
-from src.exceptions import NotFoundException
+from src.domain.validation import BrandValidator, InfluencerValidator, ListingValidator, ImageUploadValidator
+from src.exceptions import NotFoundException, ImageException, RequestDecodeException
 from src.web import PinfluencerContext, valid_path_resource_id, ErrorCapsule
-from src.web.constants import AudienceAgeCacheKey, InfluencerDetailsCacheKey, AudienceGenderCacheKey
+from src.web.constants import AudienceAgeCacheKey, InfluencerDetailsCacheKey, AudienceGenderCacheKey, \
+    AuthUserClaimsLoaderKey, S3_URL
 from src.web.error_capsules import AudienceDataAlreadyExistsErrorCapsule, BrandNotFoundErrorCapsule, \
     InfluencerNotFoundErrorCapsule, ListingNotFoundErrorCapsule, BrandNotAuthorized
+from src.web.writers import image_url, image_variant_urls
 from src.web.views import RawImageRequestDto, ImageRequestDto, ListingResponseDto, NotificationCreateRequestDto, \
-    CollaborationResponseDto
+    CollaborationResponseDto, ImageUploadRequestDto, ImageUploadConfirmRequestDto, BrandRequestDto, \
+    InfluencerRequestDto, ListingRequestDto
 
-S3_URL = "https://pinfluencer-product-images.s3.eu-west-2.amazonaws.com"
+USER_CLAIM_FIELDS = [user_field.name for user_field in fields(User)]
 
 
 class CommonAfterHooks:
@@ -25,6 +30,9 @@ class CommonAfterHooks:
                       context: PinfluencerContext,
                       image_fields: list[str],
                       collection: bool = False):
+        if context.fields is not None:
+            image_fields = [image_field for image_field in image_fields
+                            if image_field in context.fields or f'{image_field}_variants' in context.fields]
         if collection:
             for entity in context.response.body:
                 self.__set_image_fields(entity=entity, fields=image_fields)
@@ -37,7 +45,8 @@ class CommonAfterHooks:
 
     def __set_image(self, entity: dict, field: str):
         if entity[field] is not None:
-            entity[field] = f'{S3_URL}/{entity[field]}'
+            entity[f'{field}_variants'] = image_variant_urls(key=entity[field])
+            entity[field] = image_url(key=entity[field])
 
     def save_response_body_to_cache(self,
                                     context: PinfluencerContext,
@@ -58,7 +67,9 @@ class CommonBeforeHooks:
     def __init__(self, deserializer: Deserializer,
                  image_repo: ImageRepository,
                  object_mapper: PinfluencerObjectMapper,
+                 image_upload_validator: ImageUploadValidator,
                  logger: Logger):
+        self.__image_upload_validator = image_upload_validator
         self.__logger = logger
         self.__object_mapper = object_mapper
         self.__image_repo = image_repo
@@ -80,6 +91,56 @@ class CommonBeforeHooks:
         context.body = ImageRequestDto(image_path=key,
                                        image_field=map_list[context.event['pathParameters']['image_field']]).__dict__
 
+    def create_image_variants(self, context: PinfluencerContext):
+        request: ImageRequestDto = self.__object_mapper.map_from_dict(_from=context.body, to=ImageRequestDto)
+        try:
+            self.__image_repo.create_variants(key=request.image_path)
+        except ImageException:
+            self.__logger.log_error(f"image {request.image_path} could not be processed")
+            context.short_circuit = True
+            context.response.body = {}
+            context.response.status_code = 400
+
+    def create_image_upload(self, context: PinfluencerContext,
+                            path: str):
+        try:
+            self.__image_upload_validator.validate_image_upload(payload=context.body)
+        except ValidationError as e:
+            self.__logger.log_exception(e)
+            context.short_circuit = True
+            context.response.body = {}
+            context.response.status_code = 400
+            return
+        request: ImageUploadRequestDto = self.__object_mapper.map_from_dict(_from=context.body,
+                                                                            to=ImageUploadRequestDto)
+        upload = self.__image_repo.create_upload(path=path,
+                                                 content_type=request.content_type,
+                                                 content_length=request.content_length)
+        context.response.status_code = 200
+        context.response.body = upload.__dict__
+
+    def confirm_image_upload(self, context: PinfluencerContext,
+                             path: str,
+                             map_list: dict):
+        try:
+            self.__image_upload_validator.validate_image_upload_confirm(payload=context.body)
+        except ValidationError as e:
+            self.__logger.log_exception(e)
+            context.short_circuit = True
+            context.response.body = {}
+            context.response.status_code = 400
+            return
+        request: ImageUploadConfirmRequestDto = self.__object_mapper.map_from_dict(_from=context.body,
+                                                                                   to=ImageUploadConfirmRequestDto)
+        if not request.image_key.startswith(f"{path}/") or not self.__image_repo.exists(key=request.image_key):
+            self.__logger.log_error(f"image {request.image_key} has not been uploaded to {path}")
+            context.short_circuit = True
+            context.response.body = {}
+            context.response.status_code = 400
+            return
+        context.body = ImageRequestDto(image_path=request.image_key,
+                                       image_field=map_list[context.event['pathParameters']['image_field']]).__dict__
+
     def map_enum(self, context: PinfluencerContext,
                  key: str,
                  enum_value):
@@ -95,6 +156,18 @@ class CommonBeforeHooks:
     def set_body(self, context: PinfluencerContext):
         context.body = self.__deserializer.deserialize(data=context.event["body"])
 
+    def set_request(self, context: PinfluencerContext,
+                    request):
+        try:
+            context.body = self.__deserializer.deserialize_fields(data=context.event["body"], to=request)
+        except RequestDecodeException as e:
+            self.__logger.log_exception(e)
+            context.short_circuit = True
+            context.response.body = {}
+            context.response.status_code = 400
+            return
+        context.request = request(**context.body)
+
 
 class ListingBeforeHooks:
 
@@ -105,6 +178,9 @@ class ListingBeforeHooks:
         self.__common_before_hooks = common_before_hooks
         self.__listing_validator = listing_validator
 
+    def set_request(self, context: PinfluencerContext):
+        self.__common_before_hooks.set_request(context=context, request=ListingRequestDto)
+
     def map_categories_and_values(self, context: PinfluencerContext):
         self.__common_before_hooks.map_enums(context=context,
                                              key="categories",
@@ -136,6 +212,15 @@ class ListingBeforeHooks:
             "product-image": "product_image"
         })
 
+    def create_image_upload(self, context: PinfluencerContext):
+        self.__common_before_hooks.create_image_upload(path=f"listings/{context.auth_user_id}", context=context)
+
+    def confirm_image_upload(self, context: PinfluencerContext):
+        self.__common_before_hooks.confirm_image_upload(path=f"listings/{context.auth_user_id}", context=context,
+                                                        map_list={
+                                                            "product-image": "product_image"
+                                                        })
+
     def validate_image_key(self, context: PinfluencerContext):
         self.__common_before_hooks.validate_image_path(context=context, possible_paths=["product-image"])
 
@@ -279,6 +364,9 @@ class InfluencerBeforeHooks:
         self.__influencer_repository = influencer_repository
         self.__user_before_hooks = user_before_hooks
 
+    def set_request(self, context: PinfluencerContext):
+        self.__common_before_hooks.set_request(context=context, request=InfluencerRequestDto)
+
     def validate_uuid(self, context: PinfluencerContext):
         id = valid_path_resource_id(event=context.event, resource_key="influencer_id", logger=self.__logger)
         if not id:
@@ -302,6 +390,15 @@ class InfluencerBeforeHooks:
             "image": "image"
         })
 
+    def create_image_upload(self, context: PinfluencerContext):
+        self.__common_before_hooks.create_image_upload(path=f"influencers/{context.auth_user_id}", context=context)
+
+    def confirm_image_upload(self, context: PinfluencerContext):
+        self.__common_before_hooks.confirm_image_upload(path=f"influencers/{context.auth_user_id}", context=context,
+                                                        map_list={
+                                                            "image": "image"
+                                                        })
+
     def validate_image_key(self, context: PinfluencerContext):
         self.__common_before_hooks.validate_image_path(context=context, possible_paths=["image"])
 
@@ -324,6 +421,9 @@ class BrandBeforeHooks:
         self.__brand_repository = brand_repository
         self.__brand_validator = brand_validator
 
+    def set_request(self, context: PinfluencerContext):
+        self.__common_before_hooks.set_request(context=context, request=BrandRequestDto)
+
     def validate_auth_brand(self, context: PinfluencerContext):
         self.__user_before_hooks.validate_owner(context=context,
                                                 repo_method=self.__brand_repository.load_for_auth_user,
@@ -354,6 +454,16 @@ class BrandBeforeHooks:
             "header-image": "header_image"
         })
 
+    def create_image_upload(self, context: PinfluencerContext):
+        self.__common_before_hooks.create_image_upload(path=f"brands/{context.auth_user_id}", context=context)
+
+    def confirm_image_upload(self, context: PinfluencerContext):
+        self.__common_before_hooks.confirm_image_upload(path=f"brands/{context.auth_user_id}", context=context,
+                                                        map_list={
+                                                            "logo": "logo",
+                                                            "header-image": "header_image"
+                                                        })
+
     def validate_image_key(self, context: PinfluencerContext):
         self.__common_before_hooks.validate_image_path(context=context, possible_paths=["logo", "header-image"])
 
@@ -366,17 +476,44 @@ class UserAfterHooks:
         self.__mapper = mapper
         self.__common_after_hooks = common_after_hooks
         self.__auth_user_repository = auth_user_repository
+        self.__loaders_lock = threading.Lock()
 
     def tag_auth_user_claims_to_response(self, context: PinfluencerContext):
+        if not self.__claims_requested(context=context):
+            return
         self._generic_claims_tagger(context.response.body)
 
     def _generic_claims_tagger(self, entity):
+        if self.__has_claims(entity=entity):
+            return
         auth_user = self.__auth_user_repository.get_by_id(_id=entity["auth_user_id"])
         entity.update(auth_user.__dict__)
 
     def tag_auth_user_claims_to_response_collection(self, context: PinfluencerContext):
-        for user in context.response.body:
-            self._generic_claims_tagger(entity=user)
+        if not self.__claims_requested(context=context):
+            return
+        untagged_users = [user for user in context.response.body if not self.__has_claims(entity=user)]
+        auth_users = self.__claims_loader(context=context).load_many(keys=[user["auth_user_id"]
+                                                                           for user in untagged_users])
+        for user, auth_user in zip(untagged_users, auth_users):
+            user.update(auth_user.__dict__)
+
+    def __claims_loader(self, context: PinfluencerContext) -> BatchLoader:
+        # concurrent batched get requests share the loaders of the batch context
+        with self.__loaders_lock:
+            if AuthUserClaimsLoaderKey not in context.loaders:
+                context.loaders[AuthUserClaimsLoaderKey] = BatchLoader(
+                    batch_load=self.__auth_user_repository.get_by_ids)
+            return context.loaders[AuthUserClaimsLoaderKey]
+
+    @staticmethod
+    def __claims_requested(context: PinfluencerContext) -> bool:
+        return context.fields is None or any(claim in context.fields for claim in USER_CLAIM_FIELDS)
+
+    @staticmethod
+    def __has_claims(entity: dict) -> bool:
+        # claims are stored with the user row, cognito is only a fallback for rows written before that
+        return all(entity.get(claim) is not None for claim in USER_CLAIM_FIELDS)
 
 
 class HooksFacade:
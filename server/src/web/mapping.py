@@ -2,16 +2,25 @@ from typing import Union, Optional
 
 from src.crosscutting import PinfluencerObjectMapper, Rule
 from src.domain.models import Brand, Value, Category, Influencer, Listing, AudienceAgeSplit, AudienceAge, \
-    AudienceGenderSplit, GenderEnum, AudienceGender, BrandListing, InfluencerListing
+    AudienceGenderSplit, GenderEnum, AudienceGender, BrandListing, InfluencerListing, AudienceAgeBand, \
+    AUDIENCE_AGE_BANDS, AUDIENCE_GENDER_FIELDS, index_audience_ages, index_audience_genders
 from src.web.views import BrandRequestDto, BrandResponseDto, InfluencerRequestDto, InfluencerResponseDto, \
     ListingRequestDto, ListingResponseDto, AudienceAgeViewDto, AudienceGenderViewDto, BrandListingResponseDto, \
     InfluencerListingResponseDto
 
 
+# hottest pairs on the list endpoints, mapped by generated functions once the rules are added
+COMPILED_MAPPING_PAIRS = [(Brand, BrandResponseDto),
+                          (Influencer, InfluencerResponseDto),
+                          (Listing, ListingResponseDto),
+                          (BrandListing, BrandListingResponseDto)]
+
+
 class MappingRules:
 
-    def __init__(self, mapper: PinfluencerObjectMapper):
+    def __init__(self, mapper: PinfluencerObjectMapper, compiled_pairs=None):
         self.__mapper = mapper
+        self.__compiled_pairs = compiled_pairs if compiled_pairs is not None else COMPILED_MAPPING_PAIRS
 
     @property
     def rules(self) -> list[Rule]:
@@ -165,67 +174,45 @@ class MappingRules:
 
 
     def __add_audience_age_rules(self):
-        self.__mapper.add_rule(_type_from=AudienceAgeViewDto,
-                               _type_to=AudienceAgeSplit,
-                               field='audience_age_13_to_17_split',
-                               expression=self.__map_audience_age_13_to_17_view_to_split)
-        self.__mapper.add_rule(_type_from=AudienceAgeViewDto,
-                               _type_to=AudienceAgeSplit,
-                               field='audience_age_18_to_24_split',
-                               expression=self.__map_audience_age_18_to_24_view_to_split)
-        self.__mapper.add_rule(_type_from=AudienceAgeViewDto,
-                               _type_to=AudienceAgeSplit,
-                               field='audience_age_25_to_34_split',
-                               expression=self.__map_audience_age_25_to_34_view_to_split)
-        self.__mapper.add_rule(_type_from=AudienceAgeViewDto,
-                               _type_to=AudienceAgeSplit,
-                               field='audience_age_35_to_44_split',
-                               expression=self.__map_audience_age_35_to_44_view_to_split)
-        self.__mapper.add_rule(_type_from=AudienceAgeViewDto,
-                               _type_to=AudienceAgeSplit,
-                               field='audience_age_45_to_54_split',
-                               expression=self.__map_audience_age_45_to_54_view_to_split)
-        self.__mapper.add_rule(_type_from=AudienceAgeViewDto,
-                               _type_to=AudienceAgeSplit,
-                               field='audience_age_55_to_64_split',
-                               expression=self.__map_audience_age_55_to_64_view_to_split)
-        self.__mapper.add_rule(_type_from=AudienceAgeViewDto,
-                               _type_to=AudienceAgeSplit,
-                               field='audience_age_65_plus_split',
-                               expression=self.__map_audience_age_65_plus_view_to_split)
+        for band in AUDIENCE_AGE_BANDS:
+            self.__mapper.add_rule(_type_from=AudienceAgeViewDto,
+                                   _type_to=AudienceAgeSplit,
+                                   field=band.field,
+                                   expression=lambda to, _from, band=band: self.__set_age_band(
+                                       audience_split=to, band=band, split=getattr(_from, band.field)))
 
         self.__mapper.add_rule(_type_from=AudienceAgeSplit,
                                _type_to=AudienceAgeViewDto,
                                field='audience_ages',
-                               expression=self.__map_audience_age_view_to_audience_age_split)
+                               expression=self.__map_audience_age_split_to_audience_age_view)
 
         # TODO: workaround for updating
         self.__mapper.add_rule(_type_from=AudienceAgeViewDto,
                                _type_to=AudienceAgeSplit,
                                field='audience_ages',
-                               expression=self.__map_audience_age_split_to_audience_age_view,
+                               expression=self.__map_audience_age_view_to_audience_age_split,
                                update=True)
 
     def __add_audience_gender_rules(self):
-        self.__mapper.add_rule(_type_from=AudienceGenderViewDto,
-                               _type_to=AudienceGenderSplit,
-                               field='audience_male_split',
-                               expression=self.__map_audience_male_view_to_split)
-        self.__mapper.add_rule(_type_from=AudienceGenderViewDto,
-                               _type_to=AudienceGenderSplit,
-                               field='audience_female_split',
-                               expression=self.__map_audience_female_view_to_split)
+        for (gender, gender_field) in AUDIENCE_GENDER_FIELDS.items():
+            self.__mapper.add_rule(_type_from=AudienceGenderViewDto,
+                                   _type_to=AudienceGenderSplit,
+                                   field=gender_field,
+                                   expression=lambda to, _from, gender=gender, gender_field=gender_field:
+                                   self.__set_gender(audience_split=to,
+                                                     gender=gender,
+                                                     split=getattr(_from, gender_field)))
 
         self.__mapper.add_rule(_type_from=AudienceGenderSplit,
                                _type_to=AudienceGenderViewDto,
                                field='audience_genders',
-                               expression=self.__map_audience_gender_view_to_audience_gender_split)
+                               expression=self.__map_audience_gender_split_to_audience_gender_view)
 
         # TODO: workaround for updating
         self.__mapper.add_rule(_type_from=AudienceGenderViewDto,
                                _type_to=AudienceGenderSplit,
                                field='audience_genders',
-                               expression=self.__map_audience_gender_split_to_audience_gender_view,
+                               expression=self.__map_audience_gender_view_to_audience_gender_split,
                                update=True)
 
     def add_rules(self):
@@ -234,6 +221,8 @@ class MappingRules:
         self.__add_listing_rules()
         self.__add_audience_age_rules()
         self.__add_audience_gender_rules()
+        for (_type_from, _type_to) in self.__compiled_pairs:
+            self.__mapper.compile(_type_from=_type_from, _type_to=_type_to)
 
     @staticmethod
     def __map_user_values_to_user_view(
@@ -275,208 +264,54 @@ class MappingRules:
     def __map_categories_view_to_listing(to: Union[Listing, BrandListing], _from: Union[ListingRequestDto, ListingResponseDto, BrandListingResponseDto]):
         to.categories = list(map(lambda x: Category(category=x), _from.categories))
 
-    def __map_audience_male_view_to_split(self,
-                                          to: AudienceGenderSplit,
-                                          _from: AudienceGenderViewDto):
-        if self.__if_gender_in_split(gender=GenderEnum.MALE, audience_split=to):
-            list(filter(lambda x: x.gender == GenderEnum.MALE, to.audience_genders))[
-                0].split = _from.audience_male_split
-        else:
-            to.audience_genders.append(AudienceGender(gender=GenderEnum.MALE, split=_from.audience_male_split))
-
-    def __map_audience_female_view_to_split(self,
-                                            to: AudienceGenderSplit,
-                                            _from: AudienceGenderViewDto):
-        if self.__if_gender_in_split(gender=GenderEnum.FEMALE, audience_split=to):
-            list(filter(lambda x: x.gender == GenderEnum.FEMALE, to.audience_genders))[
-                0].split = _from.audience_female_split
-        else:
-            to.audience_genders.append(AudienceGender(gender=GenderEnum.FEMALE, split=_from.audience_female_split))
-
-    def __map_audience_age_13_to_17_view_to_split(self,
-                                                  to: AudienceAgeSplit,
-                                                  _from: AudienceAgeViewDto):
-        if self.__if_age_band_in_split(min=13, max=17, audience_split=to):
-            list(filter(lambda x: x.min_age == 13 and x.max_age == 17, to.audience_ages))[
-                0].split = _from.audience_age_13_to_17_split
-        else:
-            to.audience_ages.append(AudienceAge(min_age=13, max_age=17, split=_from.audience_age_13_to_17_split))
-
-    def __map_audience_age_18_to_24_view_to_split(self,
-                                                  to: AudienceAgeSplit,
-                                                  _from: AudienceAgeViewDto):
-        if self.__if_age_band_in_split(min=18, max=24, audience_split=to):
-            list(filter(lambda x: x.min_age == 18 and x.max_age == 24, to.audience_ages))[
-                0].split = _from.audience_age_18_to_24_split
-        else:
-            to.audience_ages.append(AudienceAge(min_age=18, max_age=24, split=_from.audience_age_18_to_24_split))
-
-    def __map_audience_age_25_to_34_view_to_split(self,
-                                                  to: AudienceAgeSplit,
-                                                  _from: AudienceAgeViewDto):
-        if self.__if_age_band_in_split(min=25, max=34, audience_split=to):
-            list(filter(lambda x: x.min_age == 25 and x.max_age == 34, to.audience_ages))[
-                0].split = _from.audience_age_25_to_34_split
-        else:
-            to.audience_ages.append(AudienceAge(min_age=25, max_age=34, split=_from.audience_age_18_to_24_split))
-
-    def __map_audience_age_35_to_44_view_to_split(self,
-                                                  to: AudienceAgeSplit,
-                                                  _from: AudienceAgeViewDto):
-        if self.__if_age_band_in_split(min=35, max=44, audience_split=to):
-            list(filter(lambda x: x.min_age == 35 and x.max_age == 44, to.audience_ages))[
-                0].split = _from.audience_age_35_to_44_split
-        else:
-            to.audience_ages.append(AudienceAge(min_age=35, max_age=44, split=_from.audience_age_35_to_44_split))
-
-    def __map_audience_age_45_to_54_view_to_split(self,
-                                                  to: AudienceAgeSplit,
-                                                  _from: AudienceAgeViewDto):
-        if self.__if_age_band_in_split(min=45, max=54, audience_split=to):
-            list(filter(lambda x: x.min_age == 45 and x.max_age == 54, to.audience_ages))[
-                0].split = _from.audience_age_45_to_54_split
-        else:
-            to.audience_ages.append(AudienceAge(min_age=45, max_age=54, split=_from.audience_age_45_to_54_split))
-
-    def __map_audience_age_55_to_64_view_to_split(self,
-                                                  to: AudienceAgeSplit,
-                                                  _from: AudienceAgeViewDto):
-        if self.__if_age_band_in_split(min=55, max=64, audience_split=to):
-            list(filter(lambda x: x.min_age == 55 and x.max_age == 64, to.audience_ages))[
-                0].split = _from.audience_age_55_to_64_split
+    @staticmethod
+    def __set_age_band(audience_split: AudienceAgeSplit, band: AudienceAgeBand, split: float,
+                       index: Optional[dict[str, AudienceAge]] = None):
+        index = index if index is not None else index_audience_ages(audience_split.audience_ages)
+        audience_age = index.get(band.field)
+        if audience_age is not None:
+            audience_age.split = split
         else:
-            to.audience_ages.append(AudienceAge(min_age=55, max_age=64, split=_from.audience_age_55_to_64_split))
+            audience_split.audience_ages.append(AudienceAge(min_age=band.min_age, max_age=band.max_age, split=split))
 
-    def __map_audience_age_65_plus_view_to_split(self,
-                                                 to: AudienceAgeSplit,
-                                                 _from: AudienceAgeViewDto):
-        if self.__if_age_band_in_split(min=65, max=None, audience_split=to):
-            list(filter(lambda x: x.min_age == 65, to.audience_ages))[0].split = _from.audience_age_65_plus_split
+    @staticmethod
+    def __set_gender(audience_split: AudienceGenderSplit, gender: GenderEnum, split: float,
+                     index: Optional[dict[str, AudienceGender]] = None):
+        index = index if index is not None else index_audience_genders(audience_split.audience_genders)
+        audience_gender = index.get(AUDIENCE_GENDER_FIELDS[gender])
+        if audience_gender is not None:
+            audience_gender.split = split
         else:
-            to.audience_ages.append(AudienceAge(min_age=65, split=_from.audience_age_65_plus_split))
+            audience_split.audience_genders.append(AudienceGender(gender=gender, split=split))
 
-    def __map_audience_gender_view_to_audience_gender_split(self,
-                                                            to: AudienceGenderViewDto,
+    @staticmethod
+    def __map_audience_gender_split_to_audience_gender_view(to: AudienceGenderViewDto,
                                                             _from: AudienceGenderSplit):
-        to.audience_male_split = list(filter(
-            lambda x: x.gender == GenderEnum.MALE, _from.audience_genders)
-        )[0].split
-
-        to.audience_female_split = list(filter(
-            lambda x: x.gender == GenderEnum.FEMALE, _from.audience_genders)
-        )[0].split
+        # genders missing from the split are left unset
+        for (gender_field, audience_gender) in index_audience_genders(_from.audience_genders).items():
+            setattr(to, gender_field, audience_gender.split)
 
-    def __map_audience_gender_split_to_audience_gender_view(self,
+    def __map_audience_gender_view_to_audience_gender_split(self,
                                                             to: AudienceGenderSplit,
                                                             _from: AudienceGenderViewDto):
-        if self.__if_gender_in_split(gender=GenderEnum.FEMALE, audience_split=to):
-            list(filter(lambda x: x.gender == GenderEnum.FEMALE, to.audience_genders))[
-                0].split = _from.audience_female_split
-        else:
-            to.audience_genders.append(AudienceGender(gender=GenderEnum.FEMALE, split=_from.audience_female_split))
-
-        if self.__if_gender_in_split(gender=GenderEnum.MALE, audience_split=to):
-            list(filter(lambda x: x.gender == GenderEnum.MALE, to.audience_genders))[
-                0].split = _from.audience_male_split
-        else:
-            to.audience_genders.append(AudienceGender(gender=GenderEnum.MALE, split=_from.audience_male_split))
+        index = index_audience_genders(to.audience_genders)
+        for (gender, gender_field) in AUDIENCE_GENDER_FIELDS.items():
+            split = getattr(_from, gender_field)
+            if split is not None:
+                self.__set_gender(audience_split=to, gender=gender, split=split, index=index)
 
-    def __map_audience_age_view_to_audience_age_split(self,
-                                                      to: AudienceAgeViewDto,
+    @staticmethod
+    def __map_audience_age_split_to_audience_age_view(to: AudienceAgeViewDto,
                                                       _from: AudienceAgeSplit):
+        # bands missing from the split are left unset
+        for (band_field, audience_age) in index_audience_ages(_from.audience_ages).items():
+            setattr(to, band_field, audience_age.split)
 
-        to.audience_age_13_to_17_split = list(filter(
-            lambda x: x.min_age == 13 and x.max_age == 17, _from.audience_ages)
-        )[0].split
-
-        to.audience_age_18_to_24_split = list(filter(
-            lambda x: x.min_age == 18 and x.max_age == 24, _from.audience_ages)
-        )[0].split
-
-        to.audience_age_25_to_34_split = list(filter(
-            lambda x: x.min_age == 25 and x.max_age == 34, _from.audience_ages)
-        )[0].split
-
-        to.audience_age_35_to_44_split = list(filter(
-            lambda x: x.min_age == 35 and x.max_age == 44, _from.audience_ages)
-        )[0].split
-
-        to.audience_age_45_to_54_split = list(filter(
-            lambda x: x.min_age == 45 and x.max_age == 54, _from.audience_ages)
-        )[0].split
-
-        to.audience_age_55_to_64_split = list(filter(
-            lambda x: x.min_age == 55 and x.max_age == 64, _from.audience_ages)
-        )[0].split
-
-        to.audience_age_65_plus_split = list(filter(
-            lambda x: x.min_age == 65, _from.audience_ages)
-        )[0].split
-
-    def __map_audience_age_split_to_audience_age_view(self,
+    def __map_audience_age_view_to_audience_age_split(self,
                                                       to: AudienceAgeSplit,
                                                       _from: AudienceAgeViewDto):
-
-        if _from.audience_age_13_to_17_split != None:
-            if self.__if_age_band_in_split(min=13, max=17, audience_split=to):
-                list(filter(lambda x: x.min_age == 13 and x.max_age == 17, to.audience_ages))[
-                    0].split = _from.audience_age_13_to_17_split
-            else:
-                to.audience_ages.append(AudienceAge(min_age=13, max_age=17, split=_from.audience_age_13_to_17_split))
-
-        if _from.audience_age_18_to_24_split != None:
-            if self.__if_age_band_in_split(min=18, max=24, audience_split=to):
-                list(filter(lambda x: x.min_age == 18 and x.max_age == 24, to.audience_ages))[
-                    0].split = _from.audience_age_18_to_24_split
-            else:
-                to.audience_ages.append(AudienceAge(min_age=18, max_age=24, split=_from.audience_age_18_to_24_split))
-
-        if _from.audience_age_25_to_34_split != None:
-            if self.__if_age_band_in_split(min=25, max=34, audience_split=to):
-                list(filter(lambda x: x.min_age == 25 and x.max_age == 34, to.audience_ages))[
-                    0].split = _from.audience_age_25_to_34_split
-            else:
-                to.audience_ages.append(AudienceAge(min_age=25, max_age=34, split=_from.audience_age_18_to_24_split))
-
-        if _from.audience_age_35_to_44_split != None:
-            if self.__if_age_band_in_split(min=35, max=44, audience_split=to):
-                list(filter(lambda x: x.min_age == 35 and x.max_age == 44, to.audience_ages))[
-                    0].split = _from.audience_age_35_to_44_split
-            else:
-                to.audience_ages.append(AudienceAge(min_age=35, max_age=44, split=_from.audience_age_35_to_44_split))
-
-        if _from.audience_age_45_to_54_split != None:
-            if self.__if_age_band_in_split(min=45, max=54, audience_split=to):
-                list(filter(lambda x: x.min_age == 45 and x.max_age == 54, to.audience_ages))[
-                    0].split = _from.audience_age_45_to_54_split
-            else:
-                to.audience_ages.append(AudienceAge(min_age=45, max_age=54, split=_from.audience_age_45_to_54_split))
-
-        if _from.audience_age_55_to_64_split != None:
-            if self.__if_age_band_in_split(min=55, max=64, audience_split=to):
-                list(filter(lambda x: x.min_age == 55 and x.max_age == 64, to.audience_ages))[
-                    0].split = _from.audience_age_55_to_64_split
-            else:
-                to.audience_ages.append(AudienceAge(min_age=55, max_age=64, split=_from.audience_age_55_to_64_split))
-
-        if _from.audience_age_65_plus_split != None:
-            if self.__if_age_band_in_split(min=65, max=None, audience_split=to):
-                list(filter(lambda x: x.min_age == 65, to.audience_ages))[0].split = _from.audience_age_65_plus_split
-            else:
-                to.audience_ages.append(AudienceAge(min_age=65, split=_from.audience_age_65_plus_split))
-
-    @staticmethod
-    def __if_age_band_in_split(min: int, max: Optional[int], audience_split: AudienceAgeSplit) -> bool:
-        if len(list(filter(
-                lambda x: x.min_age == min and x.max_age == max, audience_split.audience_ages
-        ))) > 0:
-            return True
-        return False
-
-    @staticmethod
-    def __if_gender_in_split(gender: GenderEnum, audience_split: AudienceGenderSplit) -> bool:
-        if len(list(filter(
-                lambda x: x.gender == gender, audience_split.audience_genders
-        ))) > 0:
-            return True
-        return False
+        index = index_audience_ages(to.audience_ages)
+        for band in AUDIENCE_AGE_BANDS:
+            split = getattr(_from, band.field)
+            if split is not None:
+                self.__set_age_band(audience_split=to, band=band, split=split, index=index)
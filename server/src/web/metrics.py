@@ -0,0 +1,75 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable
+
+METRICS_NAMESPACE = "Pinfluencer"
+ROUTE_DIMENSION = "Route"
+TOTAL_METRIC = "total"
+
+# cloudwatch rejects embedded metric records that declare more than 100 metrics
+MAX_METRICS_PER_RECORD = 100
+
+# upper bounds in milliseconds, anything slower lands in the last bucket
+HISTOGRAM_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class LatencyHistogram:
+
+    def __init__(self):
+        self.__counts = [0] * len(HISTOGRAM_BUCKETS_MS)
+
+    def record(self, milliseconds: float):
+        self.__counts[min(bisect_left(HISTOGRAM_BUCKETS_MS, milliseconds), len(HISTOGRAM_BUCKETS_MS) - 1)] += 1
+
+    @property
+    def count(self) -> int:
+        return sum(self.__counts)
+
+    def as_values_and_counts(self) -> dict:
+        buckets = [(bucket, count) for (bucket, count) in zip(HISTOGRAM_BUCKETS_MS, self.__counts) if count]
+        return {"Values": [bucket for (bucket, _) in buckets],
+                "Counts": [count for (_, count) in buckets]}
+
+
+class PipelineMetrics:
+
+    def __init__(self, sink: Callable[[str], None] = print,
+                 clock: Callable[[], float] = time.perf_counter,
+                 namespace: str = METRICS_NAMESPACE):
+        self.__sink = sink
+        self.__clock = clock
+        self.__namespace = namespace
+        self.__histograms: dict[str, dict[str, LatencyHistogram]] = {}
+        self.__lock = threading.Lock()
+
+    def now(self) -> float:
+        return self.__clock()
+
+    def record(self, route: str, command: str, started: float):
+        milliseconds = (self.__clock() - started) * 1000
+        # commands in parallel groups record from executor threads
+        with self.__lock:
+            self.__histograms.setdefault(route, {}).setdefault(command, LatencyHistogram()).record(milliseconds)
+
+    def emit(self, timestamp: float = None):
+        timestamp = timestamp if timestamp is not None else time.time()
+        for (route, histograms) in self.__histograms.items():
+            names = list(histograms.keys())
+            for start in range(0, len(names), MAX_METRICS_PER_RECORD):
+                chunk = names[start:start + MAX_METRICS_PER_RECORD]
+                record = {
+                    "_aws": {
+                        "Timestamp": int(timestamp * 1000),
+                        "CloudWatchMetrics": [{
+                            "Namespace": self.__namespace,
+                            "Dimensions": [[ROUTE_DIMENSION]],
+                            "Metrics": [{"Name": name, "Unit": "Milliseconds"} for name in chunk]
+                        }]
+                    },
+                    ROUTE_DIMENSION: route
+                }
+                record.update({name: histograms[name].as_values_and_counts() for name in chunk})
+                self.__sink(json.dumps(record))
+        self.__histograms = {}
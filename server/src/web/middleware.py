@@ -1,27 +1,89 @@
-import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor, Executor
+from dataclasses import replace
+from functools import partial
+from typing import Optional, Callable
 
-from src._types import Logger
-from src.web import PinfluencerContext, PinfluencerSequenceBuilder
+from src._types import Logger, DataManager
+from src.web import PinfluencerContext, PinfluencerSequenceBuilder, PinfluencerResponse, SequencePlan, \
+    ParallelGroup, project_fields
+from src.web.metrics import PipelineMetrics, TOTAL_METRIC
+
+PARALLEL_GROUP_MAX_WORKERS = 8
+
+shared_executor: Optional[Executor] = None
+
+# branches of a group run on executor threads, nested groups run inline there so the bounded pool cannot deadlock
+branch_thread = threading.local()
+
+
+def parallel_group_executor() -> Executor:
+    global shared_executor
+    if shared_executor is None:
+        shared_executor = ThreadPoolExecutor(max_workers=PARALLEL_GROUP_MAX_WORKERS,
+                                             thread_name_prefix="parallel-group")
+    return shared_executor
+
+
+def run_as_branch(function: Callable[[], None], data_manager: DataManager = None):
+    branch_thread.active = True
+    try:
+        function()
+    finally:
+        branch_thread.active = False
+        # executor threads outlive the request, so the session this branch opened is closed with it
+        if data_manager is not None:
+            data_manager.remove_session()
+
+
+def run_concurrently(functions: list[Callable[[], None]], executor: Executor = None,
+                     data_manager: DataManager = None):
+    if getattr(branch_thread, "active", False) or len(functions) < 2:
+        for function in functions:
+            function()
+        return
+    executor = executor if executor is not None else parallel_group_executor()
+    futures = [executor.submit(run_as_branch, function, data_manager) for function in functions]
+    for future in futures:
+        future.result()
 
 
 class MiddlewarePipeline:
 
-    def __init__(self, logger: Logger):
+    def __init__(self, logger: Logger, metrics=None, executor=None, data_manager: DataManager = None):
         self.__logger = logger
+        self.__metrics: PipelineMetrics = metrics if metrics is not None else PipelineMetrics(sink=lambda record: None)
+        self.__executor = executor
+        self.__data_manager = data_manager
+
+    def emit_metrics(self):
+        self.__metrics.emit()
+
+    def execute_concurrently(self, functions: list[Callable[[], None]]):
+        run_concurrently(functions=functions, executor=self.__executor, data_manager=self.__data_manager)
 
     def execute_middleware(self, context: PinfluencerContext,
                            sequence: PinfluencerSequenceBuilder):
-        middleware = sequence.generate_sequence()
-        for action in middleware:
-            name = "anonymous"
-            try:
-                name = f"{inspect.getmodule(action).__name__}.{action.__name__}"
-            except Exception:
-                ...
+        plan = sequence.compile()
+        pipeline_started = self.__metrics.now()
+        self.__execute_plan(context=context, plan=plan)
+        if context.fields is not None and context.response.is_ok():
+            context.response.body = project_fields(body=context.response.body, fields=context.fields)
+        self.__metrics.record(route=context.route_key, command=TOTAL_METRIC, started=pipeline_started)
+
+    def __execute_plan(self, context: PinfluencerContext, plan: SequencePlan):
+        for (name, action) in plan.steps:
             self.__logger.log_debug(f"begin middleware {name}")
             self.__logger.log_trace(f"request {context.body}")
             self.__logger.log_trace(f"response {context.response.body}")
-            action(context)
+            started = self.__metrics.now()
+            try:
+                if isinstance(action, ParallelGroup):
+                    self.__execute_group(context=context, group=action)
+                else:
+                    action(context)
+            finally:
+                self.__metrics.record(route=context.route_key, command=name, started=started)
             if any(context.error_capsule):
                 error = context.error_capsule[-1]
                 self.__logger.log_error(f"error found in error capsule {type(error).__name__}")
@@ -32,3 +94,37 @@ class MiddlewarePipeline:
             if context.short_circuit:
                 self.__logger.log_error(f"middleware SHORTED!")
                 break
+
+    def __execute_group(self, context: PinfluencerContext, group: ParallelGroup):
+        slices = [self.__slice(context=context) for _ in group.branches]
+        self.execute_concurrently(functions=[partial(self.__execute_plan, context_slice, branch)
+                                             for (branch, context_slice) in zip(group.branches, slices)])
+        self.__merge(context=context, slices=slices)
+
+    @staticmethod
+    def __slice(context: PinfluencerContext) -> PinfluencerContext:
+        return replace(context,
+                       response=PinfluencerResponse(status_code=context.response.status_code,
+                                                    body=context.response.body),
+                       short_circuit=False,
+                       error_capsule=[],
+                       cached_values=dict(context.cached_values))
+
+    @staticmethod
+    def __merge(context: PinfluencerContext, slices: list[PinfluencerContext]):
+        # applied in declaration order, stopping at the first branch that shorted,
+        # so the context ends up as it would have after running the branches one after another
+        (status_code, body) = (context.response.status_code, context.response.body)
+        fields = {field: getattr(context, field) for field in ["body", "id", "auth_user_id"]}
+        for context_slice in slices:
+            context.cached_values.update(context_slice.cached_values)
+            context.error_capsule.extend(context_slice.error_capsule)
+            for (field, value) in fields.items():
+                if getattr(context_slice, field) is not value:
+                    setattr(context, field, getattr(context_slice, field))
+            if context_slice.response.body is not body or context_slice.response.status_code != status_code:
+                context.response.status_code = context_slice.response.status_code
+                context.response.body = context_slice.response.body
+            if context_slice.short_circuit:
+                context.short_circuit = True
+                break
@@ -1,7 +1,17 @@
-from collections import OrderedDict
+import json
+from dataclasses import dataclass, field
+from functools import partial
+from types import MappingProxyType
+from typing import Mapping, Type, Optional, Iterator
+from urllib.parse import urlsplit, parse_qsl
+
+from jsonschema.exceptions import ValidationError
 
 from src import ServiceLocator
-from src.web import Route
+from src._types import Logger
+from src.domain.validation import BatchValidator
+from src.web import Route, FluentSequenceBuilder, PinfluencerContext, PinfluencerResponse, requested_fields
+from src.web.middleware import MiddlewarePipeline
 from src.web.sequences import UpdateListingSequenceBuilder, UpdateImageForListingSequenceBuilder, \
     NotImplementedSequenceBuilder, CreateListingSequenceBuilder, GetListingByIdSequenceBuilder, \
     UpdateInfluencerImageSequenceBuilder, UpdateInfluencerSequenceBuilder, \
@@ -13,167 +23,389 @@ from src.web.sequences import UpdateListingSequenceBuilder, UpdateImageForListin
     GetAudienceGenderSequenceBuilder, UpdateAudienceGenderSequenceBuilder, CreateInfluencerProfileSequenceBuilder, \
     GetInfluencerProfileSequenceBuilder, UpdateInfluencerProfileSequenceBuilder, \
     GetBrandListingsForBrandSequenceBuilder, CreateCollaborationForInfluencerSequenceBuilder, \
-    GetListingsForInfluencerSequenceBuilder
+    GetListingsForInfluencerSequenceBuilder, CreateImageUploadForListingSequenceBuilder, \
+    ConfirmImageUploadForListingSequenceBuilder, CreateInfluencerImageUploadSequenceBuilder, \
+    ConfirmInfluencerImageUploadSequenceBuilder, CreateBrandImageUploadSequenceBuilder, \
+    ConfirmBrandImageUploadSequenceBuilder
+
+BATCH_ROUTE = 'POST /batch'
+
+
+@dataclass(frozen=True)
+class RouteMatch:
+    route_key: str
+    path_parameters: dict = field(default_factory=dict)
+
+
+class RouteNode:
+
+    def __init__(self):
+        self.literals: dict[str, 'RouteNode'] = {}
+        self.parameter: Optional['RouteNode'] = None
+        self.routes: dict[str, tuple[str, tuple[str, ...]]] = {}
+
+
+class RouteMatcher:
+
+    def __init__(self, route_keys):
+        self.__root = RouteNode()
+        for route_key in route_keys:
+            self.__add(route_key=route_key)
+
+    def __add(self, route_key: str):
+        (method, path) = route_key.split(" ", 1)
+        node = self.__root
+        parameter_names = []
+        for segment in self.__segments(path=path):
+            if segment.startswith("{") and segment.endswith("}"):
+                parameter_names.append(segment[1:-1])
+                if node.parameter is None:
+                    node.parameter = RouteNode()
+                node = node.parameter
+            else:
+                node = node.literals.setdefault(segment, RouteNode())
+        node.routes[method.upper()] = (route_key, tuple(parameter_names))
+
+    def match(self, method: str, path: str) -> Optional[RouteMatch]:
+        segments = self.__segments(path=path)
+        match = self.__match(node=self.__root, segments=segments, index=0, values=[], method=method.upper())
+        if match is None:
+            return None
+        ((route_key, parameter_names), values) = match
+        return RouteMatch(route_key=route_key, path_parameters=dict(zip(parameter_names, values)))
+
+    def __match(self, node: RouteNode, segments: list[str], index: int, values: list[str], method: str):
+        if index == len(segments):
+            return (node.routes[method], values) if method in node.routes else None
+        segment = segments[index]
+        # literal segments win over parameters, so /brands/me is never captured as a brand_id
+        if segment in node.literals:
+            match = self.__match(node=node.literals[segment], segments=segments, index=index + 1,
+                                 values=values, method=method)
+            if match is not None:
+                return match
+        if node.parameter is not None and segment:
+            return self.__match(node=node.parameter, segments=segments, index=index + 1,
+                                values=[*values, segment], method=method)
+        return None
+
+    @staticmethod
+    def __segments(path: str) -> list[str]:
+        return path.strip("/").split("/") if path.strip("/") else []
+
+
+class RouteTable(Mapping):
+
+    def __init__(self, service_locator: ServiceLocator):
+        self.__service_locator = service_locator
+        self.__resolved: dict[str, Route] = {}
+
+    def __getitem__(self, route_key: str) -> Route:
+        if route_key not in self.__resolved:
+            self.__resolved[route_key] = Route(sequence_builder=self.__service_locator.locate(ROUTES[route_key]))
+        return self.__resolved[route_key]
+
+    def __contains__(self, route_key) -> bool:
+        return route_key in ROUTES
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(ROUTES)
+
+    def __len__(self) -> int:
+        return len(ROUTES)
 
 
 class Dispatcher:
     def __init__(self, service_locator: ServiceLocator):
-        self.__service_locator = service_locator
+        self.__routes = RouteTable(service_locator=service_locator)
 
     @property
-    def dispatch_route_to_ctr(self) -> dict[dict[str, Route]]:
-        feed_routes = OrderedDict(
-            {
-                'GET /feed':
-                    Route(sequence_builder=self.__service_locator.locate(NotImplementedSequenceBuilder))
-            }
-        )
+    def dispatch_route_to_ctr(self) -> Mapping[str, Route]:
+        return self.__routes
+
+
+class BatchDispatcher:
+
+    def __init__(self, dispatcher: Dispatcher,
+                 middleware: MiddlewarePipeline,
+                 batch_validator: BatchValidator,
+                 logger: Logger):
+        self.__dispatcher = dispatcher
+        self.__middleware = middleware
+        self.__batch_validator = batch_validator
+        self.__logger = logger
+
+    def validate_batch(self, context: PinfluencerContext):
+        # sub request bodies are forwarded untouched, each sub request deserializes its own body
+        try:
+            context.body = json.loads(context.event["body"])
+            self.__batch_validator.validate_batch(payload=context.body)
+        except (ValueError, TypeError, ValidationError) as e:
+            self.__logger.log_exception(e)
+            context.short_circuit = True
+            context.response.body = {}
+            context.response.status_code = 400
+
+    def dispatch_batch(self, context: PinfluencerContext):
+        requests = context.body["requests"]
+        responses = [{}] * len(requests)
+        matches = [self.__match(request=request) for request in requests]
+        for match in matches:
+            if match is not None:
+                self.__dispatcher.dispatch_route_to_ctr[match.route_key].sequence_builder.compile()
+
+        def dispatch(index: int):
+            responses[index] = self.__dispatch(context=context, request=requests[index], match=matches[index])
+
+        # reads before the first write run concurrently, each on its executor thread's own session. once something
+        # has been written every sub request runs in order on this thread's session, so reads see the writes before them
+        reads = []
+        written = False
+        for (index, request) in enumerate(requests):
+            if request["method"] == "GET" and not written:
+                reads.append(partial(dispatch, index))
+                continue
+            self.__middleware.execute_concurrently(functions=reads)
+            reads = []
+            written = written or request["method"] != "GET"
+            dispatch(index)
+        self.__middleware.execute_concurrently(functions=reads)
+        context.response.status_code = 200
+        context.response.body = {"responses": responses}
+
+    @staticmethod
+    def __match(request: dict) -> Optional[RouteMatch]:
+        match = route_matcher.match(method=request["method"], path=urlsplit(request["path"]).path)
+        if match is None or match.route_key == BATCH_ROUTE:
+            return None
+        return match
+
+    def __dispatch(self, context: PinfluencerContext, request: dict, match: Optional[RouteMatch]) -> dict:
+        if match is None:
+            return {"status_code": 404, "body": {"message": f"route: {request['method']} {request['path']} not found"}}
+        url = urlsplit(request["path"])
+        event = {**context.event,
+                 "routeKey": match.route_key,
+                 "rawPath": url.path,
+                 "rawQueryString": url.query,
+                 "queryStringParameters": dict(parse_qsl(url.query)) or None,
+                 "pathParameters": match.path_parameters,
+                 "body": json.dumps(request["body"]) if "body" in request else ""}
+        sub_context = PinfluencerContext(response=PinfluencerResponse(),
+                                         short_circuit=False,
+                                         event=event,
+                                         body={},
+                                         auth_user_id="",
+                                         route_key=match.route_key,
+                                         loaders=context.loaders,
+                                         fields=requested_fields(event=event))
+        try:
+            self.__middleware.execute_middleware(context=sub_context,
+                                                 sequence=self.__dispatcher.dispatch_route_to_ctr[
+                                                     match.route_key].sequence_builder)
+        except Exception as e:
+            self.__logger.log_exception(e)
+            sub_context.response = PinfluencerResponse.as_500_error()
+        return {"status_code": sub_context.response.status_code, "body": sub_context.response.body}
+
+
+class BatchSequenceBuilder(FluentSequenceBuilder):
+
+    def __init__(self, batch_dispatcher: BatchDispatcher):
+        super().__init__()
+        self.__batch_dispatcher = batch_dispatcher
+
+    def build(self):
+        self._add_command(command=self.__batch_dispatcher.validate_batch)\
+            ._add_command(command=self.__batch_dispatcher.dispatch_batch)
+
+
+FEED_ROUTES = {
+    'GET /feed':
+        NotImplementedSequenceBuilder
+}
+
+USER_ROUTES = {
+    'GET /brands':
+        GetAllBrandsSequenceBuilder,
+
+    'GET /influencers':
+        GetAllInfluencersSequenceBuilder,
+
+    'GET /brands/{brand_id}':
+        GetBrandByIdSequenceBuilder,
+
+    'GET /influencers/{influencer_id}':
+        GetInfluencerByIdSequenceBuilder,
+
+    # authenticated brand endpoints
+    'GET /brands/me':
+        GetAuthBrandSequenceBuilder,
+
+    'POST /brands/me':
+        CreateBrandSequenceBuilder,
+
+    'PATCH /brands/me':
+        UpdateBrandSequenceBuilder,
+
+    'POST /brands/me/images/{image_field}':
+        UpdateBrandImageSequenceBuilder,
+
+    'POST /brands/me/images/{image_field}/upload-url':
+        CreateBrandImageUploadSequenceBuilder,
+
+    'POST /brands/me/images/{image_field}/confirm':
+        ConfirmBrandImageUploadSequenceBuilder,
+
+    # authenticated influencer endpoints
+    'GET /influencers/me':
+        GetAuthInfluencerSequenceBuilder,
+
+    'POST /influencers/me':
+        CreateInfluencerSequenceBuilder,
 
-        user_routes = OrderedDict(
-            {
-                'GET /brands':
-                    Route(sequence_builder=self.__service_locator.locate(GetAllBrandsSequenceBuilder)),
+    'PATCH /influencers/me':
+        UpdateInfluencerSequenceBuilder,
 
-                'GET /influencers':
-                    Route(sequence_builder=self.__service_locator.locate(GetAllInfluencersSequenceBuilder)),
+    'POST /influencers/me/images/{image_field}':
+        UpdateInfluencerImageSequenceBuilder,
 
-                'GET /brands/{brand_id}':
-                    Route(sequence_builder=self.__service_locator.locate(GetBrandByIdSequenceBuilder)),
+    'POST /influencers/me/images/{image_field}/upload-url':
+        CreateInfluencerImageUploadSequenceBuilder,
 
-                'GET /influencers/{influencer_id}':
-                    Route(sequence_builder=self.__service_locator.locate(GetInfluencerByIdSequenceBuilder)),
+    'POST /influencers/me/images/{image_field}/confirm':
+        ConfirmInfluencerImageUploadSequenceBuilder
+}
 
-                # authenticated brand endpoints
-                'GET /brands/me':
-                    Route(sequence_builder=self.__service_locator.locate(GetAuthBrandSequenceBuilder)),
+LISTING_ROUTES = {
+    'GET /brands/me/listings':
+        GetBrandListingsForBrandSequenceBuilder,
 
-                'POST /brands/me':
-                    Route(sequence_builder=self.__service_locator.locate(CreateBrandSequenceBuilder)),
+    'GET /influencers/me/listings':
+        GetListingsForInfluencerSequenceBuilder,
 
-                'PATCH /brands/me':
-                    Route(sequence_builder=self.__service_locator.locate(UpdateBrandSequenceBuilder)),
+    'DELETE /brands/me/listings/{listing_id}':
+        NotImplementedSequenceBuilder,
 
-                'POST /brands/me/images/{image_field}':
-                    Route(sequence_builder=self.__service_locator.locate(UpdateBrandImageSequenceBuilder)),
+    'GET /listings/{listing_id}':
+        GetListingByIdSequenceBuilder,
 
-                # authenticated influencer endpoints
-                'GET /influencers/me':
-                    Route(sequence_builder=self.__service_locator.locate(GetAuthInfluencerSequenceBuilder)),
+    'POST /brands/me/listings':
+        CreateListingSequenceBuilder,
 
-                'POST /influencers/me':
-                    Route(self.__service_locator.locate(CreateInfluencerSequenceBuilder)),
+    'PATCH /brands/me/listings/{listing_id}':
+        UpdateListingSequenceBuilder,
 
-                'PATCH /influencers/me':
-                    Route(self.__service_locator.locate(UpdateInfluencerSequenceBuilder)),
+    'POST /brands/me/listings/{listing_id}/images/{image_field}':
+        UpdateImageForListingSequenceBuilder,
 
-                'POST /influencers/me/images/{image_field}':
-                    Route(self.__service_locator.locate(UpdateInfluencerImageSequenceBuilder)),
-            }
-        )
+    'POST /brands/me/listings/{listing_id}/images/{image_field}/upload-url':
+        CreateImageUploadForListingSequenceBuilder,
 
-        onboarding_routes = OrderedDict({
-            'POST /influencer-profile':
-                Route(self.__service_locator.locate(CreateInfluencerProfileSequenceBuilder)),
+    'POST /brands/me/listings/{listing_id}/images/{image_field}/confirm':
+        ConfirmImageUploadForListingSequenceBuilder
+}
 
-            'PATCH /influencer-profile':
-                Route(self.__service_locator.locate(UpdateInfluencerProfileSequenceBuilder)),
+COLLABORATION_ROUTES = {
+    'GET /collaborations/{collaboration_id}':
+        NotImplementedSequenceBuilder,
 
-            'GET /influencer-profile':
-                Route(self.__service_locator.locate(GetInfluencerProfileSequenceBuilder)),
+    'POST /influencers/me/collaborations':
+        CreateCollaborationForInfluencerSequenceBuilder,
 
-        })
+    'PATCH /influencers/me/collaborations/{collaboration_id}':
+        NotImplementedSequenceBuilder,
 
-        listing_routes = OrderedDict(
-            {
-                'GET /brands/me/listings':
-                    Route(sequence_builder=self.__service_locator.locate(GetBrandListingsForBrandSequenceBuilder)),
+    'GET /influencers/me/collaborations':
+        NotImplementedSequenceBuilder,
 
-                'GET /influencers/me/listings':
-                    Route(sequence_builder=self.__service_locator.locate(GetListingsForInfluencerSequenceBuilder)),
+    'GET /brands/me/collaborations':
+        NotImplementedSequenceBuilder
+}
 
-                'DELETE /brands/me/listings/{listing_id}':
-                    Route(sequence_builder=self.__service_locator.locate(NotImplementedSequenceBuilder)),
+NOTIFICATION_ROUTES = {
+    'GET /notifications/{notification_id}':
+        GetNotificationByIdSequenceBuilder,
 
-                'GET /listings/{listing_id}':
-                    Route(sequence_builder=self.__service_locator.locate(GetListingByIdSequenceBuilder)),
+    'POST /users/me/notifications':
+        CreateNotificationSequenceBuilder,
 
-                'POST /brands/me/listings':
-                    Route(sequence_builder=self.__service_locator.locate(CreateListingSequenceBuilder)),
+    'PATCH /users/me/notifications':
+        NotImplementedSequenceBuilder,
 
-                'PATCH /brands/me/listings/{listing_id}':
-                    Route(sequence_builder=self.__service_locator.locate(UpdateListingSequenceBuilder)),
+    'GET /receivers/me/notifications':
+        NotImplementedSequenceBuilder,
 
-                'POST /brands/me/listings/{listing_id}/images/{image_field}':
-                    Route(sequence_builder=self.__service_locator.locate(UpdateImageForListingSequenceBuilder))
-            }
-        )
+    'GET /senders/me/notifications':
+        NotImplementedSequenceBuilder
+}
 
-        collaboration_routes = OrderedDict(
-            {
-                'GET /collaborations/{collaboration_id}':
-                    Route(sequence_builder=self.__service_locator.locate(NotImplementedSequenceBuilder)),
+AUDIENCE_ROUTES = {
+    'GET /influencers/me/audience-age-splits':
+        GetAudienceAgeSequenceBuilder,
 
-                'POST /influencers/me/collaborations':
-                    Route(sequence_builder=self.__service_locator.locate(CreateCollaborationForInfluencerSequenceBuilder)),
+    'GET /influencers/me/audience-gender-splits':
+        GetAudienceGenderSequenceBuilder,
 
-                'PATCH /influencers/me/collaborations/{collaboration_id}':
-                    Route(sequence_builder=self.__service_locator.locate(NotImplementedSequenceBuilder)),
+    'POST /influencers/me/audience-age-splits':
+        CreateAudienceAgeSequenceBuilder,
 
-                'GET /influencers/me/collaborations':
-                    Route(sequence_builder=self.__service_locator.locate(NotImplementedSequenceBuilder)),
+    'POST /influencers/me/audience-gender-splits':
+        CreateAudienceGenderSequenceBuilder,
 
-                'GET /brands/me/collaborations':
-                    Route(sequence_builder=self.__service_locator.locate(NotImplementedSequenceBuilder))
-            }
-        )
+    'PATCH /influencers/me/audience-age-splits':
+        UpdateAudienceAgeSequenceBuilder,
 
-        notification_routes = OrderedDict(
-            {
-                'GET /notifications/{notification_id}':
-                    Route(sequence_builder=self.__service_locator.locate(GetNotificationByIdSequenceBuilder)),
+    'PATCH /influencers/me/audience-gender-splits':
+        UpdateAudienceGenderSequenceBuilder
+}
 
-                'POST /users/me/notifications':
-                    Route(sequence_builder=self.__service_locator.locate(CreateNotificationSequenceBuilder)),
+ONBOARDING_ROUTES = {
+    'POST /influencer-profile':
+        CreateInfluencerProfileSequenceBuilder,
 
-                'PATCH /users/me/notifications':
-                    Route(sequence_builder=self.__service_locator.locate(NotImplementedSequenceBuilder)),
+    'PATCH /influencer-profile':
+        UpdateInfluencerProfileSequenceBuilder,
 
-                'GET /receivers/me/notifications':
-                    Route(sequence_builder=self.__service_locator.locate(NotImplementedSequenceBuilder)),
+    'GET /influencer-profile':
+        GetInfluencerProfileSequenceBuilder
+}
 
-                'GET /senders/me/notifications':
-                    Route(sequence_builder=self.__service_locator.locate(NotImplementedSequenceBuilder))
-            }
-        )
+BATCH_ROUTES = {
+    BATCH_ROUTE:
+        BatchSequenceBuilder
+}
 
-        audience_routes = OrderedDict(
-            {
-                'GET /influencers/me/audience-age-splits':
-                    Route(sequence_builder=self.__service_locator.locate(GetAudienceAgeSequenceBuilder)),
+# built once per process, the container only has to resolve the builder for the route being dispatched
+ROUTES: Mapping[str, Type[FluentSequenceBuilder]] = MappingProxyType({
+    **FEED_ROUTES,
+    **USER_ROUTES,
+    **LISTING_ROUTES,
+    **COLLABORATION_ROUTES,
+    **NOTIFICATION_ROUTES,
+    **AUDIENCE_ROUTES,
+    **ONBOARDING_ROUTES,
+    **BATCH_ROUTES
+})
 
-                'GET /influencers/me/audience-gender-splits':
-                    Route(sequence_builder=self.__service_locator.locate(GetAudienceGenderSequenceBuilder)),
 
-                'POST /influencers/me/audience-age-splits':
-                    Route(sequence_builder=self.__service_locator.locate(CreateAudienceAgeSequenceBuilder)),
+route_matcher = RouteMatcher(route_keys=ROUTES.keys())
 
-                'POST /influencers/me/audience-gender-splits':
-                    Route(sequence_builder=self.__service_locator.locate(CreateAudienceGenderSequenceBuilder)),
 
-                'PATCH /influencers/me/audience-age-splits':
-                    Route(sequence_builder=self.__service_locator.locate(UpdateAudienceAgeSequenceBuilder)),
+def resolve_route(event: dict) -> str:
+    # function urls and other front ends send a raw method and path instead of a matched route key
+    route_key = event.get("routeKey")
+    if route_key in ROUTES:
+        return route_key
+    method = event.get("requestContext", {}).get("http", {}).get("method")
+    path = event.get("rawPath")
+    if method is None or path is None:
+        return route_key
+    match = route_matcher.match(method=method, path=path)
+    if match is None:
+        return f"{method.upper()} {path}"
+    event["routeKey"] = match.route_key
+    event["pathParameters"] = {**(event.get("pathParameters") or {}), **match.path_parameters}
+    return match.route_key
 
-                'PATCH /influencers/me/audience-gender-splits':
-                    Route(sequence_builder=self.__service_locator.locate(UpdateAudienceGenderSequenceBuilder))
-            }
-        )
 
-        routes = {}
-        routes.update(feed_routes)
-        routes.update(user_routes)
-        routes.update(listing_routes)
-        routes.update(collaboration_routes)
-        routes.update(notification_routes)
-        routes.update(audience_routes)
-        routes.update(onboarding_routes)
-        return routes
@@ -54,12 +54,14 @@ class PostMultipleUserSubsequenceBuilder(FluentSequenceBuilder):
 class UpdateImageForListingSequenceBuilder(FluentSequenceBuilder):
 
     def __init__(self,
+                 common_before_hooks: CommonBeforeHooks,
                  listing_before_hooks: ListingBeforeHooks,
                  brand_before_hooks: BrandBeforeHooks,
                  listing_controller: ListingController,
                  generic_update_sequence: PreGenericUpdateCreateSubsequenceBuilder,
                  listing_after_hooks: ListingAfterHooks):
         super().__init__()
+        self.__common_before_hooks = common_before_hooks
         self.__listing_after_hooks = listing_after_hooks
         self.__generic_update_sequence = generic_update_sequence
         self.__listing_controller = listing_controller
@@ -71,32 +73,80 @@ class UpdateImageForListingSequenceBuilder(FluentSequenceBuilder):
             ._add_command(command=self.__listing_before_hooks.validate_id) \
             ._add_command(command=self.__brand_before_hooks.validate_auth_brand) \
             ._add_command(command=self.__listing_before_hooks.validate_image_key) \
-            ._add_command(command=self.__listing_before_hooks.upload_image)\
+            ._add_command(command=self.__listing_before_hooks.upload_image) \
+            ._add_command(command=self.__common_before_hooks.create_image_variants) \
             ._add_command(command=self.__listing_controller.update_listing_image) \
             ._add_command(command=self.__listing_after_hooks.tag_bucket_url_to_images)
 
 
-class UpdateListingSequenceBuilder(FluentSequenceBuilder):
+class CreateImageUploadForListingSequenceBuilder(FluentSequenceBuilder):
+
+    def __init__(self,
+                 listing_before_hooks: ListingBeforeHooks,
+                 brand_before_hooks: BrandBeforeHooks,
+                 generic_update_sequence: PreGenericUpdateCreateSubsequenceBuilder):
+        super().__init__()
+        self.__generic_update_sequence = generic_update_sequence
+        self.__brand_before_hooks = brand_before_hooks
+        self.__listing_before_hooks = listing_before_hooks
+
+    def build(self):
+        self._add_sequence_builder(sequence_builder=self.__generic_update_sequence)\
+            ._add_command(command=self.__listing_before_hooks.validate_id) \
+            ._add_command(command=self.__brand_before_hooks.validate_auth_brand) \
+            ._add_command(command=self.__listing_before_hooks.validate_image_key) \
+            ._add_command(command=self.__listing_before_hooks.create_image_upload)
+
+
+class ConfirmImageUploadForListingSequenceBuilder(FluentSequenceBuilder):
 
     def __init__(self,
+                 common_before_hooks: CommonBeforeHooks,
                  listing_before_hooks: ListingBeforeHooks,
                  brand_before_hooks: BrandBeforeHooks,
                  listing_controller: ListingController,
                  generic_update_sequence: PreGenericUpdateCreateSubsequenceBuilder,
                  listing_after_hooks: ListingAfterHooks):
         super().__init__()
+        self.__common_before_hooks = common_before_hooks
         self.__listing_after_hooks = listing_after_hooks
         self.__generic_update_sequence = generic_update_sequence
-        self.__brand_before_hooks = brand_before_hooks
         self.__listing_controller = listing_controller
+        self.__brand_before_hooks = brand_before_hooks
         self.__listing_before_hooks = listing_before_hooks
 
     def build(self):
         self._add_sequence_builder(sequence_builder=self.__generic_update_sequence)\
+            ._add_command(command=self.__listing_before_hooks.validate_id) \
+            ._add_command(command=self.__brand_before_hooks.validate_auth_brand) \
+            ._add_command(command=self.__listing_before_hooks.validate_image_key) \
+            ._add_command(command=self.__listing_before_hooks.confirm_image_upload) \
+            ._add_command(command=self.__common_before_hooks.create_image_variants) \
+            ._add_command(command=self.__listing_controller.update_listing_image) \
+            ._add_command(command=self.__listing_after_hooks.tag_bucket_url_to_images)
+
+
+class UpdateListingSequenceBuilder(FluentSequenceBuilder):
+
+    def __init__(self,
+                 listing_before_hooks: ListingBeforeHooks,
+                 brand_before_hooks: BrandBeforeHooks,
+                 listing_controller: ListingController,
+                 user_before_hooks: UserBeforeHooks,
+                 listing_after_hooks: ListingAfterHooks):
+        super().__init__()
+        self.__listing_after_hooks = listing_after_hooks
+        self.__user_before_hooks = user_before_hooks
+        self.__brand_before_hooks = brand_before_hooks
+        self.__listing_controller = listing_controller
+        self.__listing_before_hooks = listing_before_hooks
+
+    def build(self):
+        self._add_command(command=self.__user_before_hooks.set_auth_user_id)\
+            ._add_command(command=self.__listing_before_hooks.set_request)\
             ._add_command(command=self.__listing_before_hooks.validate_id)\
             ._add_command(command=self.__listing_before_hooks.validate_listing)\
             ._add_command(command=self.__brand_before_hooks.validate_auth_brand) \
-            ._add_command(command=self.__listing_before_hooks.map_categories_and_values) \
             ._add_command(command=self.__listing_controller.update_listing)\
             ._add_command(command=self.__listing_after_hooks.tag_bucket_url_to_images)
 
@@ -107,22 +157,22 @@ class CreateListingSequenceBuilder(FluentSequenceBuilder):
                  listing_before_hooks: ListingBeforeHooks,
                  brand_before_hooks: BrandBeforeHooks,
                  listing_controller: ListingController,
-                 generic_update_sequence: PreGenericUpdateCreateSubsequenceBuilder,
+                 user_before_hooks: UserBeforeHooks,
                  common_after_hooks: CommonAfterHooks,
                  listing_after_hooks: ListingAfterHooks):
         super().__init__()
         self.__common_after_hooks = common_after_hooks
         self.__listing_after_hooks = listing_after_hooks
-        self.__generic_update_sequence = generic_update_sequence
+        self.__user_before_hooks = user_before_hooks
         self.__brand_before_hooks = brand_before_hooks
         self.__listing_controller = listing_controller
         self.__listing_before_hooks = listing_before_hooks
 
     def build(self):
-        self._add_sequence_builder(sequence_builder=self.__generic_update_sequence) \
+        self._add_command(command=self.__user_before_hooks.set_auth_user_id) \
+            ._add_command(command=self.__listing_before_hooks.set_request) \
             ._add_command(command=self.__listing_before_hooks.validate_listing) \
             ._add_command(command=self.__brand_before_hooks.validate_auth_brand) \
-            ._add_command(command=self.__listing_before_hooks.map_categories_and_values) \
             ._add_command(command=self.__listing_controller.create_for_brand) \
             ._add_command(command=self.__listing_after_hooks.save_state) \
             ._add_command(command=self.__listing_after_hooks.tag_bucket_url_to_images)
@@ -132,17 +182,14 @@ class GetListingByIdSequenceBuilder(FluentSequenceBuilder):
 
     def __init__(self,
                  listing_before_hooks: ListingBeforeHooks,
-                 listing_controller: ListingController,
-                 listing_after_hooks: ListingAfterHooks):
+                 listing_controller: ListingController):
         super().__init__()
-        self.__listing_after_hooks = listing_after_hooks
         self.__listing_controller = listing_controller
         self.__listing_before_hooks = listing_before_hooks
 
     def build(self):
         self._add_command(command=self.__listing_before_hooks.validate_id) \
-            ._add_command(command=self.__listing_controller.get_by_id)\
-            ._add_command(command=self.__listing_after_hooks.tag_bucket_url_to_images)
+            ._add_command(command=self.__listing_controller.write_by_id)
 
 
 class GetListingsForBrandSequenceBuilder(FluentSequenceBuilder):
@@ -150,29 +197,28 @@ class GetListingsForBrandSequenceBuilder(FluentSequenceBuilder):
     def __init__(self,
                  user_before_hooks: UserBeforeHooks,
                  brand_before_hooks: BrandBeforeHooks,
-                 listing_controller: ListingController,
-                 listing_after_hooks: ListingAfterHooks):
+                 listing_controller: ListingController):
         super().__init__()
         self.__brand_before_hooks = brand_before_hooks
-        self.__listing_after_hooks = listing_after_hooks
         self.__listing_controller = listing_controller
         self.__user_before_hooks = user_before_hooks
 
     def build(self):
         self._add_command(command=self.__user_before_hooks.set_auth_user_id) \
             ._add_command(command=self.__brand_before_hooks.validate_auth_brand) \
-            ._add_command(command=self.__listing_controller.get_for_brand) \
-            ._add_command(command=self.__listing_after_hooks.tag_bucket_url_to_images_collection)
+            ._add_command(command=self.__listing_controller.write_for_brand)
 
 
 class UpdateInfluencerImageSequenceBuilder(FluentSequenceBuilder):
 
     def __init__(self, pre_update_create_subsequence_builder: PreGenericUpdateCreateSubsequenceBuilder,
+                 common_before_hooks: CommonBeforeHooks,
                  influencer_before_hooks: InfluencerBeforeHooks,
                  influencer_controller: InfluencerController,
                  influencer_after_hooks: InfluencerAfterHooks,
                  post_user_single_sequence_builder: PostSingleUserSubsequenceBuilder):
         super().__init__()
+        self.__common_before_hooks = common_before_hooks
         self.__post_user_single_sequence_builder = post_user_single_sequence_builder
         self.__influencer_after_hooks = influencer_after_hooks
         self.__influencer_controller = influencer_controller
@@ -183,15 +229,55 @@ class UpdateInfluencerImageSequenceBuilder(FluentSequenceBuilder):
         self._add_sequence_builder(sequence_builder=self.__pre_update_create_subsequence_builder)\
             ._add_command(command=self.__influencer_before_hooks.validate_image_key) \
             ._add_command(command=self.__influencer_before_hooks.upload_image) \
+            ._add_command(command=self.__common_before_hooks.create_image_variants) \
             ._add_command(command=self.__influencer_controller.update_image_field_for_user) \
             ._add_sequence_builder(sequence_builder=self.__post_user_single_sequence_builder) \
             ._add_command(command=self.__influencer_after_hooks.tag_bucket_url_to_images)
 
 
-class UpdateInfluencerSequenceBuilder(FluentSequenceBuilder):
+class CreateInfluencerImageUploadSequenceBuilder(FluentSequenceBuilder):
 
     def __init__(self, pre_update_create_subsequence_builder: PreGenericUpdateCreateSubsequenceBuilder,
+                 influencer_before_hooks: InfluencerBeforeHooks):
+        super().__init__()
+        self.__influencer_before_hooks = influencer_before_hooks
+        self.__pre_update_create_subsequence_builder = pre_update_create_subsequence_builder
+
+    def build(self):
+        self._add_sequence_builder(sequence_builder=self.__pre_update_create_subsequence_builder)\
+            ._add_command(command=self.__influencer_before_hooks.validate_image_key) \
+            ._add_command(command=self.__influencer_before_hooks.create_image_upload)
+
+
+class ConfirmInfluencerImageUploadSequenceBuilder(FluentSequenceBuilder):
+
+    def __init__(self, pre_update_create_subsequence_builder: PreGenericUpdateCreateSubsequenceBuilder,
+                 common_before_hooks: CommonBeforeHooks,
                  influencer_before_hooks: InfluencerBeforeHooks,
+                 influencer_controller: InfluencerController,
+                 influencer_after_hooks: InfluencerAfterHooks,
+                 post_user_single_sequence_builder: PostSingleUserSubsequenceBuilder):
+        super().__init__()
+        self.__common_before_hooks = common_before_hooks
+        self.__post_user_single_sequence_builder = post_user_single_sequence_builder
+        self.__influencer_after_hooks = influencer_after_hooks
+        self.__influencer_controller = influencer_controller
+        self.__influencer_before_hooks = influencer_before_hooks
+        self.__pre_update_create_subsequence_builder = pre_update_create_subsequence_builder
+
+    def build(self):
+        self._add_sequence_builder(sequence_builder=self.__pre_update_create_subsequence_builder)\
+            ._add_command(command=self.__influencer_before_hooks.validate_image_key) \
+            ._add_command(command=self.__influencer_before_hooks.confirm_image_upload) \
+            ._add_command(command=self.__common_before_hooks.create_image_variants) \
+            ._add_command(command=self.__influencer_controller.update_image_field_for_user) \
+            ._add_sequence_builder(sequence_builder=self.__post_user_single_sequence_builder) \
+            ._add_command(command=self.__influencer_after_hooks.tag_bucket_url_to_images)
+
+
+class UpdateInfluencerSequenceBuilder(FluentSequenceBuilder):
+
+    def __init__(self, influencer_before_hooks: InfluencerBeforeHooks,
                  influencer_controller: InfluencerController,
                  influencer_after_hooks: InfluencerAfterHooks,
                  post_user_single_sequence_builder: PostSingleUserSubsequenceBuilder,
@@ -202,11 +288,10 @@ class UpdateInfluencerSequenceBuilder(FluentSequenceBuilder):
         self.__influencer_after_hooks = influencer_after_hooks
         self.__influencer_controller = influencer_controller
         self.__influencer_before_hooks = influencer_before_hooks
-        self.__pre_update_create_subsequence_builder = pre_update_create_subsequence_builder
 
     def build(self):
-        self._add_sequence_builder(sequence_builder=self.__pre_update_create_subsequence_builder)\
-            ._add_command(command=self.__user_before_hooks.set_categories_and_values) \
+        self._add_command(command=self.__user_before_hooks.set_auth_user_id)\
+            ._add_command(command=self.__influencer_before_hooks.set_request) \
             ._add_command(command=self.__influencer_before_hooks.validate_influencer) \
             ._add_command(command=self.__influencer_controller.update_for_user) \
             ._add_command(command=self.__influencer_after_hooks.set_influencer_claims) \
@@ -216,8 +301,7 @@ class UpdateInfluencerSequenceBuilder(FluentSequenceBuilder):
 
 class CreateInfluencerSequenceBuilder(FluentSequenceBuilder):
 
-    def __init__(self, pre_update_create_subsequence_builder: PreGenericUpdateCreateSubsequenceBuilder,
-                 influencer_before_hooks: InfluencerBeforeHooks,
+    def __init__(self, influencer_before_hooks: InfluencerBeforeHooks,
                  influencer_controller: InfluencerController,
                  influencer_after_hooks: InfluencerAfterHooks,
                  post_user_single_sequence_builder: PostSingleUserSubsequenceBuilder,
@@ -228,11 +312,10 @@ class CreateInfluencerSequenceBuilder(FluentSequenceBuilder):
         self.__influencer_after_hooks = influencer_after_hooks
         self.__influencer_controller = influencer_controller
         self.__influencer_before_hooks = influencer_before_hooks
-        self.__pre_update_create_subsequence_builder = pre_update_create_subsequence_builder
 
     def build(self):
-        self._add_sequence_builder(sequence_builder=self.__pre_update_create_subsequence_builder) \
-            ._add_command(command=self.__user_before_hooks.set_categories_and_values) \
+        self._add_command(command=self.__user_before_hooks.set_auth_user_id) \
+            ._add_command(command=self.__influencer_before_hooks.set_request) \
             ._add_command(command=self.__influencer_controller.create) \
             ._add_command(command=self.__influencer_after_hooks.set_influencer_claims) \
             ._add_sequence_builder(sequence_builder=self.__post_user_single_sequence_builder) \
@@ -297,11 +380,13 @@ class GetAllInfluencersSequenceBuilder(FluentSequenceBuilder):
 class UpdateBrandImageSequenceBuilder(FluentSequenceBuilder):
 
     def __init__(self, pre_update_create_subsequence_builder: PreGenericUpdateCreateSubsequenceBuilder,
+                 common_before_hooks: CommonBeforeHooks,
                  brand_before_hooks: BrandBeforeHooks,
                  brand_controller: BrandController,
                  brand_after_hooks: BrandAfterHooks,
                  post_single_user_subsequence_builder: PostSingleUserSubsequenceBuilder):
         super().__init__()
+        self.__common_before_hooks = common_before_hooks
         self.__post_single_user_subsequence_builder = post_single_user_subsequence_builder
         self.__brand_after_hooks = brand_after_hooks
         self.__brand_controller = brand_controller
@@ -311,22 +396,37 @@ class UpdateBrandImageSequenceBuilder(FluentSequenceBuilder):
     def build(self):
         self._add_sequence_builder(sequence_builder=self.__pre_update_create_subsequence_builder)\
             ._add_command(command=self.__brand_before_hooks.validate_image_key)\
-            ._add_command(command=self.__brand_before_hooks.upload_image)\
+            ._add_command(command=self.__brand_before_hooks.upload_image) \
+            ._add_command(command=self.__common_before_hooks.create_image_variants) \
             ._add_command(command=self.__brand_controller.update_image_field_for_user) \
             ._add_sequence_builder(sequence_builder=self.__post_single_user_subsequence_builder)\
             ._add_command(command=self.__brand_after_hooks.tag_bucket_url_to_images)
 
 
-class UpdateBrandSequenceBuilder(FluentSequenceBuilder):
+class CreateBrandImageUploadSequenceBuilder(FluentSequenceBuilder):
+
+    def __init__(self, pre_update_create_subsequence_builder: PreGenericUpdateCreateSubsequenceBuilder,
+                 brand_before_hooks: BrandBeforeHooks):
+        super().__init__()
+        self.__brand_before_hooks = brand_before_hooks
+        self.__pre_update_create_subsequence_builder = pre_update_create_subsequence_builder
+
+    def build(self):
+        self._add_sequence_builder(sequence_builder=self.__pre_update_create_subsequence_builder)\
+            ._add_command(command=self.__brand_before_hooks.validate_image_key)\
+            ._add_command(command=self.__brand_before_hooks.create_image_upload)
+
+
+class ConfirmBrandImageUploadSequenceBuilder(FluentSequenceBuilder):
 
     def __init__(self, pre_update_create_subsequence_builder: PreGenericUpdateCreateSubsequenceBuilder,
+                 common_before_hooks: CommonBeforeHooks,
                  brand_before_hooks: BrandBeforeHooks,
                  brand_controller: BrandController,
                  brand_after_hooks: BrandAfterHooks,
-                 user_before_hooks: UserBeforeHooks,
                  post_single_user_subsequence_builder: PostSingleUserSubsequenceBuilder):
         super().__init__()
-        self.__user_before_hooks = user_before_hooks
+        self.__common_before_hooks = common_before_hooks
         self.__post_single_user_subsequence_builder = post_single_user_subsequence_builder
         self.__brand_after_hooks = brand_after_hooks
         self.__brand_controller = brand_controller
@@ -335,7 +435,31 @@ class UpdateBrandSequenceBuilder(FluentSequenceBuilder):
 
     def build(self):
         self._add_sequence_builder(sequence_builder=self.__pre_update_create_subsequence_builder)\
-            ._add_command(command=self.__user_before_hooks.set_categories_and_values) \
+            ._add_command(command=self.__brand_before_hooks.validate_image_key)\
+            ._add_command(command=self.__brand_before_hooks.confirm_image_upload) \
+            ._add_command(command=self.__common_before_hooks.create_image_variants) \
+            ._add_command(command=self.__brand_controller.update_image_field_for_user) \
+            ._add_sequence_builder(sequence_builder=self.__post_single_user_subsequence_builder)\
+            ._add_command(command=self.__brand_after_hooks.tag_bucket_url_to_images)
+
+
+class UpdateBrandSequenceBuilder(FluentSequenceBuilder):
+
+    def __init__(self, brand_before_hooks: BrandBeforeHooks,
+                 brand_controller: BrandController,
+                 brand_after_hooks: BrandAfterHooks,
+                 user_before_hooks: UserBeforeHooks,
+                 post_single_user_subsequence_builder: PostSingleUserSubsequenceBuilder):
+        super().__init__()
+        self.__user_before_hooks = user_before_hooks
+        self.__post_single_user_subsequence_builder = post_single_user_subsequence_builder
+        self.__brand_after_hooks = brand_after_hooks
+        self.__brand_controller = brand_controller
+        self.__brand_before_hooks = brand_before_hooks
+
+    def build(self):
+        self._add_command(command=self.__user_before_hooks.set_auth_user_id)\
+            ._add_command(command=self.__brand_before_hooks.set_request) \
             ._add_command(command=self.__brand_before_hooks.validate_brand) \
             ._add_command(command=self.__brand_controller.update_for_user) \
             ._add_command(command=self.__brand_after_hooks.set_brand_claims)\
@@ -345,8 +469,7 @@ class UpdateBrandSequenceBuilder(FluentSequenceBuilder):
 
 class CreateBrandSequenceBuilder(FluentSequenceBuilder):
 
-    def __init__(self, pre_update_create_subsequence_builder: PreGenericUpdateCreateSubsequenceBuilder,
-                 brand_before_hooks: BrandBeforeHooks,
+    def __init__(self, brand_before_hooks: BrandBeforeHooks,
                  brand_controller: BrandController,
                  brand_after_hooks: BrandAfterHooks,
                  user_before_hooks: UserBeforeHooks,
@@ -357,11 +480,10 @@ class CreateBrandSequenceBuilder(FluentSequenceBuilder):
         self.__brand_after_hooks = brand_after_hooks
         self.__brand_controller = brand_controller
         self.__brand_before_hooks = brand_before_hooks
-        self.__pre_update_create_subsequence_builder = pre_update_create_subsequence_builder
 
     def build(self):
-        self._add_sequence_builder(sequence_builder=self.__pre_update_create_subsequence_builder)\
-            ._add_command(command=self.__user_before_hooks.set_categories_and_values) \
+        self._add_command(command=self.__user_before_hooks.set_auth_user_id)\
+            ._add_command(command=self.__brand_before_hooks.set_request) \
             ._add_command(command=self.__brand_controller.create) \
             ._add_command(command=self.__brand_after_hooks.set_brand_claims)\
             ._add_sequence_builder(sequence_builder=self.__post_single_user_subsequence_builder) \
@@ -676,12 +798,14 @@ class GetInfluencerProfileSequenceBuilder(FluentSequenceBuilder):
 
     def build(self):
         self._add_command(command=self.__user_before_hooks.set_auth_user_id) \
-            ._add_command(command=self.__audience_gender_controller.get_for_influencer) \
-            ._add_command(command=self.__influencer_onboarding_hooks.cache_audience_gender_data) \
-            ._add_command(command=self.__audience_age_controller.get_for_influencer) \
-            ._add_command(command=self.__influencer_onboarding_hooks.cache_audience_age_data) \
-            ._add_command(command=self.__influencer_controller.get) \
-            ._add_command(command=self.__influencer_onboarding_hooks.cache_influencer_data) \
+            ._add_parallel_group(branches=[
+                [self.__audience_gender_controller.get_for_influencer,
+                 self.__influencer_onboarding_hooks.cache_audience_gender_data],
+                [self.__audience_age_controller.get_for_influencer,
+                 self.__influencer_onboarding_hooks.cache_audience_age_data],
+                [self.__influencer_controller.get,
+                 self.__influencer_onboarding_hooks.cache_influencer_data]
+            ]) \
             ._add_command(command=self.__influencer_onboarding_hooks.merge_influencer_cache) \
             ._add_sequence_builder(sequence_builder=self.__post_user_single_sequence_builder)
 
@@ -691,19 +815,16 @@ class GetBrandListingsForBrandSequenceBuilder(FluentSequenceBuilder):
     def __init__(self,
                  user_before_hooks: UserBeforeHooks,
                  brand_before_hooks: BrandBeforeHooks,
-                 brand_listing_controller: BrandListingController,
-                 listing_after_hooks: ListingAfterHooks):
+                 brand_listing_controller: BrandListingController):
         super().__init__()
         self.__brand_before_hooks = brand_before_hooks
-        self.__listing_after_hooks = listing_after_hooks
         self.__brand_listing_controller = brand_listing_controller
         self.__user_before_hooks = user_before_hooks
 
     def build(self):
         self._add_command(command=self.__user_before_hooks.set_auth_user_id)\
             ._add_command(command=self.__brand_before_hooks.validate_brand)\
-            ._add_command(command=self.__brand_listing_controller.get_for_brand)\
-            ._add_command(command=self.__listing_after_hooks.tag_bucket_url_to_images_collection)
+            ._add_command(command=self.__brand_listing_controller.write_for_brand)
 
 
 class CreateCollaborationForInfluencerSequenceBuilder(FluentSequenceBuilder):
@@ -737,7 +858,7 @@ class GetListingsForInfluencerSequenceBuilder(FluentSequenceBuilder):
         self.__influencer_listing_controller = influencer_listing_controller
 
     def build(self):
-        self._add_command(command=self.__influencer_listing_controller.get_all)
+        self._add_command(command=self.__influencer_listing_controller.write_all)
 
 
 class SequenceBuilder(FluentSequenceBuilder):
@@ -15,6 +15,17 @@ class RawImageRequestDto:
     image_bytes: str = None
 
 
+@dataclass(unsafe_hash=True)
+class ImageUploadRequestDto:
+    content_type: str = None
+    content_length: int = None
+
+
+@dataclass(unsafe_hash=True)
+class ImageUploadConfirmRequestDto:
+    image_key: str = None
+
+
 @dataclass(unsafe_hash=True)
 class BrandRequestDto:
     brand_name: str = None
@@ -137,6 +148,9 @@ class InfluencerResponseDto(BaseResponseDto):
     values: list[ValueEnum] = None
     categories: list[CategoryEnum] = None
     address: str = None
+    given_name: str = None
+    family_name: str = None
+    email: str = None
     auth_user_id: str = None
 
 
@@ -0,0 +1,156 @@
+import dataclasses
+import types
+from enum import Enum
+from typing import Any, Optional, Iterable
+
+from src.crosscutting import PinfluencerObjectMapper, SerializedJson, MappingStep, MAPPING_RULE, MAPPING_COPY, \
+    MAPPING_NESTED, target_mapping_steps, snake_case_to_camel_case, json_backend
+from src.data.images import IMAGE_VARIANTS, variant_key
+from src.web.constants import S3_URL
+
+VARIANTS_SUFFIX = "_variants"
+
+
+def image_url(key: str) -> str:
+    return f'{S3_URL}/{key}'
+
+
+def image_variant_urls(key: str) -> dict[str, str]:
+    return {variant.name: image_url(key=variant_key(key=key, variant=variant)) for variant in IMAGE_VARIANTS}
+
+
+def format_value(value) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, list):
+        return [format_value(item) for item in value]
+    if isinstance(value, dict):
+        return {snake_case_to_camel_case(key): format_value(item) for (key, item) in value.items()}
+    return value
+
+
+@dataclasses.dataclass(frozen=True)
+class WriteStep:
+    name: str
+    key: str
+    step: MappingStep
+    default: Any = None
+    default_factory: Any = None
+
+
+class EntityJsonWriter:
+
+    # writes the camel cased json of a response dto straight from the entity it would be mapped from, following the
+    # mapper's plan (rules included) with enums, image urls, projection and null stripping applied in the same pass
+    def __init__(self, mapper: PinfluencerObjectMapper, backend=None):
+        self.__mapper = mapper
+        self.__backend = backend if backend is not None else json_backend()
+        self.__steps: dict[tuple[type, type], dict[str, WriteStep]] = {}
+
+    def write(self, _from, to: type,
+              image_fields: Iterable[str] = (),
+              fields: Optional[dict] = None,
+              ignore_none: bool = False) -> SerializedJson:
+        return SerializedJson(chunks=(self.__backend.dumps(self.to_json_dict(_from=_from,
+                                                                             to=to,
+                                                                             image_fields=image_fields,
+                                                                             fields=fields,
+                                                                             ignore_none=ignore_none)),))
+
+    def write_collection(self, _from: Iterable, to: type,
+                         image_fields: Iterable[str] = (),
+                         fields: Optional[dict] = None,
+                         ignore_none: bool = False) -> SerializedJson:
+        dumps = self.__backend.dumps
+        items = [dumps(self.to_json_dict(_from=item,
+                                         to=to,
+                                         image_fields=image_fields,
+                                         fields=fields,
+                                         ignore_none=ignore_none)) for item in _from]
+        if not items:
+            return SerializedJson(chunks=("[", "]"))
+        return SerializedJson(chunks=("[", items[0], *(f", {item}" for item in items[1:]), "]"))
+
+    def to_json_dict(self, _from, to: type,
+                     image_fields: Iterable[str] = (),
+                     fields: Optional[dict] = None,
+                     ignore_none: bool = False) -> dict:
+        steps = self.__write_steps(_from=type(_from), to=to)
+        image_fields = [image_field for image_field in image_fields
+                        if fields is None or image_field in fields or f'{image_field}{VARIANTS_SUFFIX}' in fields]
+        values = _from.__dict__
+        written = {}
+        # projected bodies follow the order the fields were requested in, as the middleware projection does
+        names = steps if fields is None else [name for name in fields
+                                              if name in steps or name.removesuffix(VARIANTS_SUFFIX) in image_fields]
+        for name in names:
+            if name.endswith(VARIANTS_SUFFIX) and name not in steps:
+                key = values.get(name.removesuffix(VARIANTS_SUFFIX))
+                value = image_variant_urls(key=key) if key is not None else None
+                written[snake_case_to_camel_case(name)] = value
+                continue
+            write_step = steps[name]
+            value = self.__value(_from=_from, values=values, write_step=write_step,
+                                 fields=fields.get(name) if fields else None, ignore_none=ignore_none)
+            if name in image_fields and value is not None:
+                value = image_url(key=value)
+            written[write_step.key] = value
+        if fields is None:
+            for image_field in image_fields:
+                key = values.get(image_field)
+                if key is not None:
+                    written[snake_case_to_camel_case(f'{image_field}{VARIANTS_SUFFIX}')] = image_variant_urls(key=key)
+        if ignore_none or fields is not None:
+            return {key: value for (key, value) in written.items() if value is not None}
+        return written
+
+    def __value(self, _from, values: dict, write_step: WriteStep, fields: Optional[dict], ignore_none: bool):
+        (name, step) = (write_step.name, write_step.step)
+        if step.kind == MAPPING_RULE:
+            if values.get(name) is None:
+                return self.__default(write_step=write_step)
+            target = types.SimpleNamespace()
+            try:
+                step.expression(target, _from)
+                return format_value(getattr(target, name, self.__default(write_step=write_step)))
+            except IndexError:
+                # rules that find nothing to map fall back to the default mapping of the property
+                step = target_mapping_steps(step.to).get(name) if step.to is not None else None
+                if step is None:
+                    return self.__default(write_step=write_step)
+        if name not in values:
+            return self.__default(write_step=write_step)
+        value = values[name]
+        if step.kind == MAPPING_COPY:
+            return format_value(value)
+        if value is None:
+            return None
+        if step.kind == MAPPING_NESTED:
+            return self.to_json_dict(_from=value, to=step.to, fields=fields, ignore_none=ignore_none)
+        return [self.to_json_dict(_from=item, to=step.to, fields=fields, ignore_none=ignore_none) for item in value]
+
+    @staticmethod
+    def __default(write_step: WriteStep):
+        if write_step.default_factory is not None:
+            return format_value(write_step.default_factory())
+        return format_value(write_step.default)
+
+    def __write_steps(self, _from: type, to: type) -> dict[str, WriteStep]:
+        steps = self.__steps.get((_from, to))
+        if steps is None:
+            plan = self.__mapper.plan(_type_from=_from, _type_to=to)
+            steps = {}
+            for dto_field in dataclasses.fields(to):
+                step = plan[dto_field.name]
+                if step.kind == MAPPING_RULE:
+                    # the target type is kept so a failing rule can fall back to the default step
+                    step = MappingStep(kind=MAPPING_RULE, to=to, expression=step.expression)
+                steps[dto_field.name] = WriteStep(
+                    name=dto_field.name,
+                    key=snake_case_to_camel_case(dto_field.name),
+                    step=step,
+                    default=None if dto_field.default is dataclasses.MISSING else dto_field.default,
+                    default_factory=None if dto_field.default_factory is dataclasses.MISSING
+                    else dto_field.default_factory)
+            self.__steps[(_from, to)] = steps
+        return steps
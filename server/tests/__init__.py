@@ -1,5 +1,11 @@
+import hashlib
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
 from enum import Enum
 
+from botocore.exceptions import ClientError
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
@@ -48,6 +54,106 @@ class InMemorySqliteDataManager:
         self.session.commit()
 
 
+class LocalFileS3Client:
+
+    def __init__(self, root: str, page_size: int = 1000):
+        self.__root = root
+        self.__page_size = page_size
+        self.__content_types = {}
+        self.part_sizes = []
+
+    def put_object(self, Bucket, Key, Body, ContentType, Tagging):
+        self.__write(path=self.__object_path(bucket=Bucket, key=Key),
+                     body=Body if isinstance(Body, bytes) else Body.read())
+        self.__content_types[(Bucket, Key)] = ContentType
+
+    def get_object(self, Bucket, Key) -> dict:
+        with open(self.__object_path(bucket=Bucket, key=Key), "rb") as f:
+            return {"Body": f.read(), "ContentType": self.__content_types[(Bucket, Key)]}
+
+    def copy_object(self, Bucket, Key, CopySource, ContentType, MetadataDirective):
+        source_path = self.__object_path(bucket=CopySource["Bucket"], key=CopySource["Key"])
+        object_path = self.__object_path(bucket=Bucket, key=Key)
+        if source_path == object_path:
+            os.utime(object_path)
+        else:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            shutil.copyfile(source_path, object_path)
+        self.__content_types[(Bucket, Key)] = ContentType
+
+    def download_file(self, Bucket, Key, Filename):
+        shutil.copyfile(self.__object_path(bucket=Bucket, key=Key), Filename)
+
+    def list_objects_v2(self, Bucket, Prefix: str = "", ContinuationToken: str = "0") -> dict:
+        bucket_path = os.path.join(self.__root, Bucket)
+        keys = sorted(key for key in (os.path.relpath(os.path.join(directory, file), bucket_path)
+                                      for directory, _, files in os.walk(bucket_path) for file in files)
+                      if key.startswith(Prefix))
+        start = int(ContinuationToken)
+        page = keys[start:start + self.__page_size]
+        return {
+            "Contents": [{
+                "Key": key,
+                "LastModified": datetime.fromtimestamp(os.path.getmtime(os.path.join(bucket_path, key)),
+                                                       tz=timezone.utc)
+            } for key in page],
+            "IsTruncated": start + self.__page_size < len(keys),
+            "NextContinuationToken": str(start + self.__page_size)
+        }
+
+    def delete_objects(self, Bucket, Delete):
+        for deleted_object in Delete["Objects"]:
+            os.remove(self.__object_path(bucket=Bucket, key=deleted_object["Key"]))
+
+    def head_object(self, Bucket, Key) -> dict:
+        object_path = self.__object_path(bucket=Bucket, key=Key)
+        if not os.path.exists(object_path):
+            raise ClientError(error_response={"Error": {"Code": "404"}}, operation_name="HeadObject")
+        return {"ContentLength": os.path.getsize(object_path), "ContentType": self.__content_types[(Bucket, Key)]}
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn) -> str:
+        return f"file://{self.__object_path(bucket=Params['Bucket'], key=Params['Key'])}?expires={ExpiresIn}"
+
+    def create_multipart_upload(self, Bucket, Key, ContentType, Tagging) -> dict:
+        upload_id = str(uuid.uuid4())
+        os.makedirs(self.__upload_path(upload_id=upload_id))
+        self.__content_types[(Bucket, Key)] = ContentType
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body) -> dict:
+        self.__write(path=os.path.join(self.__upload_path(upload_id=UploadId), str(PartNumber)), body=Body)
+        self.part_sizes.append(len(Body))
+        return {"ETag": hashlib.md5(Body).hexdigest()}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        object_path = self.__object_path(bucket=Bucket, key=Key)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        with open(object_path, "wb") as f:
+            for part in MultipartUpload["Parts"]:
+                with open(os.path.join(self.__upload_path(upload_id=UploadId), str(part["PartNumber"])), "rb") as p:
+                    shutil.copyfileobj(p, f)
+        shutil.rmtree(self.__upload_path(upload_id=UploadId))
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        shutil.rmtree(self.__upload_path(upload_id=UploadId))
+
+    def pending_uploads(self) -> list[str]:
+        uploads_path = os.path.join(self.__root, ".uploads")
+        return os.listdir(uploads_path) if os.path.exists(uploads_path) else []
+
+    def __object_path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.__root, bucket, key)
+
+    def __upload_path(self, upload_id: str) -> str:
+        return os.path.join(self.__root, ".uploads", upload_id)
+
+    @staticmethod
+    def __write(path: str, body: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(body)
+
+
 def get_entity_dict(entity: SqlAlchemyBaseEntity) -> dict:
     dict = entity.__dict__
     dict.pop('_sa_instance_state')
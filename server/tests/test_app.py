@@ -8,9 +8,10 @@ from cfn_tools import load_yaml
 from simple_injection import ServiceCollection
 
 from src.app import bootstrap
+from src.crosscutting import server_timing
 from src.web import PinfluencerContext, PinfluencerResponse
 from src.web.middleware import MiddlewarePipeline
-from src.web.routing import Dispatcher
+from src.web.routing import Dispatcher, BatchSequenceBuilder
 from src.web.sequences import NotImplementedSequenceBuilder, UpdateImageForListingSequenceBuilder, \
     UpdateListingSequenceBuilder, CreateListingSequenceBuilder, GetListingByIdSequenceBuilder, \
     UpdateInfluencerImageSequenceBuilder, UpdateInfluencerSequenceBuilder, \
@@ -22,7 +23,10 @@ from src.web.sequences import NotImplementedSequenceBuilder, UpdateImageForListi
     GetAudienceGenderSequenceBuilder, UpdateAudienceGenderSequenceBuilder, CreateInfluencerProfileSequenceBuilder, \
     UpdateInfluencerProfileSequenceBuilder, GetInfluencerProfileSequenceBuilder, \
     GetBrandListingsForBrandSequenceBuilder, CreateCollaborationForInfluencerSequenceBuilder, \
-    GetListingsForInfluencerSequenceBuilder
+    GetListingsForInfluencerSequenceBuilder, CreateImageUploadForListingSequenceBuilder, \
+    ConfirmImageUploadForListingSequenceBuilder, CreateInfluencerImageUploadSequenceBuilder, \
+    ConfirmInfluencerImageUploadSequenceBuilder, CreateBrandImageUploadSequenceBuilder, \
+    ConfirmBrandImageUploadSequenceBuilder
 from tests import get_as_json
 
 
@@ -48,6 +52,65 @@ class TestRoutes(TestCase):
         assert response == get_as_json(status_code=500,
                                        body="""{"message": "unexpected server error, please try later :("}""")
 
+    def test_server_timing(self):
+        # arrange
+        self.__mock_middleware_pipeline.execute_middleware = MagicMock()
+        self.addCleanup(server_timing.begin, enabled=False)
+
+        # act
+        response = bootstrap(event={"routeKey": "GET /brands", "headers": {"x-server-timing": "1"}},
+                             context={},
+                             middleware=self.__mock_middleware_pipeline,
+                             ioc=self.__ioc,
+                             data_manager=Mock(),
+                             cognito_auth_service=Mock())
+        next_response = bootstrap(event={"routeKey": "GET /brands"},
+                                  context={},
+                                  middleware=self.__mock_middleware_pipeline,
+                                  ioc=ServiceCollection(),
+                                  data_manager=Mock(),
+                                  cognito_auth_service=Mock())
+
+        # assert
+        with self.subTest(msg="header is added when requested"):
+            assert "total;dur=" in response["headers"]["Server-Timing"]
+        with self.subTest(msg="header is not added to the next request"):
+            assert "Server-Timing" not in next_response["headers"]
+
+    def test_session_removed(self):
+        # arrange
+        self.__mock_middleware_pipeline.execute_middleware = MagicMock()
+        data_manager = Mock()
+
+        # act
+        bootstrap(event={"routeKey": "GET /brands"},
+                  context={},
+                  middleware=self.__mock_middleware_pipeline,
+                  ioc=self.__ioc,
+                  data_manager=data_manager,
+                  cognito_auth_service=Mock())
+
+        # assert
+        data_manager.remove_session.assert_called_once_with()
+
+    def test_batch(self):
+        # arrange
+        self.__mock_middleware_pipeline.execute_middleware = MagicMock()
+
+        # act
+        bootstrap(event={"routeKey": "POST /batch"},
+                  context={},
+                  middleware=self.__mock_middleware_pipeline,
+                  ioc=self.__ioc,
+                  data_manager=Mock(),
+                  cognito_auth_service=Mock())
+
+        # assert
+        self.__mock_middleware_pipeline \
+            .execute_middleware \
+            .assert_called_once_with(context=Any(),
+                                     sequence=self.__ioc.resolve(BatchSequenceBuilder))
+
     def test_route_that_does_not_exist(self):
         self.__assert_non_service_layer_route(route_key="GET /random",
                                               expected_body="""{"message": "route: GET /random not found"}""",
@@ -200,6 +263,114 @@ class TestRoutes(TestCase):
             .assert_called_once_with(context=Any(),
                                      sequence=self.__ioc.resolve(UpdateBrandImageSequenceBuilder))
 
+    def test_create_auth_brand_image_upload(self):
+        # arrange
+        self.__mock_middleware_pipeline.execute_middleware = MagicMock()
+
+        # act
+        bootstrap(event={"routeKey": "POST /brands/me/images/{image_field}/upload-url"},
+                  context={},
+                  middleware=self.__mock_middleware_pipeline,
+                  ioc=self.__ioc,
+                  data_manager=Mock(),
+                  cognito_auth_service=Mock())
+
+        # assert
+        self.__mock_middleware_pipeline \
+            .execute_middleware \
+            .assert_called_once_with(context=Any(),
+                                     sequence=self.__ioc.resolve(CreateBrandImageUploadSequenceBuilder))
+
+    def test_confirm_auth_brand_image_upload(self):
+        # arrange
+        self.__mock_middleware_pipeline.execute_middleware = MagicMock()
+
+        # act
+        bootstrap(event={"routeKey": "POST /brands/me/images/{image_field}/confirm"},
+                  context={},
+                  middleware=self.__mock_middleware_pipeline,
+                  ioc=self.__ioc,
+                  data_manager=Mock(),
+                  cognito_auth_service=Mock())
+
+        # assert
+        self.__mock_middleware_pipeline \
+            .execute_middleware \
+            .assert_called_once_with(context=Any(),
+                                     sequence=self.__ioc.resolve(ConfirmBrandImageUploadSequenceBuilder))
+
+    def test_create_auth_influencer_image_upload(self):
+        # arrange
+        self.__mock_middleware_pipeline.execute_middleware = MagicMock()
+
+        # act
+        bootstrap(event={"routeKey": "POST /influencers/me/images/{image_field}/upload-url"},
+                  context={},
+                  middleware=self.__mock_middleware_pipeline,
+                  ioc=self.__ioc,
+                  data_manager=Mock(),
+                  cognito_auth_service=Mock())
+
+        # assert
+        self.__mock_middleware_pipeline \
+            .execute_middleware \
+            .assert_called_once_with(context=Any(),
+                                     sequence=self.__ioc.resolve(CreateInfluencerImageUploadSequenceBuilder))
+
+    def test_confirm_auth_influencer_image_upload(self):
+        # arrange
+        self.__mock_middleware_pipeline.execute_middleware = MagicMock()
+
+        # act
+        bootstrap(event={"routeKey": "POST /influencers/me/images/{image_field}/confirm"},
+                  context={},
+                  middleware=self.__mock_middleware_pipeline,
+                  ioc=self.__ioc,
+                  data_manager=Mock(),
+                  cognito_auth_service=Mock())
+
+        # assert
+        self.__mock_middleware_pipeline \
+            .execute_middleware \
+            .assert_called_once_with(context=Any(),
+                                     sequence=self.__ioc.resolve(ConfirmInfluencerImageUploadSequenceBuilder))
+
+    def test_create_listing_image_upload(self):
+        # arrange
+        self.__mock_middleware_pipeline.execute_middleware = MagicMock()
+
+        # act
+        bootstrap(event={"routeKey": "POST /brands/me/listings/{listing_id}/images/{image_field}/upload-url"},
+                  context={},
+                  middleware=self.__mock_middleware_pipeline,
+                  ioc=self.__ioc,
+                  data_manager=Mock(),
+                  cognito_auth_service=Mock())
+
+        # assert
+        self.__mock_middleware_pipeline \
+            .execute_middleware \
+            .assert_called_once_with(context=Any(),
+                                     sequence=self.__ioc.resolve(CreateImageUploadForListingSequenceBuilder))
+
+    def test_confirm_listing_image_upload(self):
+        # arrange
+        self.__mock_middleware_pipeline.execute_middleware = MagicMock()
+
+        # act
+        bootstrap(event={"routeKey": "POST /brands/me/listings/{listing_id}/images/{image_field}/confirm"},
+                  context={},
+                  middleware=self.__mock_middleware_pipeline,
+                  ioc=self.__ioc,
+                  data_manager=Mock(),
+                  cognito_auth_service=Mock())
+
+        # assert
+        self.__mock_middleware_pipeline \
+            .execute_middleware \
+            .assert_called_once_with(context=Any(),
+                                     sequence=self.__ioc.resolve(ConfirmImageUploadForListingSequenceBuilder))
+
     def test_get_auth_influencer(self):
         # arrange
         self.__mock_middleware_pipeline.execute_middleware = MagicMock()
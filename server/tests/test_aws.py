@@ -0,0 +1,104 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from unittest.mock import Mock, MagicMock, patch
+
+import boto3
+from botocore.stub import Stubber
+
+from src.crosscutting import server_timing
+from src.data.aws import AwsClientFactory, AWS_CLIENT_CONFIG, instrument_aws_client
+from src.data.images import ImageVariantRenderer
+from src.data.repositories import S3ImageRepository, CognitoAuthService
+from tests import LocalFileS3Client
+
+
+class TestAwsClientFactory(TestCase):
+
+    def setUp(self) -> None:
+        self.__directory = tempfile.TemporaryDirectory()
+        self.__client_builder = MagicMock(side_effect=lambda service_name, config:
+                                          LocalFileS3Client(root=self.__directory.name)
+                                          if service_name == 's3' else Mock())
+        self.__sut = AwsClientFactory(client_builder=self.__client_builder)
+
+    def tearDown(self) -> None:
+        self.__directory.cleanup()
+
+    def test_client(self):
+        # act
+        first_client = self.__sut.client(service_name='s3')
+        second_client = self.__sut.client(service_name='s3')
+
+        # assert
+        with self.subTest(msg="client is reused"):
+            assert first_client is second_client
+
+        # assert
+        with self.subTest(msg="client is built once with tuned config"):
+            self.__client_builder.assert_called_once_with('s3', AWS_CLIENT_CONFIG)
+
+    def test_client_when_requested_concurrently(self):
+        # act
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            clients = list(executor.map(lambda _: self.__sut.client(service_name='s3'), range(32)))
+
+        # assert
+        with self.subTest(msg="all callers share one client"):
+            assert all(client is clients[0] for client in clients)
+
+        # assert
+        with self.subTest(msg="client is built once"):
+            assert self.__client_builder.call_count == 1
+
+    def test_client_is_shared_across_repositories(self):
+        # act
+        with patch.dict(os.environ, {"USER_POOL_ID": "pool"}):
+            for _ in range(3):
+                S3ImageRepository(logger=Mock(),
+                                  variant_renderer=ImageVariantRenderer(logger=Mock()),
+                                  client_factory=self.__sut)
+                CognitoAuthService(logger=Mock(), client_factory=self.__sut)
+
+        # assert
+        with self.subTest(msg="one client was built per service"):
+            assert [call.args[0] for call in self.__client_builder.call_args_list] == ['s3', 'cognito-idp']
+
+
+class TestInstrumentAwsClient(TestCase):
+
+    def setUp(self) -> None:
+        self.__client = boto3.session.Session().client('s3', region_name='eu-west-2',
+                                                      aws_access_key_id='key', aws_secret_access_key='secret')
+        self.__stubber = Stubber(self.__client)
+        self.__stubber.activate()
+        instrument_aws_client(client=self.__client, phase='s3')
+        self.addCleanup(server_timing.begin, enabled=False)
+
+    def test_instrument_aws_client(self):
+        # arrange
+        server_timing.begin(enabled=True)
+        self.__stubber.add_response('head_object', {}, {'Bucket': 'bucket', 'Key': 'key'})
+        self.__stubber.add_client_error('head_object', http_status_code=404)
+
+        # act
+        self.__client.head_object(Bucket='bucket', Key='key')
+        try:
+            self.__client.head_object(Bucket='bucket', Key='key')
+        except self.__client.exceptions.ClientError:
+            ...
+
+        # assert
+        assert [entry.split(";")[0] for entry in server_timing.header().split(", ")] == ['s3', 'total']
+
+    def test_instrument_aws_client_when_disabled(self):
+        # arrange
+        server_timing.begin(enabled=False)
+        self.__stubber.add_response('head_object', {}, {'Bucket': 'bucket', 'Key': 'key'})
+
+        # act
+        self.__client.head_object(Bucket='bucket', Key='key')
+
+        # assert
+        assert server_timing.header().startswith('total')
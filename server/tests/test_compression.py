@@ -0,0 +1,109 @@
+import base64
+import gzip
+from unittest import TestCase
+from unittest.mock import patch, Mock
+
+from ddt import ddt, data
+
+from src.web.compression import negotiate_encoding, compress_for_proxy, accepted_encodings, buffer_chunks
+
+
+@ddt
+class TestNegotiateEncoding(TestCase):
+
+    @data(("", None),
+          ("identity", None),
+          ("gzip", "gzip"),
+          ("gzip, deflate, br", "br"),
+          ("br;q=0.5, gzip;q=0.8", "gzip"),
+          ("br;q=0, gzip", "gzip"),
+          ("gzip;q=0", None),
+          ("*", "br"),
+          ("*;q=0.1, br;q=0", "gzip"),
+          ("GZIP;q=not a number", None))
+    def test_negotiate_encoding(self, case):
+        # arrange
+        (accept_encoding, expected) = case
+
+        # act
+        with patch("src.web.compression.brotli", Mock()):
+            actual = negotiate_encoding(accept_encoding=accept_encoding)
+
+        # assert
+        assert actual == expected
+
+    def test_negotiate_encoding_when_brotli_is_not_installed(self):
+        # act
+        with patch("src.web.compression.brotli", None):
+            actual = negotiate_encoding(accept_encoding="br, gzip;q=0.5")
+
+        # assert
+        assert actual == "gzip"
+
+
+class TestCompressForProxy(TestCase):
+
+    def test_compress_for_proxy_with_gzip(self):
+        # arrange
+        chunks = ['{"brandName": "Pinfluencer"}'] * 100
+
+        # act
+        actual = compress_for_proxy(chunks=iter(chunks), encoding="gzip")
+
+        # assert
+        assert gzip.decompress(base64.b64decode(actual)).decode("utf-8") == "".join(chunks)
+
+    def test_compress_for_proxy_with_brotli(self):
+        # arrange
+        compressor = Mock()
+        compressor.process = Mock(side_effect=lambda chunk: chunk.upper())
+        compressor.finish = Mock(return_value=b"!")
+        brotli = Mock()
+        brotli.Compressor = Mock(return_value=compressor)
+
+        # act
+        with patch("src.web.compression.brotli", brotli):
+            actual = compress_for_proxy(chunks=iter(["a", "b"]), encoding="br")
+
+        # assert
+        with self.subTest(msg="compressor is created with quality"):
+            brotli.Compressor.assert_called_once_with(quality=5)
+        with self.subTest(msg="chunks are compressed incrementally and base64 encoded"):
+            assert base64.b64decode(actual) == b"AB!"
+
+
+class TestBufferChunks(TestCase):
+
+    def test_buffer_chunks_when_threshold_is_reached(self):
+        # arrange
+        chunks = iter(["[", "12345", ", 678", "]"])
+
+        # act
+        (head, reached) = buffer_chunks(chunks=chunks, threshold=6)
+
+        # assert
+        with self.subTest(msg="reading stops at the threshold"):
+            assert (head, reached) == (["[", "12345"], True)
+        with self.subTest(msg="remaining chunks are left unread"):
+            assert list(chunks) == [", 678", "]"]
+
+    def test_buffer_chunks_when_threshold_is_not_reached(self):
+        # act
+        actual = buffer_chunks(chunks=iter(["[", "]"]), threshold=6)
+
+        # assert
+        assert actual == (["[", "]"], False)
+
+
+@ddt
+class TestAcceptedEncodings(TestCase):
+
+    @data(({}, ""),
+          ({"headers": None}, ""),
+          ({"headers": {"accept-encoding": "gzip, br"}}, "gzip, br"))
+    def test_accepted_encodings(self, case):
+        # arrange
+        (event, expected) = case
+
+        # act/assert
+        assert accepted_encodings(event=event) == expected
@@ -1,3 +1,4 @@
+import json
 import uuid
 from typing import Optional
 from unittest import TestCase
@@ -348,6 +349,27 @@ class TestBrandController(TestCase):
         with self.subTest(msg="middleware short circuits"):
             assert context.short_circuit == True
 
+    def test_create_with_decoded_request(self):
+        # arrange
+        brand_request: BrandRequestDto = AutoFixture().create(dto=BrandRequestDto,
+                                                              list_limit=5)
+        brand_db: Brand = self.__object_mapper.map(_from=brand_request,
+                                                   to=Brand)
+        self.__sut._unit_of_work = MagicMock()
+        self.__brand_repository.write_new_for_auth_user = MagicMock(return_value=brand_db)
+        payload_captor = Captor()
+
+        # act
+        self.__sut.create(PinfluencerContext(body={},
+                                             request=brand_request,
+                                             auth_user_id="12345",
+                                             response=PinfluencerResponse()))
+
+        # assert
+        self.__brand_repository.write_new_for_auth_user.assert_called_once_with(auth_user_id="12345",
+                                                                                payload=payload_captor)
+        assert payload_captor.arg.brand_name == brand_request.brand_name
+
     def test_create(self):
         # arrange
         brand_request: BrandRequestDto = AutoFixture().create(dto=BrandRequestDto,
@@ -541,6 +563,41 @@ class TestBrandController(TestCase):
             assert brand_db.header_image == mapped_brand_body.header_image
             assert brand_db.logo == mapped_brand_body.logo
 
+    def test_update_when_nothing_changed(self):
+        # arrange
+        brand_db: Brand = AutoFixture().create(dto=Brand, list_limit=5)
+        brand_request = self.__object_mapper.map(_from=brand_db, to=BrandRequestDto)
+        self.__brand_repository.load_for_auth_user = MagicMock(return_value=brand_db)
+        self.__brand_repository.save = MagicMock()
+        response = PinfluencerResponse()
+
+        # act
+        self.__sut.update_for_user(PinfluencerContext(body=brand_request.__dict__,
+                                                      auth_user_id=brand_db.auth_user_id,
+                                                      response=response))
+
+        # assert
+        with self.subTest(msg="status code is 200"):
+            assert response.status_code == 200
+
+        # assert
+        with self.subTest(msg="commit is skipped"):
+            self.__brand_repository.save.assert_not_called()
+
+    def test_update_when_changed(self):
+        # arrange
+        brand_db: Brand = AutoFixture().create(dto=Brand, list_limit=5)
+        self.__brand_repository.load_for_auth_user = MagicMock(return_value=brand_db)
+        self.__brand_repository.save = MagicMock()
+
+        # act
+        self.__sut.update_for_user(PinfluencerContext(body={"brand_name": f"{brand_db.brand_name} renamed"},
+                                                      auth_user_id=brand_db.auth_user_id,
+                                                      response=PinfluencerResponse()))
+
+        # assert
+        self.__brand_repository.save.assert_called_once()
+
     def test_update_when_not_found(self):
         # arrange
         auth_id = "12341"
@@ -579,6 +636,38 @@ class TestListingController(TestCase):
                                        flexi_updater=self.__flexi_updater,
                                        logger=Mock())
 
+    def test_write_by_id(self):
+        # arrange
+        listing_from_db = AutoFixture().create(dto=Listing, list_limit=5)
+        self.__listing_repository.load_by_id = MagicMock(return_value=listing_from_db)
+        context = PinfluencerContext(response=PinfluencerResponse(), id=listing_from_db.id)
+
+        # act
+        self.__sut.write_by_id(context=context)
+
+        # assert
+        body = json.loads(context.response.body.text())
+        with self.subTest(msg="response is ok"):
+            assert context.response.status_code == 200
+        with self.subTest(msg="body is written as camel cased json"):
+            assert body["productName"] == listing_from_db.product_name
+        with self.subTest(msg="image url is tagged"):
+            assert body["productImage"].endswith(f"/{listing_from_db.product_image}")
+
+    def test_write_by_id_when_not_found(self):
+        # arrange
+        self.__listing_repository.load_by_id = MagicMock(side_effect=NotFoundException())
+        context = PinfluencerContext(response=PinfluencerResponse(), id="1234")
+
+        # act
+        self.__sut.write_by_id(context=context)
+
+        # assert
+        with self.subTest(msg="response is not found"):
+            assert context.response.status_code == 404
+        with self.subTest(msg="pipeline is shorted"):
+            assert context.short_circuit is True
+
     def test_write_for_listing(self):
         # arrange
         listing_from_db = AutoFixture().create(dto=Listing, list_limit=5)
@@ -1004,6 +1093,27 @@ class TestAudienceAgeController(TestCase):
             self.assertEqual(updated_ages.audience_age_55_to_64_split, self.__get_split(audience_ages, 55, 64))
             self.assertNotEqual(updated_ages.audience_age_65_plus_split, self.__get_split(audience_ages, 65, None))
 
+    def test_update_for_influencer_saves_changed_splits(self):
+        # arrange
+        audience_ages = self.__object_mapper.map(_from=AutoFixture().create(dto=AudienceAgeViewDto),
+                                                 to=AudienceAgeSplit)
+        self.__audience_age_repository.load_for_influencer = MagicMock(return_value=audience_ages)
+        unchanged = self.__object_mapper.map(_from=audience_ages, to=AudienceAgeViewDto).__dict__
+
+        # act/assert
+        with self.subTest(msg="unchanged splits are not saved"):
+            self.__sut.update_for_influencer(context=PinfluencerContext(auth_user_id="1234",
+                                                                        body=dict(unchanged),
+                                                                        response=PinfluencerResponse(body={})))
+            self.__audience_age_repository.save_for_influencer.assert_not_called()
+        with self.subTest(msg="changed splits are saved"):
+            self.__sut.update_for_influencer(context=PinfluencerContext(auth_user_id="1234",
+                                                                        body={**unchanged,
+                                                                              "audience_age_13_to_17_split": 0.9},
+                                                                        response=PinfluencerResponse(body={})))
+            self.__audience_age_repository.save_for_influencer.assert_called_once_with(payload=audience_ages,
+                                                                                       auth_user_id="1234")
+
     def test_update_for_influencer_when_not_found(self):
         # arrange
         self.__audience_age_repository.load_for_influencer = MagicMock(return_value=AudienceAgeSplit(audience_ages=[]))
@@ -1,13 +1,20 @@
 import datetime
-from dataclasses import dataclass, field
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
 from typing import Union, get_args
 from unittest import TestCase
+from unittest.mock import Mock, patch
 
 from ddt import ddt, data
 
-from src.crosscutting import JsonSnakeToCamelSerializer, JsonCamelToSnakeCaseDeserializer, AutoFixture
+from src.crosscutting import JsonSnakeToCamelSerializer, JsonCamelToSnakeCaseDeserializer, AutoFixture, \
+    TimedLruCache, BatchLoader, ServerTiming, PinfluencerObjectMapper, DummyLogger, target_mapping_steps, MappingStep, \
+    MAPPING_NESTED, MAPPING_LIST, MAPPING_COPY, snake_case_to_camel_case, camel_case_to_snake_case, warm_key_caches, \
+    json_backend, StandardJsonBackend, OrjsonBackend, slotted, SerializedJson, json_default
 from src.domain.models import ValueEnum, CategoryEnum, Brand, Value
-from src.exceptions import AutoMapperException
+from src.exceptions import AutoMapperException, RequestDecodeException
 from src.web.views import BrandRequestDto, BrandResponseDto
 from tests import test_mapper
 
@@ -239,6 +246,31 @@ class TestPinfluencerMapper(TestCase):
         with self.subTest(msg="list of floats field matches"):
             assert test_other_dto.list_of_floats == test_dto.list_of_floats
 
+    def test_map_with_fields(self):
+        # arrange
+        test_dto = TestDto(name="Aidan",
+                           nested=NestedTestDto(id="1", name="nested"),
+                           nested_list=[NestedTestDto(id="2", name="first"), NestedTestDto(id="3", name="second")])
+
+        # act
+        test_other_dto: TestOtherDto = test_mapper().map(_from=test_dto,
+                                                         to=TestOtherDto,
+                                                         fields={"name": None, "nested_list": {"name": None}})
+
+        # assert
+        with self.subTest(msg="scalar fields are still mapped"):
+            assert test_other_dto.id == "default_id"
+            assert test_other_dto.name == "Aidan"
+
+        # assert
+        with self.subTest(msg="unrequested nested dto is not mapped"):
+            assert test_other_dto.nested is None
+
+        # assert
+        with self.subTest(msg="requested nested list is mapped"):
+            assert [(item.id, item.name) for item in test_other_dto.nested_list] == [("2", "first"),
+                                                                                     ("3", "second")]
+
     def test_add_custom_rule(self):
         # arrange
         brand = AutoFixture().create(dto=Brand, list_limit=5)
@@ -267,6 +299,73 @@ class TestPinfluencerMapper(TestCase):
             mapped_brand = mapper.map(_from=brand_request, to=Brand)
             self.assertEqual(list(map(lambda x: x.value, mapped_brand.values)), brand_request.values)
 
+    def test_map_with_rules_added_after_mapping(self):
+        # arrange
+        mapper = PinfluencerObjectMapper(logger=DummyLogger())
+        test_dto = TestDto(name="Aidan", nested=NestedTestDto(id="1"), nested_list=[])
+        before = mapper.map(_from=test_dto, to=TestOtherDto)
+
+        # act
+        mapper.add_rule(_type_from=TestDto,
+                        _type_to=TestOtherDto,
+                        field="name",
+                        expression=lambda to, _from: setattr(to, "name", _from.name.upper()))
+        mapper.add_rule(_type_from=TestDto,
+                        _type_to=TestOtherDto,
+                        field="name",
+                        expression=lambda to, _from: setattr(to, "name", "second rule"))
+        after = mapper.map(_from=test_dto, to=TestOtherDto)
+
+        # assert
+        with self.subTest(msg="property was copied before the rule existed"):
+            assert before.name == "Aidan"
+
+        # assert
+        with self.subTest(msg="first rule added for a field is applied"):
+            assert after.name == "AIDAN"
+
+        # assert
+        with self.subTest(msg="rule is indexed by types and field"):
+            assert mapper.rule_for(_type_from=TestDto, _type_to=TestOtherDto, field="name") == mapper.rules[0]
+            assert mapper.rule_for(_type_from=TestOtherDto, _type_to=TestDto, field="name") is None
+
+    def test_map_when_rule_finds_nothing_to_map(self):
+        # arrange
+        mapper = PinfluencerObjectMapper(logger=DummyLogger())
+        mapper.add_rule(_type_from=TestDto,
+                        _type_to=TestOtherDto,
+                        field="nested",
+                        expression=lambda to, _from: [][0])
+
+        # act
+        actual = mapper.map(_from=TestDto(nested=NestedTestDto(id="1", name="nested"), nested_list=[]), to=TestOtherDto)
+
+        # assert
+        assert actual.nested == NestedTestOtherDto(id="1", name="nested")
+
+    def test_map_reuses_target_mapping_steps(self):
+        # arrange
+        mapper = PinfluencerObjectMapper(logger=DummyLogger())
+        test_dto = TestDto(nested=NestedTestDto(), nested_list=[])
+        mapper.map(_from=test_dto, to=TestOtherDto)
+        hits = target_mapping_steps.cache_info().hits
+
+        # act
+        mapper.map(_from=test_dto, to=TestOtherDto)
+        PinfluencerObjectMapper(logger=DummyLogger()).map(_from=test_dto, to=TestOtherDto)
+
+        # assert
+        with self.subTest(msg="plans are cached per mapper and a new mapper reuses classified steps"):
+            assert target_mapping_steps.cache_info().hits == hits + 2
+
+        # assert
+        with self.subTest(msg="target steps are classified once"):
+            assert target_mapping_steps(TestOtherDto)["nested"] == MappingStep(kind=MAPPING_NESTED,
+                                                                               to=NestedTestOtherDto)
+            assert target_mapping_steps(TestOtherDto)["nested_list"] == MappingStep(kind=MAPPING_LIST,
+                                                                                    to=NestedTestOtherDto)
+            assert target_mapping_steps(TestOtherDto)["list_of_strings"] == MappingStep(kind=MAPPING_COPY)
+
     @data(([Brand, Brand], [BrandRequestDto, BrandResponseDto], ['values', 'values']),
           ([Brand, Brand], [BrandRequestDto, BrandRequestDto], ['values', 'categories']))
     def test_add_custom_rules(self, _input: tuple[list[type], list[type], list[str]]):
@@ -393,6 +492,20 @@ class TestJsonSnakeToCamelSerializer(TestCase):
         # assert
         assert expected == actual
 
+    @data(TEST_DICT,
+          [],
+          TEST_LIST_OF_DICTS_WITH_ENUM,
+          [1, "two", ValueEnum.ORGANIC])
+    def test_serialize_chunks(self, input_data):
+        # act
+        chunks = list(self.__json_snake_to_camel_serializer.serialize_chunks(input_data))
+
+        # assert
+        with self.subTest(msg="chunks join to the serialized body"):
+            assert json.loads("".join(chunks)) == json.loads(self.__json_snake_to_camel_serializer.serialize(input_data))
+        with self.subTest(msg="collections are chunked per item"):
+            assert len(chunks) == (len(input_data) + 2 if isinstance(input_data, list) else 1)
+
     def test_serialize_nested(self):
         # arrange
         input_data = TEST_NESTED_DICT
@@ -475,3 +588,383 @@ class TestJsonCamelToSnakeCaseDeserializer(TestCase):
 
         # assert
         assert expected == actual
+
+
+@ddt
+class TestKeyConversion(TestCase):
+
+    @data(("brand_name", "brandName"),
+          ("insta_handle", "instaHandle"),
+          ("id", "id"))
+    def test_snake_case_to_camel_case(self, case):
+        # arrange
+        (key, expected) = case
+
+        # act/assert
+        assert snake_case_to_camel_case(key) == expected
+
+    def test_key_conversion_is_cached(self):
+        # arrange
+        camel_case_to_snake_case("someUncachedKey")
+        hits = camel_case_to_snake_case.cache_info().hits
+
+        # act
+        actual = camel_case_to_snake_case("someUncachedKey")
+
+        # assert
+        with self.subTest(msg="key is converted"):
+            assert actual == "some_uncached_key"
+        with self.subTest(msg="conversion is served from the cache"):
+            assert camel_case_to_snake_case.cache_info().hits == hits + 1
+
+    def test_warm_key_caches(self):
+        # act
+        warm_key_caches(dtos=[BrandResponseDto])
+
+        # assert
+        hits = snake_case_to_camel_case.cache_info().hits
+        snake_case_to_camel_case("brand_name")
+        assert snake_case_to_camel_case.cache_info().hits == hits + 1
+
+
+class TestJsonBackend(TestCase):
+
+    def test_json_backend_defaults_to_standard_library(self):
+        # act
+        with patch.dict("os.environ", {}, clear=True):
+            actual = json_backend()
+
+        # assert
+        assert isinstance(actual, StandardJsonBackend)
+
+    def test_json_backend_when_orjson_is_selected(self):
+        # act
+        with patch("src.crosscutting.orjson", Mock()), patch.dict("os.environ", {"JSON_BACKEND": "orjson"}):
+            actual = json_backend()
+
+        # assert
+        assert isinstance(actual, OrjsonBackend)
+
+    def test_json_backend_when_orjson_is_selected_but_not_installed(self):
+        # act
+        with patch("src.crosscutting.orjson", None), patch.dict("os.environ", {"JSON_BACKEND": "orjson"}):
+            actual = json_backend()
+
+        # assert
+        assert isinstance(actual, StandardJsonBackend)
+
+    def test_orjson_backend_loads_applies_hook_to_nested_objects(self):
+        # arrange
+        orjson = Mock()
+        orjson.loads = Mock()
+
+        # act
+        with patch("src.crosscutting.orjson", orjson):
+            actual = OrjsonBackend().loads(json.dumps([{"brandName": "x", "values": [{"valueName": "y"}]}]),
+                                           object_pairs_hook=lambda pairs: {key.upper(): value
+                                                                            for (key, value) in pairs})
+
+        # assert
+        with self.subTest(msg="hook is applied to every object"):
+            assert actual == [{"BRANDNAME": "x", "VALUES": [{"VALUENAME": "y"}]}]
+
+        # assert
+        with self.subTest(msg="hooked loads use the standard parser"):
+            orjson.loads.assert_not_called()
+
+    def test_orjson_backend_dumps_passes_written_bodies_to_default(self):
+        # arrange
+        orjson = Mock()
+        orjson.OPT_PASSTHROUGH_DATETIME = 1
+        orjson.OPT_PASSTHROUGH_DATACLASS = 2
+        orjson.OPT_NON_STR_KEYS = 4
+        orjson.dumps = Mock(return_value=b"{}")
+        written = SerializedJson(chunks=("[", '{"brandName": "x"}', "]"))
+
+        # act
+        with patch("src.crosscutting.orjson", orjson):
+            OrjsonBackend().dumps({"responses": [{"body": written}]})
+
+        # assert
+        with self.subTest(msg="dataclasses are passed through to json_default instead of encoded by field"):
+            (_, kwargs) = orjson.dumps.call_args
+            assert kwargs["default"] is json_default
+            assert kwargs["option"] & orjson.OPT_PASSTHROUGH_DATACLASS
+
+        # assert
+        with self.subTest(msg="written body is decoded as json rather than its chunks"):
+            assert json_default(written) == [{"brandName": "x"}]
+
+    def test_serializer_and_deserializer_use_backend(self):
+        # arrange
+        backend = Mock()
+        backend.dumps = Mock(return_value="{}")
+        backend.loads = Mock(return_value={})
+
+        # act
+        JsonSnakeToCamelSerializer(backend=backend).serialize({"brand_name": "x"})
+        JsonCamelToSnakeCaseDeserializer(backend=backend).deserialize("{}")
+
+        # assert
+        with self.subTest(msg="keys are converted before encoding"):
+            backend.dumps.assert_called_once_with({"brandName": "x"})
+        with self.subTest(msg="decoding is delegated"):
+            assert backend.loads.call_args[0] == ("{}",)
+
+
+@ddt
+class TestDeserializeFields(TestCase):
+
+    def setUp(self):
+        self.__sut = JsonCamelToSnakeCaseDeserializer()
+
+    def test_deserialize_fields(self):
+        # arrange
+        input_data = json.dumps({"brandName": "Pinfluencer",
+                                 "insta_handle": "@pinfluencer",
+                                 "values": ["ORGANIC", "VEGAN"],
+                                 "categories": None,
+                                 "notAField": {"nestedKey": 1}})
+
+        # act
+        actual = self.__sut.deserialize_fields(input_data, to=BrandRequestDto)
+
+        # assert
+        assert actual == {"brand_name": "Pinfluencer",
+                          "insta_handle": "@pinfluencer",
+                          "values": [ValueEnum.ORGANIC, ValueEnum.VEGAN],
+                          "categories": None}
+
+    def test_deserialize_fields_matches_deserialize_and_map(self):
+        # arrange
+        request = BrandRequestDto(brand_name="Pinfluencer", website="https://pinfluencer.link",
+                                  values=[ValueEnum.ORGANIC], categories=[CategoryEnum.FOOD])
+        input_data = JsonSnakeToCamelSerializer().serialize(request.__dict__)
+        body = JsonCamelToSnakeCaseDeserializer().deserialize(input_data)
+        body["values"] = [ValueEnum[value] for value in body["values"]]
+        body["categories"] = [CategoryEnum[category] for category in body["categories"]]
+
+        # act
+        actual = BrandRequestDto(**self.__sut.deserialize_fields(input_data, to=BrandRequestDto))
+
+        # assert
+        assert actual == test_mapper().map_from_dict(_from=body, to=BrandRequestDto) == request
+
+    @data('{"values": ["NOT_A_VALUE"]}', '{"values": 1}', '[]', '{"brandName": ', '')
+    def test_deserialize_fields_when_body_is_invalid(self, input_data):
+        # act/assert
+        with self.assertRaises(RequestDecodeException):
+            self.__sut.deserialize_fields(input_data, to=BrandRequestDto)
+
+
+class TestSlottedDtos(TestCase):
+
+    def test_slotted(self):
+        # arrange
+        dto = slotted(InheritedDto)
+
+        # act
+        actual = dto(name="name")
+
+        # assert
+        with self.subTest(msg="instances have no dict"):
+            assert not hasattr(actual, "__dict__")
+        with self.subTest(msg="defaults are kept"):
+            assert (actual.id, actual.name) == ("default_id", "name")
+        with self.subTest(msg="fields are kept"):
+            assert asdict(actual) == {"id": "default_id", "name": "name"}
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTimedLruCache(TestCase):
+
+    def setUp(self):
+        self.__clock = FakeClock()
+        self.__sut = TimedLruCache(ttl_seconds=10, max_size=2, clock=self.__clock)
+
+    def test_get(self):
+        # arrange
+        self.__sut.set("key", "value")
+
+        # act
+        actual = self.__sut.get("key")
+
+        # assert
+        assert actual == "value"
+
+    def test_get_when_key_missing(self):
+        assert self.__sut.get("key") is None
+
+    def test_get_when_entry_expired(self):
+        # arrange
+        self.__sut.set("key", "value")
+        self.__clock.now = 10
+
+        # act
+        actual = self.__sut.get("key")
+
+        # assert
+        with self.subTest(msg="expired value is not returned"):
+            assert actual is None
+
+        # assert
+        with self.subTest(msg="expired value is evicted"):
+            assert len(self.__sut) == 0
+
+    def test_set_when_max_size_exceeded(self):
+        # arrange
+        self.__sut.set("key1", "value1")
+        self.__sut.set("key2", "value2")
+        self.__sut.get("key1")
+
+        # act
+        self.__sut.set("key3", "value3")
+
+        # assert
+        with self.subTest(msg="least recently used entry is evicted"):
+            assert self.__sut.get("key2") is None
+
+        # assert
+        with self.subTest(msg="recently used entries are kept"):
+            assert self.__sut.get("key1") == "value1"
+            assert self.__sut.get("key3") == "value3"
+
+    def test_invalidate(self):
+        # arrange
+        self.__sut.set("key", "value")
+
+        # act
+        self.__sut.invalidate("key")
+
+        # assert
+        assert self.__sut.get("key") is None
+
+
+class TestBatchLoader(TestCase):
+
+    def setUp(self):
+        self.__batches = []
+        self.__sut = BatchLoader(batch_load=self.__batch_load, max_batch_size=2)
+
+    def __batch_load(self, keys: list) -> dict:
+        self.__batches.append(keys)
+        return {key: f"value-{key}" for key in keys if key != "missing"}
+
+    def test_load_many(self):
+        # act
+        actual = self.__sut.load_many(keys=["a", "b", "a", "c"])
+
+        # assert
+        with self.subTest(msg="values are returned in key order"):
+            assert actual == ["value-a", "value-b", "value-a", "value-c"]
+
+        # assert
+        with self.subTest(msg="keys are de-duplicated and batched"):
+            assert self.__batches == [["a", "b"], ["c"]]
+
+    def test_load_many_when_keys_already_loaded(self):
+        # arrange
+        self.__sut.load(key="a")
+
+        # act
+        actual = self.__sut.load_many(keys=["a", "b"])
+
+        # assert
+        with self.subTest(msg="values are returned in key order"):
+            assert actual == ["value-a", "value-b"]
+
+        # assert
+        with self.subTest(msg="only unseen keys are loaded"):
+            assert self.__batches == [["a"], ["b"]]
+
+    def test_load_when_key_missing(self):
+        # act
+        actual = self.__sut.load(key="missing")
+
+        # assert
+        assert actual is None
+
+    def test_load_many_when_called_concurrently(self):
+        # arrange
+        def slow_batch_load(keys: list) -> dict:
+            time.sleep(0.05)
+            return self.__batch_load(keys=keys)
+        sut = BatchLoader(batch_load=slow_batch_load)
+
+        # act
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            actual = list(executor.map(lambda _: sut.load(key="a"), range(4)))
+
+        # assert
+        with self.subTest(msg="every caller gets the value"):
+            assert actual == ["value-a"] * 4
+
+        # assert
+        with self.subTest(msg="key is loaded once"):
+            assert self.__batches == [["a"]]
+
+
+class TestServerTiming(TestCase):
+
+    def setUp(self):
+        self.__clock = FakeClock()
+        self.__sut = ServerTiming(clock=self.__clock)
+        self.__sut.begin(enabled=True)
+
+    def test_header(self):
+        # arrange
+        with self.__sut.measure(phase="db"):
+            self.__clock.now += 0.01
+        with self.__sut.measure(phase="mapping"):
+            self.__clock.now += 0.002
+        with self.__sut.measure(phase="db"):
+            self.__clock.now += 0.005
+
+        # act
+        header = self.__sut.header()
+
+        # assert
+        assert header == "db;dur=15.0, mapping;dur=2.0, total;dur=17.0"
+
+    def test_measure_when_nested(self):
+        # arrange
+        with self.__sut.measure(phase="mapping"):
+            self.__clock.now += 0.001
+            with self.__sut.measure(phase="mapping"):
+                self.__clock.now += 0.001
+
+        # act
+        header = self.__sut.header()
+
+        # assert
+        assert header == "mapping;dur=2.0, total;dur=2.0"
+
+    def test_measure_when_disabled(self):
+        # arrange
+        self.__sut.begin(enabled=False)
+
+        # act
+        with self.__sut.measure(phase="db"):
+            self.__clock.now += 0.01
+
+        # assert
+        assert self.__sut.header() == "total;dur=10.0"
+
+    def test_begin_resets_timings(self):
+        # arrange
+        with self.__sut.measure(phase="db"):
+            self.__clock.now += 0.01
+
+        # act
+        self.__sut.begin(enabled=True)
+
+        # assert
+        assert self.__sut.header() == "total;dur=0.0"
@@ -1,10 +1,10 @@
 from unittest import TestCase
 
-from sqlalchemy import or_
+from sqlalchemy import or_, create_engine, inspect, text
 
 from src.app import logger_factory
 from src.crosscutting import AutoFixture
-from src.data.entities import create_mappings
+from src.data.entities import create_mappings, add_missing_columns, brand_table, USER_CLAIM_COLUMNS
 from src.domain.models import Brand, Value, Influencer, Category, Listing
 from tests import InMemorySqliteDataManager
 
@@ -171,4 +171,26 @@ class TestListingSchema(TestCase):
             categories = self.__sut.session.query(Category).filter(or_(getattr(Category, 'brand_id') is None,
                                                                        getattr(Category, 'influencer_id') is None,
                                                                        getattr(Category, 'listing_id') is None)).all()
-            self.assertEqual(len(categories), 0)
\ No newline at end of file
+            self.assertEqual(len(categories), 0)
+
+
+class TestAddMissingColumns(TestCase):
+
+    def test_add_missing_columns(self):
+        # arrange
+        engine = create_engine('sqlite:///:memory:')
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE brand (id VARCHAR(36) PRIMARY KEY, email VARCHAR(360))"))
+
+        # act
+        added = add_missing_columns(engine=engine, table=brand_table, column_names=USER_CLAIM_COLUMNS)
+        rerun = add_missing_columns(engine=engine, table=brand_table, column_names=USER_CLAIM_COLUMNS)
+
+        # assert
+        with self.subTest(msg="only missing columns are added"):
+            assert added == ["brand.given_name", "brand.family_name"]
+        with self.subTest(msg="table has every claim column"):
+            columns = {column["name"] for column in inspect(engine).get_columns("brand")}
+            assert set(USER_CLAIM_COLUMNS) <= columns
+        with self.subTest(msg="migration can be rerun"):
+            assert rerun == []
@@ -10,9 +10,9 @@ from src._types import AuthUserRepository, BrandRepository, ImageRepository, Not
     AudienceAgeRepository, InfluencerRepository, AudienceGenderRepository, ListingRepository, CollaborationRepository
 from src.crosscutting import JsonCamelToSnakeCaseDeserializer, AutoFixture, PinfluencerObjectMapper
 from src.domain.models import User, ValueEnum, CategoryEnum, AudienceAgeSplit, AudienceGenderSplit, \
-    AudienceAge, Listing
-from src.domain.validation import InfluencerValidator, BrandValidator, ListingValidator
-from src.exceptions import NotFoundException
+    AudienceAge, Listing, ImageUpload
+from src.domain.validation import InfluencerValidator, BrandValidator, ListingValidator, ImageUploadValidator
+from src.exceptions import NotFoundException, ImageException
 from src.web import PinfluencerContext, PinfluencerResponse
 from src.web.error_capsules import AudienceDataAlreadyExistsErrorCapsule, BrandNotFoundErrorCapsule, \
     InfluencerNotFoundErrorCapsule, ListingNotFoundErrorCapsule, BrandNotAuthorized
@@ -47,6 +47,43 @@ class TestCommonAfterHooks(TestCase):
         # assert
         assert context.response.body["image"] == f'{TEST_S3_URL}/{path}'
 
+    def test_set_image_url_tags_variants(self):
+        # arrange
+        context = PinfluencerContext(response=PinfluencerResponse(body={
+            "image": "brands/1234/image.png"
+        }))
+
+        # act
+        self.__sut.set_image_url(context=context,
+                                 image_fields=["image"])
+
+        # assert
+        assert context.response.body["image_variants"] == {
+            "thumbnail": f'{TEST_S3_URL}/brands/1234/image_thumbnail.webp',
+            "medium": f'{TEST_S3_URL}/brands/1234/image_medium.webp',
+            "webp": f'{TEST_S3_URL}/brands/1234/image_webp.webp'
+        }
+
+    def test_set_image_url_when_image_is_not_requested(self):
+        # arrange
+        context = PinfluencerContext(response=PinfluencerResponse(body={
+            "image": "brands/1234/image.png",
+            "logo": "brands/1234/logo.png"
+        }), fields={"logo_variants": None})
+
+        # act
+        self.__sut.set_image_url(context=context,
+                                 image_fields=["image", "logo"])
+
+        # assert
+        with self.subTest(msg="unrequested image is untouched"):
+            assert context.response.body["image"] == "brands/1234/image.png"
+            assert "image_variants" not in context.response.body
+
+        # assert
+        with self.subTest(msg="requested image variants are tagged"):
+            assert context.response.body["logo_variants"]["webp"] == f'{TEST_S3_URL}/brands/1234/logo_webp.webp'
+
     def test_set_image_url_for_collection(self):
         # arrange
         path = "image_path"
@@ -573,6 +610,7 @@ class TestCommonHooks(TestCase):
         self.__sut = CommonBeforeHooks(deserializer=self.__deserializer,
                                        image_repo=self.__image_repo,
                                        object_mapper=self.__object_mapper,
+                                       image_upload_validator=ImageUploadValidator(),
                                        logger=Mock())
 
     @data("logo", "header-image")
@@ -655,6 +693,152 @@ class TestCommonHooks(TestCase):
         with self.subTest(msg="field was added to request body"):
             assert image_request.image_field == map_list[context.event["pathParameters"]['image_field']]
 
+    def test_create_image_variants(self):
+        # arrange
+        context = PinfluencerContext(body=ImageRequestDto(image_path="some/path/key.png", image_field="logo").__dict__,
+                                     response=PinfluencerResponse(),
+                                     short_circuit=False)
+        self.__image_repo.create_variants = MagicMock(return_value={})
+
+        # act
+        self.__sut.create_image_variants(context=context)
+
+        # assert
+        with self.subTest(msg="image repo was called"):
+            self.__image_repo.create_variants.assert_called_once_with(key="some/path/key.png")
+
+        # assert
+        with self.subTest(msg="middleware does not short"):
+            assert context.short_circuit == False
+
+    def test_create_image_variants_when_image_cannot_be_processed(self):
+        # arrange
+        context = PinfluencerContext(body=ImageRequestDto(image_path="some/path/key.png", image_field="logo").__dict__,
+                                     response=PinfluencerResponse())
+        self.__image_repo.create_variants = MagicMock(side_effect=ImageException())
+
+        # act
+        self.__sut.create_image_variants(context=context)
+
+        # assert
+        with self.subTest(msg="response is 400"):
+            assert context.response.status_code == 400
+
+        # assert
+        with self.subTest(msg="middleware shorts"):
+            assert context.short_circuit == True
+
+    def test_create_image_upload(self):
+        # arrange
+        path = "some/path"
+        upload = ImageUpload(image_key="some/path/key.png",
+                             upload_url="https://upload.url",
+                             headers={"Content-Type": "image/png"})
+        context = PinfluencerContext(body={
+            "content_type": "image/png",
+            "content_length": 1024
+        },
+            response=PinfluencerResponse())
+        self.__image_repo.create_upload = MagicMock(return_value=upload)
+
+        # act
+        self.__sut.create_image_upload(context=context, path=path)
+
+        # assert
+        with self.subTest(msg="image repo was called"):
+            self.__image_repo.create_upload.assert_called_once_with(path=path,
+                                                                    content_type="image/png",
+                                                                    content_length=1024)
+
+        # assert
+        with self.subTest(msg="upload was returned"):
+            assert context.response.body == upload.__dict__
+            assert context.response.status_code == 200
+
+    @data({"content_type": "application/pdf", "content_length": 1024},
+          {"content_type": "image/png", "content_length": 0},
+          {"content_type": "image/png", "content_length": 100 * 1024 * 1024},
+          {"content_type": "image/png"})
+    def test_create_image_upload_when_request_invalid(self, body):
+        # arrange
+        context = PinfluencerContext(body=body, response=PinfluencerResponse())
+        self.__image_repo.create_upload = MagicMock()
+
+        # act
+        self.__sut.create_image_upload(context=context, path="some/path")
+
+        # assert
+        with self.subTest(msg="image repo was not called"):
+            self.__image_repo.create_upload.assert_not_called()
+
+        # assert
+        with self.subTest(msg="response is 400"):
+            assert context.response.status_code == 400
+
+        # assert
+        with self.subTest(msg="middleware shorts"):
+            assert context.short_circuit == True
+
+    def test_confirm_image_upload(self):
+        # arrange
+        key = "some/path/key.png"
+        context = PinfluencerContext(body={
+            "image_key": key
+        },
+            event={
+                "pathParameters": {
+                    "image_field": "logo"
+                }
+            },
+            response=PinfluencerResponse())
+        self.__image_repo.exists = MagicMock(return_value=True)
+        map_list = {
+            "logo": "logo_"
+        }
+
+        # act
+        self.__sut.confirm_image_upload(path="some/path", context=context, map_list=map_list)
+
+        # assert
+        with self.subTest(msg="image repo was called"):
+            self.__image_repo.exists.assert_called_once_with(key=key)
+
+        image_request: ImageRequestDto = self.__object_mapper.map_from_dict(_from=context.body, to=ImageRequestDto)
+
+        # assert
+        with self.subTest(msg="key was added to request body"):
+            assert image_request.image_path == key
+
+        # assert
+        with self.subTest(msg="field was added to request body"):
+            assert image_request.image_field == "logo_"
+
+    @data(("other/path/key.png", True), ("some/path/key.png", False), ("some/path/../key.png", True))
+    def test_confirm_image_upload_when_image_not_uploaded_to_path(self, key_exists):
+        # arrange
+        key, exists = key_exists
+        context = PinfluencerContext(body={
+            "image_key": key
+        },
+            event={
+                "pathParameters": {
+                    "image_field": "logo"
+                }
+            },
+            response=PinfluencerResponse())
+        self.__image_repo.exists = MagicMock(return_value=exists)
+
+        # act
+        self.__sut.confirm_image_upload(path="some/path", context=context, map_list={"logo": "logo"})
+
+        # assert
+        with self.subTest(msg="response is 400"):
+            assert context.response.status_code == 400
+
+        # assert
+        with self.subTest(msg="middleware shorts"):
+            assert context.short_circuit == True
+
     def test_map_enum(self):
         # arrange
         context = PinfluencerContext(body={"value": "ORGANIC"})
@@ -716,6 +900,40 @@ class TestCommonHooks(TestCase):
         # assert
         assert pinfluencer_context.body == body
 
+    def test_set_request(self):
+        # arrange
+        pinfluencer_context = PinfluencerContext(event={"body": '{"brandName": "Pinfluencer", "values": ["ORGANIC"],'
+                                                                ' "unknown": 1}'},
+                                                 response=PinfluencerResponse())
+
+        # act
+        self.__sut.set_request(context=pinfluencer_context, request=BrandRequestDto)
+
+        # assert
+        with self.subTest(msg="body is decoded to the request fields"):
+            assert pinfluencer_context.body == {"brand_name": "Pinfluencer", "values": [ValueEnum.ORGANIC]}
+        with self.subTest(msg="request dto is built from the body"):
+            assert pinfluencer_context.request == BrandRequestDto(brand_name="Pinfluencer", values=[ValueEnum.ORGANIC])
+        with self.subTest(msg="response is untouched"):
+            assert pinfluencer_context.response.status_code == 200
+
+    @data('{"values": ["NOT_A_VALUE"]}', '{"values": 1}', '[]', '{"brandName": ')
+    def test_set_request_when_body_cannot_be_decoded(self, body):
+        # arrange
+        pinfluencer_context = PinfluencerContext(event={"body": body},
+                                                 response=PinfluencerResponse())
+
+        # act
+        self.__sut.set_request(context=pinfluencer_context, request=BrandRequestDto)
+
+        # assert
+        with self.subTest(msg="request is not set"):
+            assert pinfluencer_context.request is None
+        with self.subTest(msg="response is bad request"):
+            assert pinfluencer_context.response.status_code == 400
+        with self.subTest(msg="pipeline is shorted"):
+            assert pinfluencer_context.short_circuit is True
+
 
 class TestBrandAfterHooks(TestCase):
 
@@ -985,6 +1203,9 @@ class TestUserAfterHooks(TestCase):
     def test_tag_auth_user_claims_to_response(self):
         # arrange
         brand = AutoFixture().create(dto=BrandResponseDto, list_limit=5)
+        brand.given_name = None
+        brand.family_name = None
+        brand.email = None
         response = PinfluencerResponse(body=brand.__dict__)
         auth_user: User = AutoFixture().create(dto=User)
         self.__auth_user_repository.get_by_id = MagicMock(return_value=auth_user)
@@ -1001,10 +1222,36 @@ class TestUserAfterHooks(TestCase):
         with self.subTest(msg="repo was called"):
             self.__auth_user_repository.get_by_id.assert_called_once_with(_id=brand.auth_user_id)
 
+    def test_tag_auth_user_claims_to_response_when_claims_are_persisted(self):
+        # arrange
+        brand = AutoFixture().create(dto=BrandResponseDto, list_limit=5)
+        response = PinfluencerResponse(body=dict(brand.__dict__))
+        self.__auth_user_repository.get_by_id = MagicMock()
+
+        # act
+        self.__sut.tag_auth_user_claims_to_response(context=PinfluencerContext(response=response,
+                                                                               event={}))
+
+        # assert
+        with self.subTest(msg="user matches persisted claims"):
+            assert self.__mapper.map_from_dict(_from=response.body, to=User) == User(given_name=brand.given_name,
+                                                                                     family_name=brand.family_name,
+                                                                                     email=brand.email)
+
+        # assert
+        with self.subTest(msg="repo was not called"):
+            self.__auth_user_repository.get_by_id.assert_not_called()
+
     def test_tag_auth_user_claims_to_response_collection(self):
         # arrange
-        self.__sut._generic_claims_tagger = MagicMock()
-        users = AutoFixture().create_many(dto=User, ammount=3)
+        users = AutoFixture().create_many(dto=BrandResponseDto, ammount=3, list_limit=5)
+        for user in users:
+            user.given_name = None
+            user.family_name = None
+            user.email = None
+        users[2].auth_user_id = users[0].auth_user_id
+        auth_users = {user.auth_user_id: AutoFixture().create(dto=User) for user in users}
+        self.__auth_user_repository.get_by_ids = MagicMock(return_value=auth_users)
         context = PinfluencerContext(response=PinfluencerResponse(
             body=list(map(lambda x: x.__dict__, users))
         ))
@@ -1013,12 +1260,54 @@ class TestUserAfterHooks(TestCase):
         self.__sut.tag_auth_user_claims_to_response_collection(context=context)
 
         # assert
-        with self.subTest(msg="generic claims tagger was called"):
-            self.__sut._generic_claims_tagger.assert_has_calls(calls=[
-                call(entity=users[0].__dict__),
-                call(entity=users[1].__dict__),
-                call(entity=users[2].__dict__)
-            ])
+        with self.subTest(msg="auth users were loaded in one batch without duplicates"):
+            self.__auth_user_repository.get_by_ids.assert_called_once_with([users[0].auth_user_id,
+                                                                            users[1].auth_user_id])
+        for index, user in enumerate(context.response.body):
+            with self.subTest(msg=f"user {index} was tagged with claims"):
+                expected_auth_user = auth_users[user["auth_user_id"]]
+                self.assertEqual(expected_auth_user.given_name, user["given_name"])
+                self.assertEqual(expected_auth_user.family_name, user["family_name"])
+                self.assertEqual(expected_auth_user.email, user["email"])
+
+    def test_tag_auth_user_claims_to_response_collection_when_claims_are_persisted(self):
+        # arrange
+        users = AutoFixture().create_many(dto=BrandResponseDto, ammount=3, list_limit=5)
+        self.__auth_user_repository.get_by_ids = MagicMock(return_value={})
+        context = PinfluencerContext(response=PinfluencerResponse(
+            body=list(map(lambda x: x.__dict__, users))
+        ))
+
+        # act
+        self.__sut.tag_auth_user_claims_to_response_collection(context=context)
+
+        # assert
+        self.__auth_user_repository.get_by_ids.assert_not_called()
+
+
+    def test_tag_auth_user_claims_when_claims_are_not_requested(self):
+        # arrange
+        users = AutoFixture().create_many(dto=BrandResponseDto, ammount=2, list_limit=5)
+        for user in users:
+            user.email = None
+        self.__auth_user_repository.get_by_id = MagicMock()
+        self.__auth_user_repository.get_by_ids = MagicMock()
+
+        # act
+        self.__sut.tag_auth_user_claims_to_response(context=PinfluencerContext(
+            response=PinfluencerResponse(body=users[0].__dict__),
+            fields={"brand_name": None}))
+        self.__sut.tag_auth_user_claims_to_response_collection(context=PinfluencerContext(
+            response=PinfluencerResponse(body=[users[1].__dict__]),
+            fields={"brand_name": None}))
+
+        # assert
+        with self.subTest(msg="claims were not loaded for a single user"):
+            self.__auth_user_repository.get_by_id.assert_not_called()
+
+        # assert
+        with self.subTest(msg="claims were not loaded for a collection"):
+            self.__auth_user_repository.get_by_ids.assert_not_called()
 
 
 class TestNotificationAfterHooks(TestCase):
@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+from unittest import TestCase
+from unittest.mock import Mock, MagicMock, call
+
+from src._types import ImageRepository, ImageReferenceRepository
+from src.data.images import ImageGarbageCollector, GARBAGE_COLLECTION_GRACE_PERIOD, ImageVariantBackfiller
+from src.exceptions import ImageException
+
+
+class TestImageGarbageCollector(TestCase):
+
+    def setUp(self) -> None:
+        self.__image_repository: ImageRepository = Mock()
+        self.__image_reference_repository: ImageReferenceRepository = Mock()
+        self.__sut = ImageGarbageCollector(image_repository=self.__image_repository,
+                                           image_reference_repository=self.__image_reference_repository,
+                                           logger=Mock())
+
+    def test_collect(self):
+        # arrange
+        now = datetime.now(tz=timezone.utc)
+        self.__image_reference_repository.load_referenced_keys = MagicMock(side_effect=lambda: {"brands/1/logo.png"})
+        self.__image_repository.list_keys = MagicMock(return_value=["brands/1/logo.png",
+                                                                    "brands/1/logo_thumbnail.webp",
+                                                                    "brands/1/logo_medium.webp",
+                                                                    "brands/1/logo_webp.webp",
+                                                                    "brands/1/old.png",
+                                                                    "brands/1/old_thumbnail.webp"])
+        self.__image_repository.delete = MagicMock()
+
+        # act
+        deleted_keys = self.__sut.collect(now=now)
+
+        # assert
+        with self.subTest(msg="only keys older than the grace period were listed"):
+            self.__image_repository.list_keys.assert_called_once_with(
+                modified_before=now - GARBAGE_COLLECTION_GRACE_PERIOD)
+
+        # assert
+        with self.subTest(msg="unreferenced images and their variants were deleted"):
+            self.__image_repository.delete.assert_called_once_with(keys=["brands/1/old.png",
+                                                                         "brands/1/old_thumbnail.webp"])
+            assert deleted_keys == ["brands/1/old.png", "brands/1/old_thumbnail.webp"]
+
+    def test_collect_when_image_referenced_while_listing(self):
+        # arrange
+        now = datetime.now(tz=timezone.utc)
+        self.__image_reference_repository.load_referenced_keys = MagicMock(side_effect=[{"brands/1/logo.png"},
+                                                                                        {"brands/1/logo.png",
+                                                                                         "brands/1/reused.png"}])
+        self.__image_repository.list_keys = MagicMock(return_value=["brands/1/reused.png",
+                                                                    "brands/1/reused_thumbnail.webp",
+                                                                    "brands/1/old.png"])
+        self.__image_repository.delete = MagicMock()
+
+        # act
+        deleted_keys = self.__sut.collect(now=now)
+
+        # assert
+        with self.subTest(msg="references were reloaded after listing"):
+            assert self.__image_reference_repository.load_referenced_keys.call_count == 2
+
+        # assert
+        with self.subTest(msg="image referenced since the first load and its variants were kept"):
+            self.__image_repository.delete.assert_called_once_with(keys=["brands/1/old.png"])
+            assert deleted_keys == ["brands/1/old.png"]
+
+
+class TestImageVariantBackfiller(TestCase):
+
+    def setUp(self) -> None:
+        self.__image_repository: ImageRepository = Mock()
+        self.__image_reference_repository: ImageReferenceRepository = Mock()
+        self.__sut = ImageVariantBackfiller(image_repository=self.__image_repository,
+                                            image_reference_repository=self.__image_reference_repository,
+                                            logger=Mock())
+
+    def test_backfill(self):
+        # arrange
+        self.__image_reference_repository.load_referenced_keys = MagicMock(return_value={"brands/1/logo.png",
+                                                                                          "brands/1/broken.png"})
+        self.__image_repository.create_variants = MagicMock(
+            side_effect=lambda key: self.__raise(ImageException()) if key == "brands/1/broken.png" else {})
+
+        # act
+        failed_keys = self.__sut.backfill()
+
+        # assert
+        with self.subTest(msg="variants were created for every referenced image"):
+            self.__image_repository.create_variants.assert_has_calls([call(key="brands/1/broken.png"),
+                                                                      call(key="brands/1/logo.png")])
+
+        # assert
+        with self.subTest(msg="images that could not be rendered are returned"):
+            assert failed_keys == ["brands/1/broken.png"]
+
+    @staticmethod
+    def __raise(exception: Exception):
+        raise exception
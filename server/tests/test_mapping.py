@@ -3,10 +3,10 @@ from unittest import TestCase
 
 from ddt import data, ddt
 
-from src.crosscutting import AutoFixture
+from src.crosscutting import AutoFixture, PinfluencerObjectMapper, DummyLogger, FlexiUpdater
 from src.domain.models import Brand, Influencer, Listing, AudienceAge, AudienceAgeSplit, AudienceGenderSplit, \
     AudienceGender, GenderEnum, BrandListing
-from src.web.mapping import MappingRules
+from src.web.mapping import MappingRules, COMPILED_MAPPING_PAIRS
 from src.web.views import BrandRequestDto, BrandResponseDto, InfluencerRequestDto, InfluencerResponseDto, \
     ListingResponseDto, ListingRequestDto, AudienceAgeViewDto, \
     AudienceGenderViewDto, BrandListingResponseDto
@@ -112,6 +112,30 @@ class TestMappingRules(TestCase):
         with self.subTest(msg="audience data matches"):
             self.assertEqual(expected_audience_age_split, audience_age)
 
+    def test_update_audience_gender_split_with_partial_request(self):
+        # arrange
+        audience_gender_split = AudienceGenderSplit(audience_genders=[AudienceGender(gender=GenderEnum.MALE, split=0.4),
+                                                                      AudienceGender(gender=GenderEnum.FEMALE,
+                                                                                     split=0.6)])
+
+        # act
+        FlexiUpdater(mapper=self.__mapper).update(request=AudienceGenderViewDto(audience_male_split=0.3),
+                                                  object_to_update=audience_gender_split)
+
+        # assert
+        self.assertEqual([(GenderEnum.MALE, 0.3), (GenderEnum.FEMALE, 0.6)],
+                         [(gender.gender, gender.split) for gender in audience_gender_split.audience_genders])
+
+    def test_map_audience_age_request_with_open_ended_band(self):
+        # arrange
+        audience_age_split = AudienceAgeSplit(audience_ages=[AudienceAge(min_age=65, max_age=120, split=0.2)])
+
+        # act
+        audience_age_request = self.__mapper.map(_from=audience_age_split, to=AudienceAgeViewDto)
+
+        # assert
+        self.assertEqual(AudienceAgeViewDto(audience_age_65_plus_split=0.2), audience_age_request)
+
     def test_map_brand_to_brand_request(self):
         # arrange
         brand = self.__fixture.create(dto=Brand, list_limit=5)
@@ -668,4 +692,95 @@ class TestMappingRules(TestCase):
 
         # assert
         with self.subTest(msg="listings match"):
-            self.assertEqual(listing_request.id, listing.id)
\ No newline at end of file
+            self.assertEqual(listing_request.id, listing.id)
+
+@ddt
+class TestCompiledMappingParity(TestCase):
+
+    def setUp(self) -> None:
+        self.__compiled_mapper = test_mapper()
+        self.__generic_mapper = PinfluencerObjectMapper(logger=DummyLogger())
+        MappingRules(mapper=self.__generic_mapper, compiled_pairs=[]).add_rules()
+
+    def test_hot_pairs_are_compiled(self):
+        # assert
+        with self.subTest(msg="hot pairs are compiled"):
+            assert self.__compiled_mapper.compiled_pairs == COMPILED_MAPPING_PAIRS
+        with self.subTest(msg="baseline is generic"):
+            assert self.__generic_mapper.compiled_pairs == []
+
+    @data(*COMPILED_MAPPING_PAIRS)
+    def test_map(self, pair):
+        # arrange
+        (_type_from, _type_to) = pair
+        entities = AutoFixture().create_many(dto=_type_from, ammount=5, list_limit=5)
+
+        for (index, entity) in enumerate(entities):
+            # act
+            compiled = self.__compiled_mapper.map(_from=entity, to=_type_to)
+            generic = self.__generic_mapper.map(_from=entity, to=_type_to)
+
+            # assert
+            with self.subTest(msg=f"{_type_from.__name__} {index} maps to the same dto"):
+                assert type(compiled) == type(generic)
+                self.assertEqual(compiled.__dict__, generic.__dict__)
+
+    @data(*COMPILED_MAPPING_PAIRS)
+    def test_map_to_dict(self, pair):
+        # arrange
+        (_type_from, _type_to) = pair
+        entities = AutoFixture().create_many(dto=_type_from, ammount=5, list_limit=5)
+
+        for (index, entity) in enumerate(entities):
+            # act
+            compiled = self.__compiled_mapper.map_to_dict(_from=entity, to=_type_to)
+            generic = self.__generic_mapper.map_to_dict(_from=entity, to=_type_to)
+
+            # assert
+            with self.subTest(msg=f"{_type_from.__name__} {index} maps to the same dict"):
+                self.assertEqual(compiled, generic)
+
+    @data(*COMPILED_MAPPING_PAIRS)
+    def test_map_to_dict_and_ignore_none_fields(self, pair):
+        # arrange
+        (_type_from, _type_to) = pair
+        entity = AutoFixture().create(dto=_type_from, list_limit=5)
+        entity.id = None
+
+        # act
+        compiled = self.__compiled_mapper.map_to_dict_and_ignore_none_fields(_from=entity, to=_type_to)
+        generic = self.__generic_mapper.map_to_dict_and_ignore_none_fields(_from=entity, to=_type_to)
+
+        # assert
+        self.assertEqual(compiled, generic)
+
+    @data(*COMPILED_MAPPING_PAIRS)
+    def test_map_with_fields(self, pair):
+        # arrange
+        (_type_from, _type_to) = pair
+        entity = AutoFixture().create(dto=_type_from, list_limit=5)
+        fields = {"id": None, "values": None}
+
+        # act
+        compiled = self.__compiled_mapper.map_to_dict(_from=entity, to=_type_to, fields=fields)
+        generic = self.__generic_mapper.map_to_dict(_from=entity, to=_type_to, fields=fields)
+
+        # assert
+        self.assertEqual(compiled, generic)
+
+    def test_map_when_rule_is_added_after_compiling(self):
+        # arrange
+        brand = AutoFixture().create(dto=Brand, list_limit=5)
+        self.__compiled_mapper.add_rule(_type_from=Brand,
+                                        _type_to=BrandResponseDto,
+                                        field="brand_name",
+                                        expression=lambda to, _from: setattr(to, "brand_name", "renamed"))
+
+        # act
+        actual = self.__compiled_mapper.map(_from=brand, to=BrandResponseDto)
+
+        # assert
+        with self.subTest(msg="pair is still compiled"):
+            assert (Brand, BrandResponseDto) in self.__compiled_mapper.compiled_pairs
+        with self.subTest(msg="new rule is applied"):
+            assert actual.brand_name == "renamed"
@@ -0,0 +1,87 @@
+import json
+from unittest import TestCase
+
+from src.web.metrics import LatencyHistogram, PipelineMetrics, MAX_METRICS_PER_RECORD
+
+
+class TestLatencyHistogram(TestCase):
+
+    def test_record(self):
+        # arrange
+        sut = LatencyHistogram()
+
+        # act
+        sut.record(milliseconds=0.01)
+        sut.record(milliseconds=3)
+        sut.record(milliseconds=4.9)
+        sut.record(milliseconds=1000000)
+
+        # assert
+        with self.subTest(msg="values are bucket upper bounds"):
+            assert sut.as_values_and_counts() == {"Values": [0.1, 5, 30000], "Counts": [1, 2, 1]}
+        with self.subTest(msg="count is total recorded"):
+            assert sut.count == 4
+
+
+class TestPipelineMetrics(TestCase):
+
+    def setUp(self) -> None:
+        self.__records = []
+        self.__time = [0.0]
+        self.__sut = PipelineMetrics(sink=self.__records.append,
+                                     clock=lambda: self.__time[0])
+
+    def test_emit(self):
+        # arrange
+        started = self.__sut.now()
+        self.__time[0] = 0.003
+        self.__sut.record(route="GET /brands", command="hooks.validate", started=started)
+        self.__sut.record(route="GET /brands", command="hooks.validate", started=started)
+        self.__time[0] = 0.02
+        self.__sut.record(route="GET /brands", command="controller.get_all", started=started)
+
+        # act
+        self.__sut.emit(timestamp=100)
+
+        # assert
+        record = json.loads(self.__records[0])
+        with self.subTest(msg="one record per route"):
+            assert len(self.__records) == 1
+        with self.subTest(msg="route is the dimension"):
+            assert record["Route"] == "GET /brands"
+            assert record["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [["Route"]]
+        with self.subTest(msg="timestamp is in milliseconds"):
+            assert record["_aws"]["Timestamp"] == 100000
+        with self.subTest(msg="every command is declared as a metric"):
+            assert record["_aws"]["CloudWatchMetrics"][0]["Metrics"] == [
+                {"Name": "hooks.validate", "Unit": "Milliseconds"},
+                {"Name": "controller.get_all", "Unit": "Milliseconds"}]
+        with self.subTest(msg="histograms are aggregated per command"):
+            assert record["hooks.validate"] == {"Values": [5], "Counts": [2]}
+            assert record["controller.get_all"] == {"Values": [25], "Counts": [1]}
+
+    def test_emit_clears_recorded_timings(self):
+        # arrange
+        self.__sut.record(route="GET /brands", command="hooks.validate", started=0)
+        self.__sut.emit()
+
+        # act
+        self.__sut.emit()
+
+        # assert
+        assert len(self.__records) == 1
+
+    def test_emit_splits_records_over_metric_limit(self):
+        # arrange
+        for i in range(MAX_METRICS_PER_RECORD + 1):
+            self.__sut.record(route="GET /brands", command=f"command_{i}", started=0)
+
+        # act
+        self.__sut.emit()
+
+        # assert
+        with self.subTest(msg="two records are emitted"):
+            assert len(self.__records) == 2
+        with self.subTest(msg="no record exceeds the limit"):
+            assert all(len(json.loads(record)["_aws"]["CloudWatchMetrics"][0]["Metrics"]) <= MAX_METRICS_PER_RECORD
+                       for record in self.__records)
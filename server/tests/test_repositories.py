@@ -1,19 +1,37 @@
+import base64
+import hashlib
+import io
+import os
+import tempfile
 from unittest import TestCase
-from unittest.mock import Mock, MagicMock
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+from unittest.mock import Mock, MagicMock, call, patch
 
+from PIL import Image
+from botocore.exceptions import ClientError
 from callee import Captor
+from sqlalchemy import event
 
 from src._types import ImageRepository
 from src.app import logger_factory
-from src.crosscutting import AutoFixture
+from src.crosscutting import AutoFixture, TimedLruCache, server_timing, FlexiUpdater
+from src.data.aws import AwsClientFactory
+from src.data.images import ImageVariantRenderer, IMAGE_VARIANTS, ImageGarbageCollector, \
+    GARBAGE_COLLECTION_GRACE_PERIOD
 from src.data.repositories import SqlAlchemyBrandRepository, SqlAlchemyInfluencerRepository, CognitoAuthUserRepository, \
     CognitoAuthService, SqlAlchemyListingRepository, SqlAlchemyNotificationRepository, SqlAlchemyAudienceAgeRepository, \
     SqlAlchemyAudienceGenderRepository, SqlAlchemyBrandListingRepository, SqlAlchemyCollaborationRepository, \
-    SqlAlchemyInfluencerListingRepository
+    SqlAlchemyInfluencerListingRepository, S3ImageRepository, MULTIPART_UPLOAD_PART_SIZE, \
+    SqlAlchemyImageReferenceRepository, SqlAlchemyColumnarAudienceAgeRepository, \
+    SqlAlchemyColumnarAudienceGenderRepository, audience_repositories, migrate_audience_rows_to_profiles, \
+    backfill_user_claims
 from src.domain.models import Brand, Influencer, User, Listing, Notification, AudienceAgeSplit, AudienceAge, \
-    AudienceGenderSplit, AudienceGender, BrandListing, Collaboration, CollaborationStateEnum, InfluencerListing
-from src.exceptions import AlreadyExistsException, NotFoundException
-from tests import InMemorySqliteDataManager
+    AudienceGenderSplit, AudienceGender, BrandListing, Collaboration, CollaborationStateEnum, InfluencerListing, \
+    Value, ValueEnum, AudienceProfile, GenderEnum
+from src.exceptions import AlreadyExistsException, NotFoundException, ImageException
+from src.web.views import BrandRequestDto
+from tests import InMemorySqliteDataManager, LocalFileS3Client, test_mapper
 
 
 class BrandRepositoryTestCase(TestCase):
@@ -181,6 +199,81 @@ class TestBrandRepository(BrandRepositoryTestCase):
             self.assertEqual(actual, expected)
 
 
+class TestQueryTimer(BrandRepositoryTestCase):
+
+    def tearDown(self) -> None:
+        server_timing.begin(enabled=False)
+
+    def test_query_timer(self):
+        # arrange
+        server_timing.begin(enabled=True)
+
+        # act
+        self._sut.load_collection()
+
+        # assert
+        assert [entry.split(";")[0] for entry in server_timing.header().split(", ")] == ["db", "total"]
+
+    def test_query_timer_when_disabled(self):
+        # arrange
+        server_timing.begin(enabled=False)
+
+        # act
+        self._sut.load_collection()
+
+        # assert
+        assert server_timing.header().startswith("total")
+
+
+class TestFlexiUpdaterStatements(BrandRepositoryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.__statements = []
+        self.__flexi_updater = FlexiUpdater(mapper=test_mapper())
+        brand = AutoFixture().create(dto=Brand, list_limit=5)
+        brand.values = [Value(value=ValueEnum.ORGANIC), Value(value=ValueEnum.VEGAN)]
+        self._data_manager.create_fake_data([brand])
+        self.__brand = self._sut.load_by_id(id_=brand.id)
+        event.listen(self._data_manager.engine, "before_cursor_execute", self.__record)
+        self.addCleanup(event.remove, self._data_manager.engine, "before_cursor_execute", self.__record)
+
+    def __record(self, conn, cursor, statement, parameters, context, executemany):
+        self.__statements.append(statement.split(" ")[0])
+
+    def test_update_when_nothing_changed(self):
+        # arrange
+        request = BrandRequestDto(brand_name=self.__brand.brand_name, values=[ValueEnum.VEGAN, ValueEnum.ORGANIC])
+
+        # act
+        changed = self.__flexi_updater.update(request=request, object_to_update=self.__brand)
+        self._data_manager.session.flush()
+
+        # assert
+        with self.subTest(msg="nothing changed"):
+            assert changed == False
+        with self.subTest(msg="no statements were issued"):
+            assert self.__statements == []
+
+    def test_update_child_collection(self):
+        # arrange
+        request = BrandRequestDto(values=[ValueEnum.VEGAN, ValueEnum.RECYCLED])
+        kept = [value for value in self.__brand.values if value.value == ValueEnum.VEGAN][0]
+
+        # act
+        changed = self.__flexi_updater.update(request=request, object_to_update=self.__brand)
+        self._data_manager.session.flush()
+
+        # assert
+        with self.subTest(msg="collection changed"):
+            assert changed == True
+            assert [value.value for value in self.__brand.values] == [ValueEnum.VEGAN, ValueEnum.RECYCLED]
+        with self.subTest(msg="kept child is the same row"):
+            assert self.__brand.values[0] is kept
+        with self.subTest(msg="only the difference is written"):
+            assert sorted(self.__statements) == ["DELETE", "INSERT"]
+
+
 class TestInfluencerRepository(TestCase):
 
     def setUp(self):
@@ -207,7 +300,9 @@ class TestAuthUserRepository(TestCase):
 
     def setUp(self) -> None:
         self.__auth_user_service: CognitoAuthService = Mock()
+        self.__claims_cache = TimedLruCache(ttl_seconds=60, max_size=10)
         self.__sut = CognitoAuthUserRepository(self.__auth_user_service,
+                                               claims_cache=self.__claims_cache,
                                                logger=Mock())
 
     def test_update_brand_claims(self):
@@ -332,6 +427,385 @@ class TestAuthUserRepository(TestCase):
         with self.subTest(msg="email matches"):
             assert actual_brand.email == expected_brand.email
 
+    def test_get_users_by_ids(self):
+        # arrange
+        cached_user = AutoFixture().create(dto=User, list_limit=5)
+        self.__claims_cache.set("1234", cached_user)
+        self.__auth_user_service.get_user = MagicMock(side_effect=lambda username: {
+            'Username': username,
+            'UserAttributes': [
+                {
+                    'Name': 'given_name',
+                    'Value': f"given_name_{username}"
+                },
+                {
+                    'Name': 'family_name',
+                    'Value': f"family_name_{username}"
+                },
+                {
+                    'Name': 'email',
+                    'Value': f"{username}@email.com"
+                }
+            ]
+        })
+
+        # act
+        actual_users = self.__sut.get_by_ids(ids=["1234", "5678", "9012"])
+
+        # assert
+        with self.subTest(msg="auth service was only called for users that were not cached"):
+            self.__auth_user_service.get_user.assert_has_calls(calls=[call(username="5678"),
+                                                                      call(username="9012")],
+                                                               any_order=True)
+            assert self.__auth_user_service.get_user.call_count == 2
+
+        # assert
+        with self.subTest(msg="cached user is returned"):
+            assert actual_users["1234"] == cached_user
+
+        # assert
+        with self.subTest(msg="loaded users are returned"):
+            assert actual_users["5678"].given_name == "given_name_5678"
+            assert actual_users["9012"].email == "9012@email.com"
+
+        # assert
+        with self.subTest(msg="loaded users are cached"):
+            assert self.__claims_cache.get("5678") == actual_users["5678"]
+
+    def test_get_user_by_id_when_claims_are_cached(self):
+        # arrange
+        expected_user = AutoFixture().create(dto=User, list_limit=5)
+        self.__auth_user_service.get_user = MagicMock(return_value={
+            'Username': "1234",
+            'UserAttributes': [
+                {
+                    'Name': 'given_name',
+                    'Value': expected_user.given_name
+                },
+                {
+                    'Name': 'family_name',
+                    'Value': expected_user.family_name
+                },
+                {
+                    'Name': 'email',
+                    'Value': expected_user.email
+                }
+            ]
+        })
+
+        # act
+        self.__sut.get_by_id(_id="1234")
+        actual_user = self.__sut.get_by_id(_id="1234")
+
+        # assert
+        with self.subTest(msg="auth service was only called once"):
+            self.__auth_user_service.get_user.assert_called_once_with(username="1234")
+
+        # assert
+        with self.subTest(msg="user matches"):
+            self.assertEqual(expected_user, actual_user)
+
+    def test_update_brand_claims_invalidates_cached_claims(self):
+        # arrange
+        self.__claims_cache.set("1234", AutoFixture().create(dto=User))
+        self.__auth_user_service.update_user_claims = MagicMock()
+
+        # act
+        self.__sut.update_brand_claims(user=AutoFixture().create(dto=User), auth_user_id="1234")
+
+        # assert
+        self.assertIsNone(self.__claims_cache.get("1234"))
+
+    def test_update_influencer_claims_invalidates_cached_claims(self):
+        # arrange
+        self.__claims_cache.set("1234", AutoFixture().create(dto=User))
+        self.__auth_user_service.update_user_claims = MagicMock()
+
+        # act
+        self.__sut.update_influencer_claims(user=AutoFixture().create(dto=User), auth_user_id="1234")
+
+        # assert
+        self.assertIsNone(self.__claims_cache.get("1234"))
+
+
+class TestS3ImageRepository(TestCase):
+
+    def setUp(self) -> None:
+        self.__directory = tempfile.TemporaryDirectory()
+        self.__s3_client = LocalFileS3Client(root=self.__directory.name, page_size=2)
+        self.__executor = ThreadPoolExecutor()
+        self.__sut = S3ImageRepository(logger=Mock(),
+                                       variant_renderer=ImageVariantRenderer(logger=Mock(), executor=self.__executor),
+                                       client_factory=AwsClientFactory(
+                                           client_builder=lambda service_name, config: self.__s3_client))
+
+    def tearDown(self) -> None:
+        self.__executor.shutdown()
+        self.__directory.cleanup()
+
+    def test_upload(self):
+        # arrange
+        image = b'\x89PNG\r\n\x1a\n' + os.urandom(1024)
+
+        # act
+        key = self.__sut.upload(path="brand/1234", image_base64_encoded=base64.b64encode(image).decode())
+
+        # assert
+        with self.subTest(msg="key is the content hash with png extension"):
+            assert key == f"brand/1234/{hashlib.sha256(image).hexdigest()}.png"
+
+        # assert
+        with self.subTest(msg="image was stored with png content type"):
+            stored = self.__s3_client.get_object(Bucket='pinfluencer-product-images', Key=key)
+            assert stored["Body"] == image
+            assert stored["ContentType"] == "image/png"
+
+        # assert
+        with self.subTest(msg="single put was used"):
+            assert self.__s3_client.part_sizes == []
+
+    def test_upload_when_image_already_stored(self):
+        # arrange
+        image = base64.b64encode(b'\x89PNG\r\n\x1a\n' + os.urandom(1024)).decode()
+        stored_key = self.__sut.upload(path="brand/1234", image_base64_encoded=image)
+        self.__s3_client.put_object = MagicMock()
+
+        # act
+        key = self.__sut.upload(path="brand/1234", image_base64_encoded=image)
+
+        # assert
+        with self.subTest(msg="stored key is returned"):
+            assert key == stored_key
+
+        # assert
+        with self.subTest(msg="image was not uploaded again"):
+            self.__s3_client.put_object.assert_not_called()
+
+    def test_upload_when_image_already_stored_is_collected_before_commit(self):
+        # arrange
+        image = base64.b64encode(b'\x89PNG\r\n\x1a\n' + os.urandom(1024)).decode()
+        stored_key = self.__sut.upload(path="brands/1234", image_base64_encoded=image)
+        stored_path = os.path.join(self.__directory.name, 'pinfluencer-product-images', stored_key)
+        expired = (datetime.now(tz=timezone.utc) - GARBAGE_COLLECTION_GRACE_PERIOD - timedelta(days=1)).timestamp()
+        os.utime(stored_path, (expired, expired))
+        image_reference_repository = Mock()
+        image_reference_repository.load_referenced_keys = MagicMock(side_effect=lambda: set())
+        garbage_collector = ImageGarbageCollector(image_repository=self.__sut,
+                                                  image_reference_repository=image_reference_repository,
+                                                  logger=Mock())
+
+        # act
+        key = self.__sut.upload(path="brands/1234", image_base64_encoded=image)
+        # collection runs before the row referencing the image is committed
+        deleted_keys = garbage_collector.collect()
+
+        # assert
+        with self.subTest(msg="stored key is returned"):
+            assert key == stored_key
+
+        # assert
+        with self.subTest(msg="reused image is not collected"):
+            assert deleted_keys == []
+            assert self.__sut.exists(key=key)
+
+    def test_upload_when_file_type_unknown(self):
+        # arrange
+        image = b'\x00' * 1024
+
+        # act
+        key = self.__sut.upload(path="brand/1234", image_base64_encoded=base64.b64encode(image).decode())
+
+        # assert
+        with self.subTest(msg="key has jpg extension"):
+            assert key.endswith(".jpg")
+
+        # assert
+        with self.subTest(msg="image was stored as jpeg"):
+            assert self.__s3_client.get_object(Bucket='pinfluencer-product-images', Key=key)["ContentType"] \
+                   == "image/jpeg"
+
+    def test_upload_when_image_is_large(self):
+        # arrange
+        image = b'\x89PNG\r\n\x1a\n' + os.urandom(2 * MULTIPART_UPLOAD_PART_SIZE + 1024)
+
+        # act
+        key = self.__sut.upload(path="brand/1234", image_base64_encoded=base64.b64encode(image).decode())
+
+        # assert
+        with self.subTest(msg="image was uploaded in bounded parts"):
+            assert len(self.__s3_client.part_sizes) == 3
+            assert max(self.__s3_client.part_sizes) == MULTIPART_UPLOAD_PART_SIZE
+
+        # assert
+        with self.subTest(msg="parts were assembled into the image"):
+            stored = self.__s3_client.get_object(Bucket='pinfluencer-product-images', Key=key)
+            assert stored["Body"] == image
+            assert stored["ContentType"] == "image/png"
+
+    def test_create_upload(self):
+        # act
+        upload = self.__sut.create_upload(path="brand/1234", content_type="image/png", content_length=1024)
+
+        # assert
+        with self.subTest(msg="key has png extension"):
+            assert upload.image_key.startswith("brand/1234/") and upload.image_key.endswith(".png")
+
+        # assert
+        with self.subTest(msg="upload url is presigned for key"):
+            assert upload.upload_url.startswith(f"file://{self.__directory.name}/pinfluencer-product-images/"
+                                                f"{upload.image_key}")
+
+        # assert
+        with self.subTest(msg="signed headers are returned"):
+            assert upload.headers == {
+                "Content-Type": "image/png",
+                "Content-Length": "1024",
+                "x-amz-tagging": "public=yes"
+            }
+
+    def test_create_variants(self):
+        # arrange
+        image = io.BytesIO()
+        Image.new("RGB", (2048, 1024), color="red").save(image, format="PNG")
+        key = self.__sut.upload(path="brand/1234", image_base64_encoded=base64.b64encode(image.getvalue()).decode())
+
+        # act
+        variant_keys = self.__sut.create_variants(key=key)
+
+        # assert
+        for variant in IMAGE_VARIANTS:
+            with self.subTest(msg=f"{variant.name} variant was stored as webp"):
+                stored = self.__s3_client.get_object(Bucket='pinfluencer-product-images',
+                                                     Key=variant_keys[variant.name])
+                rendered = Image.open(io.BytesIO(stored["Body"]))
+                assert stored["ContentType"] == "image/webp"
+                assert rendered.format == "WEBP"
+
+            with self.subTest(msg=f"{variant.name} variant was resized"):
+                assert max(rendered.size) == (variant.max_size or 2048)
+
+    def test_create_variants_when_variants_already_stored(self):
+        # arrange
+        image = io.BytesIO()
+        Image.new("RGB", (512, 512), color="red").save(image, format="PNG")
+        key = self.__sut.upload(path="brand/1234", image_base64_encoded=base64.b64encode(image.getvalue()).decode())
+        expected_variant_keys = self.__sut.create_variants(key=key)
+        self.__s3_client.download_file = MagicMock()
+
+        # act
+        variant_keys = self.__sut.create_variants(key=key)
+
+        # assert
+        with self.subTest(msg="stored variant keys are returned"):
+            assert variant_keys == expected_variant_keys
+
+        # assert
+        with self.subTest(msg="variants were not rendered again"):
+            self.__s3_client.download_file.assert_not_called()
+
+    def test_create_variants_when_image_invalid(self):
+        # arrange
+        key = self.__sut.upload(path="brand/1234", image_base64_encoded=base64.b64encode(b'\x00' * 1024).decode())
+
+        # act/assert
+        self.assertRaises(ImageException, lambda: self.__sut.create_variants(key=key))
+
+    def test_create_variants_when_image_too_large(self):
+        # arrange
+        image = io.BytesIO()
+        Image.new("RGB", (100, 100), color="red").save(image, format="PNG")
+        key = self.__sut.upload(path="brand/1234", image_base64_encoded=base64.b64encode(image.getvalue()).decode())
+
+        # act/assert
+        with patch.object(Image, "MAX_IMAGE_PIXELS", 1000):
+            self.assertRaises(ImageException, lambda: self.__sut.create_variants(key=key))
+
+    def test_list_keys(self):
+        # arrange
+        keys = [self.__sut.upload(path=path,
+                                  image_base64_encoded=base64.b64encode(os.urandom(64)).decode())
+                for path in ["brands/1234", "brands/1234", "brands/1234", "influencers/1234", "listings/1234"]]
+        self.__sut.upload(path="exports/1234", image_base64_encoded=base64.b64encode(os.urandom(64)).decode())
+
+        # act
+        listed_keys = self.__sut.list_keys(modified_before=datetime.now(tz=timezone.utc) + timedelta(minutes=1))
+
+        # assert
+        with self.subTest(msg="keys from every page of every image prefix are listed"):
+            self.assertCountEqual(listed_keys, keys)
+
+        # assert
+        with self.subTest(msg="keys modified after cutoff are not listed"):
+            assert self.__sut.list_keys(modified_before=datetime.now(tz=timezone.utc) - timedelta(minutes=1)) == []
+
+    def test_delete(self):
+        # arrange
+        keys = [self.__sut.upload(path="brand/1234",
+                                  image_base64_encoded=base64.b64encode(os.urandom(64)).decode()) for _ in range(3)]
+
+        # act
+        self.__sut.delete(keys=keys[:2])
+
+        # assert
+        with self.subTest(msg="deleted keys no longer exist"):
+            assert not self.__sut.exists(key=keys[0])
+            assert not self.__sut.exists(key=keys[1])
+
+        # assert
+        with self.subTest(msg="other keys still exist"):
+            assert self.__sut.exists(key=keys[2])
+
+    def test_exists(self):
+        # arrange
+        key = self.__sut.upload(path="brand/1234",
+                                image_base64_encoded=base64.b64encode(b'\x89PNG\r\n\x1a\n').decode())
+
+        # act/assert
+        with self.subTest(msg="uploaded image exists"):
+            assert self.__sut.exists(key=key)
+
+        # act/assert
+        with self.subTest(msg="image that was never uploaded does not exist"):
+            assert not self.__sut.exists(key="brand/1234/missing.png")
+
+    def test_upload_when_multipart_upload_fails(self):
+        # arrange
+        image = b'\x89PNG\r\n\x1a\n' + os.urandom(2 * MULTIPART_UPLOAD_PART_SIZE)
+        self.__s3_client.upload_part = MagicMock(side_effect=ClientError(error_response={},
+                                                                         operation_name="UploadPart"))
+
+        # act/assert
+        with self.subTest(msg="image exception is raised"):
+            self.assertRaises(ImageException,
+                              lambda: self.__sut.upload(path="brand/1234",
+                                                        image_base64_encoded=base64.b64encode(image).decode()))
+
+        # assert
+        with self.subTest(msg="multipart upload was aborted"):
+            assert self.__s3_client.pending_uploads() == []
+
+
+class TestImageReferenceRepository(TestCase):
+
+    def setUp(self) -> None:
+        self.__data_manager = InMemorySqliteDataManager()
+        self.__sut = SqlAlchemyImageReferenceRepository(data_manager=self.__data_manager, logger=Mock())
+
+    def test_load_referenced_keys(self):
+        # arrange
+        brand = AutoFixture().create(dto=Brand, list_limit=5)
+        influencer = AutoFixture().create(dto=Influencer, list_limit=5)
+        influencer.image = None
+        listing = AutoFixture().create(dto=Listing, list_limit=5)
+        listing.brand_auth_user_id = brand.auth_user_id
+        self.__data_manager.create_fake_data([brand, influencer, listing])
+
+        # act
+        keys = self.__sut.load_referenced_keys()
+
+        # assert
+        assert keys == {brand.logo, brand.header_image, listing.product_image}
+
 
 class TestInfluencerListingRepository(TestCase):
 
@@ -592,3 +1066,196 @@ class TestAudienceAgeRepository(TestCase):
 
         with self.subTest(msg="captured repo value was returned age ranges"):
             self.assertEqual(returned_audience_age_split, AudienceAgeSplit(audience_ages=audience_ages))
+
+    def test_save_for_influencer_writes_added_bands(self):
+        # arrange
+        self.__sut.write_new_for_influencer(payload=AudienceAgeSplit(audience_ages=[AudienceAge(min_age=13,
+                                                                                                max_age=17,
+                                                                                                split=0.4)]),
+                                            auth_user_id="user1234")
+        self.__sut.save()
+        audience_age_split = self.__sut.load_for_influencer(auth_user_id="user1234")
+        audience_age_split.audience_ages.append(AudienceAge(min_age=18, max_age=24, split=0.6))
+
+        # act
+        self.__sut.save_for_influencer(payload=audience_age_split, auth_user_id="user1234")
+        self.__sut.save()
+
+        # assert
+        actual = self.__sut.load_for_influencer(auth_user_id="user1234")
+        assert sorted((age.min_age, age.split) for age in actual.audience_ages) == [(13, 0.4), (18, 0.6)]
+
+
+class TestColumnarAudienceRepositories(TestCase):
+
+    def setUp(self) -> None:
+        self.__data_manager = InMemorySqliteDataManager()
+        self.__age_repository = SqlAlchemyColumnarAudienceAgeRepository(data_manager=self.__data_manager,
+                                                                        logger=logger_factory())
+        self.__gender_repository = SqlAlchemyColumnarAudienceGenderRepository(data_manager=self.__data_manager,
+                                                                              logger=logger_factory())
+
+    def test_write_for_influencer(self):
+        # arrange
+        ages = AudienceAgeSplit(audience_ages=[AudienceAge(min_age=13, max_age=17, split=0.25),
+                                               AudienceAge(min_age=65, split=0.75)])
+        genders = AudienceGenderSplit(audience_genders=[AudienceGender(gender=GenderEnum.MALE, split=0.4),
+                                                        AudienceGender(gender=GenderEnum.FEMALE, split=0.6)])
+
+        # act
+        self.__gender_repository.write_new_for_influencer(payload=genders, auth_user_id="user1234")
+        self.__age_repository.write_new_for_influencer(payload=ages, auth_user_id="user1234")
+        self.__age_repository.save()
+
+        # assert
+        profiles = self.__data_manager.session.query(AudienceProfile).all()
+        with self.subTest(msg="ages and genders share a single row"):
+            assert len(profiles) == 1
+        with self.subTest(msg="bands are written to their columns"):
+            assert (profiles[0].audience_age_13_to_17_split,
+                    profiles[0].audience_age_65_plus_split,
+                    profiles[0].audience_male_split,
+                    profiles[0].audience_female_split) == (0.25, 0.75, 0.4, 0.6)
+        with self.subTest(msg="profile belongs to the influencer"):
+            assert profiles[0].influencer_auth_user_id == "user1234"
+        with self.subTest(msg="no rows are written in the row format"):
+            assert self.__data_manager.session.query(AudienceAge).count() == 0
+
+    def test_write_for_influencer_when_profile_written_concurrently(self):
+        # arrange
+        self.__data_manager.create_fake_data([AudienceProfile(influencer_auth_user_id="user1234",
+                                                              audience_female_split=1.0)])
+        load_profile = self.__age_repository.load_profile
+        # the first read misses the row another request is about to commit
+        self.__age_repository.load_profile = MagicMock(side_effect=[None, load_profile(auth_user_id="user1234")])
+        ages = AudienceAgeSplit(audience_ages=[AudienceAge(min_age=13, max_age=17, split=1.0)])
+
+        # act
+        self.__age_repository.write_new_for_influencer(payload=ages, auth_user_id="user1234")
+        self.__age_repository.save()
+
+        # assert
+        profiles = self.__data_manager.session.query(AudienceProfile).all()
+        with self.subTest(msg="existing row is reused"):
+            assert len(profiles) == 1
+        with self.subTest(msg="bands are written to the existing row"):
+            assert (profiles[0].audience_age_13_to_17_split, profiles[0].audience_female_split) == (1.0, 1.0)
+
+    def test_load_for_influencer(self):
+        # arrange
+        self.__data_manager.create_fake_data([AudienceProfile(influencer_auth_user_id="user1234",
+                                                              audience_age_18_to_24_split=0.5,
+                                                              audience_age_65_plus_split=0.5,
+                                                              audience_female_split=1.0)])
+
+        # act
+        ages = self.__age_repository.load_for_influencer(auth_user_id="user1234")
+        genders = self.__gender_repository.load_for_influencer(auth_user_id="user1234")
+
+        # assert
+        with self.subTest(msg="only written age bands are loaded"):
+            assert [(age.min_age, age.max_age, age.split) for age in ages.audience_ages] == [(18, 24, 0.5),
+                                                                                            (65, None, 0.5)]
+        with self.subTest(msg="only written genders are loaded"):
+            assert [(gender.gender, gender.split) for gender in genders.audience_genders] == [(GenderEnum.FEMALE,
+                                                                                              1.0)]
+
+    def test_load_for_influencer_when_not_found(self):
+        # act/assert
+        assert self.__age_repository.load_for_influencer(auth_user_id="user1234") == AudienceAgeSplit()
+
+    def test_save_for_influencer(self):
+        # arrange
+        self.__data_manager.create_fake_data([AudienceProfile(influencer_auth_user_id="user1234",
+                                                              audience_male_split=0.5,
+                                                              audience_female_split=0.5)])
+        genders = self.__gender_repository.load_for_influencer(auth_user_id="user1234")
+        genders.audience_genders[0].split = 0.1
+
+        # act
+        self.__gender_repository.save_for_influencer(payload=genders, auth_user_id="user1234")
+        self.__gender_repository.save()
+
+        # assert
+        profile = self.__data_manager.session.query(AudienceProfile).one()
+        assert (profile.audience_male_split, profile.audience_female_split) == (0.1, 0.5)
+
+
+class TestAudienceStorage(TestCase):
+
+    def test_audience_repositories(self):
+        # act/assert
+        with self.subTest(msg="rows by default"):
+            with patch.dict("os.environ", {}, clear=True):
+                assert audience_repositories() == (SqlAlchemyAudienceAgeRepository,
+                                                   SqlAlchemyAudienceGenderRepository)
+        with self.subTest(msg="columns when selected"):
+            with patch.dict("os.environ", {"AUDIENCE_STORAGE": "columns"}):
+                assert audience_repositories() == (SqlAlchemyColumnarAudienceAgeRepository,
+                                                   SqlAlchemyColumnarAudienceGenderRepository)
+
+    def test_migrate_audience_rows_to_profiles(self):
+        # arrange
+        data_manager = InMemorySqliteDataManager()
+        SqlAlchemyColumnarAudienceAgeRepository(data_manager=data_manager, logger=logger_factory())
+        data_manager.create_fake_data([AudienceAge(min_age=13, max_age=17, split=0.3, influencer_auth_user_id="a"),
+                                       AudienceAge(min_age=65, split=0.7, influencer_auth_user_id="a"),
+                                       AudienceGender(gender=GenderEnum.MALE, split=1.0, influencer_auth_user_id="a"),
+                                       AudienceGender(gender=GenderEnum.FEMALE, split=0.2, influencer_auth_user_id="b"),
+                                       AudienceProfile(influencer_auth_user_id="b", audience_female_split=0.9)])
+
+        # act
+        migrated = migrate_audience_rows_to_profiles(session=data_manager.session)
+        data_manager.session.commit()
+        rerun = migrate_audience_rows_to_profiles(session=data_manager.session)
+
+        # assert
+        profiles = {profile.influencer_auth_user_id: profile
+                    for profile in data_manager.session.query(AudienceProfile).all()}
+        with self.subTest(msg="a profile is written per influencer"):
+            assert (migrated, sorted(profiles)) == (1, ["a", "b"])
+        with self.subTest(msg="rows are copied to their columns"):
+            assert (profiles["a"].audience_age_13_to_17_split,
+                    profiles["a"].audience_age_65_plus_split,
+                    profiles["a"].audience_male_split,
+                    profiles["a"].audience_age_18_to_24_split) == (0.3, 0.7, 1.0, None)
+        with self.subTest(msg="columns already written are kept"):
+            assert profiles["b"].audience_female_split == 0.9
+        with self.subTest(msg="migration can be rerun"):
+            assert rerun == 0
+        with self.subTest(msg="rows are kept"):
+            assert data_manager.session.query(AudienceAge).count() == 2
+
+
+class TestUserClaimsBackfill(TestCase):
+
+    def test_backfill_user_claims(self):
+        # arrange
+        data_manager = InMemorySqliteDataManager()
+        SqlAlchemyBrandRepository(data_manager=data_manager, image_repository=Mock(), logger=logger_factory())
+        brands = AutoFixture().create_many(dto=Brand, ammount=2, list_limit=3)
+        brands[0].given_name = brands[0].family_name = brands[0].email = None
+        brands[1].email = None
+        influencer = AutoFixture().create(dto=Influencer, list_limit=3)
+        data_manager.create_fake_data([*brands, influencer])
+        auth_user_repository = Mock()
+        auth_user_repository.get_by_ids = MagicMock(side_effect=lambda ids: {
+            _id: User(given_name=f"given-{_id}", family_name=f"family-{_id}", email=f"{_id}@mail.com") for _id in ids})
+
+        # act
+        backfilled = backfill_user_claims(session=data_manager.session, auth_user_repository=auth_user_repository)
+        data_manager.session.commit()
+        rerun = backfill_user_claims(session=data_manager.session, auth_user_repository=auth_user_repository)
+
+        # assert
+        with self.subTest(msg="only users missing claims are backfilled"):
+            assert backfilled == 2
+            auth_user_repository.get_by_ids.assert_any_call(ids=[brands[0].auth_user_id, brands[1].auth_user_id])
+        with self.subTest(msg="missing claims are written from cognito"):
+            assert (brands[0].given_name, brands[0].email) == (f"given-{brands[0].auth_user_id}",
+                                                               f"{brands[0].auth_user_id}@mail.com")
+            assert brands[1].email == f"{brands[1].auth_user_id}@mail.com"
+        with self.subTest(msg="stored claims are kept"):
+            assert brands[1].given_name != f"given-{brands[1].auth_user_id}"
+        with self.subTest(msg="backfill can be rerun"):
+            assert rerun == 0
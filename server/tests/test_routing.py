@@ -1,8 +1,19 @@
+import json
+import re
+from threading import Barrier, get_ident, local
 from unittest import TestCase
+from unittest.mock import Mock
+
+from ddt import ddt, data
 
 from src.app import logger_factory
 from src.web import PinfluencerContext, PinfluencerResponse, ErrorCapsule, FluentSequenceBuilder
 from src.web.middleware import MiddlewarePipeline
+from src.domain.validation import BatchValidator, MAX_BATCH_REQUESTS
+from src.web import Route
+from src.web.routing import RouteMatcher, RouteMatch, ROUTES, RouteTable, resolve_route, route_matcher, \
+    BatchDispatcher
+from src.web.sequences import GetBrandByIdSequenceBuilder
 
 
 class DummyErrorCapsule(ErrorCapsule):
@@ -184,3 +195,315 @@ class TestComplexSequenceBuilder(TestCase):
         # assert
         with self.subTest(msg="invocations match list"):
             self.assertEqual(self.__command_context.invocations, ["run1", "run4", "run5", "run6", "run2", "run3"])
+
+
+@ddt
+class TestRouteMatcher(TestCase):
+
+    def setUp(self) -> None:
+        self.__sut = RouteMatcher(route_keys=["GET /brands",
+                                              "GET /brands/me",
+                                              "POST /brands/me",
+                                              "GET /brands/{brand_id}",
+                                              "GET /brands/{brand_id}/listings/{listing_id}",
+                                              "GET /listings/{id}"])
+
+    @data(("GET", "/brands", RouteMatch(route_key="GET /brands")),
+          ("get", "/brands/", RouteMatch(route_key="GET /brands")),
+          ("GET", "/brands/me", RouteMatch(route_key="GET /brands/me")),
+          ("POST", "/brands/me", RouteMatch(route_key="POST /brands/me")),
+          ("GET", "/brands/1234", RouteMatch(route_key="GET /brands/{brand_id}",
+                                             path_parameters={"brand_id": "1234"})),
+          ("GET", "/brands/me/listings/5678", RouteMatch(route_key="GET /brands/{brand_id}/listings/{listing_id}",
+                                                         path_parameters={"brand_id": "me",
+                                                                          "listing_id": "5678"})),
+          ("GET", "/listings/5678", RouteMatch(route_key="GET /listings/{id}",
+                                               path_parameters={"id": "5678"})))
+    def test_match(self, case):
+        # arrange
+        (method, path, expected) = case
+
+        # act
+        actual = self.__sut.match(method=method, path=path)
+
+        # assert
+        assert actual == expected
+
+    @data(("DELETE", "/brands/me"),
+          ("PATCH", "/brands/1234"),
+          ("GET", "/"),
+          ("GET", "/brands//listings/5678"),
+          ("GET", "/brands/1234/listings"),
+          ("GET", "/random"))
+    def test_match_when_no_route_matches(self, case):
+        # arrange
+        (method, path) = case
+
+        # act/assert
+        assert self.__sut.match(method=method, path=path) is None
+
+    def test_match_every_route(self):
+        for route_key in ROUTES:
+            with self.subTest(msg=route_key):
+                # arrange
+                (method, path) = route_key.split(" ", 1)
+                raw_path = re.sub(r"{(\w+)}", lambda parameter: f"{parameter.group(1)}-value", path)
+
+                # act
+                match = route_matcher.match(method=method, path=raw_path)
+
+                # assert
+                assert match.route_key == route_key
+                assert all(value == f"{key}-value" for (key, value) in match.path_parameters.items())
+
+
+class TestRouteTable(TestCase):
+
+    def test_getitem(self):
+        # arrange
+        service_locator = Mock()
+        sut = RouteTable(service_locator=service_locator)
+
+        # act
+        first = sut["GET /brands/{brand_id}"]
+        second = sut["GET /brands/{brand_id}"]
+
+        # assert
+        with self.subTest(msg="only the dispatched route is resolved"):
+            service_locator.locate.assert_called_once_with(GetBrandByIdSequenceBuilder)
+        with self.subTest(msg="route is resolved once"):
+            assert first is second
+        with self.subTest(msg="sequence builder is from locator"):
+            assert first.sequence_builder == service_locator.locate.return_value
+
+    def test_contains(self):
+        # arrange
+        sut = RouteTable(service_locator=Mock())
+
+        # act/assert
+        with self.subTest(msg="known route"):
+            assert "GET /brands/{brand_id}" in sut
+        with self.subTest(msg="unknown route"):
+            assert "GET /random" not in sut
+        with self.subTest(msg="keys are the route table"):
+            assert list(sut) == list(ROUTES)
+
+
+class TestResolveRoute(TestCase):
+
+    def test_resolve_route_when_route_key_is_set(self):
+        # arrange
+        event = {"routeKey": "GET /brands/{brand_id}", "pathParameters": {"brand_id": "1234"}}
+
+        # act
+        route = resolve_route(event=event)
+
+        # assert
+        assert route == "GET /brands/{brand_id}"
+
+    def test_resolve_route_from_raw_path(self):
+        # arrange
+        event = {"routeKey": "$default",
+                 "rawPath": "/brands/1234",
+                 "requestContext": {"http": {"method": "GET"}}}
+
+        # act
+        route = resolve_route(event=event)
+
+        # assert
+        with self.subTest(msg="route is matched"):
+            assert route == "GET /brands/{brand_id}"
+        with self.subTest(msg="event is filled in for the pipeline"):
+            assert event["routeKey"] == "GET /brands/{brand_id}"
+            assert event["pathParameters"] == {"brand_id": "1234"}
+
+    def test_resolve_route_from_raw_path_when_no_route_matches(self):
+        # arrange
+        event = {"routeKey": "$default",
+                 "rawPath": "/random",
+                 "requestContext": {"http": {"method": "GET"}}}
+
+        # act
+        route = resolve_route(event=event)
+
+        # assert
+        assert route == "GET /random"
+
+
+class RecordingSequenceBuilder(FluentSequenceBuilder):
+
+    def __init__(self, command):
+        super().__init__()
+        self.__command = command
+
+    def build(self):
+        self._add_command(self.__command)
+
+
+@ddt
+class TestBatchDispatcher(TestCase):
+
+    def setUp(self) -> None:
+        self.__events = []
+        self.__routes = {
+            "GET /brands/me": self.__route(lambda context: self.__respond(context, {"brand": "me"})),
+            "GET /brands/{brand_id}": self.__route(lambda context: self.__respond(context, {"brand": "by id", "name": "Aidan"})),
+            "POST /brands/me": self.__route(lambda context: self.__respond(context, {"created": True}, 201))
+        }
+        dispatcher = Mock()
+        dispatcher.dispatch_route_to_ctr = self.__routes
+        self.__sut = BatchDispatcher(dispatcher=dispatcher,
+                                     middleware=MiddlewarePipeline(logger=Mock()),
+                                     batch_validator=BatchValidator(),
+                                     logger=Mock())
+
+    @staticmethod
+    def __route(command) -> Route:
+        return Route(sequence_builder=RecordingSequenceBuilder(command))
+
+    def __respond(self, context: PinfluencerContext, body, status_code=200):
+        self.__events.append(context.event)
+        context.response.status_code = status_code
+        context.response.body = body
+
+    def __context(self, requests) -> PinfluencerContext:
+        return PinfluencerContext(response=PinfluencerResponse(),
+                                  short_circuit=False,
+                                  event={"body": json.dumps({"requests": requests}),
+                                         "requestContext": {"authorizer": {"jwt": {"claims": {"username": "1234"}}}}},
+                                  route_key="POST /batch")
+
+    @data("not json",
+          json.dumps({}),
+          json.dumps({"requests": []}),
+          json.dumps({"requests": [{"method": "GET"}]}),
+          json.dumps({"requests": [{"method": "HEAD", "path": "/brands/me"}]}),
+          json.dumps({"requests": [{"method": "GET", "path": "/brands/me"}] * (MAX_BATCH_REQUESTS + 1)}))
+    def test_validate_batch_when_invalid(self, body):
+        # arrange
+        context = PinfluencerContext(response=PinfluencerResponse(), short_circuit=False, event={"body": body})
+
+        # act
+        self.__sut.validate_batch(context=context)
+
+        # assert
+        with self.subTest(msg="pipeline is shorted"):
+            assert context.short_circuit == True
+        with self.subTest(msg="response is bad request"):
+            assert context.response.status_code == 400
+
+    def test_dispatch_batch(self):
+        # arrange
+        context = self.__context(requests=[{"method": "GET", "path": "/brands/me"},
+                                           {"method": "GET", "path": "/brands/5678?fields=name"},
+                                           {"method": "POST", "path": "/brands/me", "body": {"firstName": "Aidan"}},
+                                           {"method": "GET", "path": "/random"},
+                                           {"method": "POST", "path": "/batch", "body": {"requests": []}}])
+        self.__sut.validate_batch(context=context)
+
+        # act
+        self.__sut.dispatch_batch(context=context)
+
+        # assert
+        events = {event["routeKey"]: event for event in self.__events}
+        with self.subTest(msg="responses are returned in request order"):
+            assert context.response.status_code == 200
+            assert context.response.body == {"responses": [
+                {"status_code": 200, "body": {"brand": "me"}},
+                {"status_code": 200, "body": {"name": "Aidan"}},
+                {"status_code": 201, "body": {"created": True}},
+                {"status_code": 404, "body": {"message": "route: GET /random not found"}},
+                {"status_code": 404, "body": {"message": "route: POST /batch not found"}}]}
+        with self.subTest(msg="auth context is shared"):
+            assert all(event["requestContext"] == context.event["requestContext"] for event in self.__events)
+        with self.subTest(msg="path and query parameters are set"):
+            assert events["GET /brands/{brand_id}"]["pathParameters"] == {"brand_id": "5678"}
+            assert events["GET /brands/{brand_id}"]["queryStringParameters"] == {"fields": "name"}
+        with self.subTest(msg="body is forwarded untouched"):
+            assert events["POST /brands/me"]["body"] == json.dumps({"firstName": "Aidan"})
+            assert events["GET /brands/me"]["body"] == ""
+
+    def test_dispatch_batch_runs_reads_concurrently_and_writes_in_order(self):
+        # arrange
+        barrier = Barrier(2, timeout=5)
+        order = []
+        threads = []
+
+        def read(context: PinfluencerContext):
+            if "write" not in order:
+                barrier.wait()
+            order.append("read")
+            threads.append(get_ident())
+            self.__respond(context, {})
+
+        def write(context: PinfluencerContext):
+            order.append("write")
+            threads.append(get_ident())
+            self.__respond(context, {}, 201)
+
+        self.__routes["GET /brands/me"] = self.__route(read)
+        self.__routes["POST /brands/me"] = self.__route(write)
+        context = self.__context(requests=[{"method": "GET", "path": "/brands/me"},
+                                           {"method": "GET", "path": "/brands/me"},
+                                           {"method": "POST", "path": "/brands/me"},
+                                           {"method": "GET", "path": "/brands/me"},
+                                           {"method": "GET", "path": "/brands/me"}])
+        self.__sut.validate_batch(context=context)
+
+        # act
+        self.__sut.dispatch_batch(context=context)
+
+        # assert
+        with self.subTest(msg="sub requests complete in the order they were sent"):
+            assert order == ["read", "read", "write", "read", "read"]
+        with self.subTest(msg="reads before the write run on executor threads"):
+            assert get_ident() not in threads[:2]
+        with self.subTest(msg="the write and the reads after it run on the caller's thread and session"):
+            assert threads[2:] == [get_ident()] * 3
+
+    def test_dispatch_batch_when_read_follows_write(self):
+        # arrange
+        # stands in for the scoped session, uncommitted writes are only visible on the thread that made them
+        session = local()
+
+        def read(context: PinfluencerContext):
+            self.__respond(context, {"brand_name": getattr(session, "brand_name", None)})
+
+        def write(context: PinfluencerContext):
+            session.brand_name = "written"
+            self.__respond(context, {}, 201)
+
+        self.__routes["GET /brands/me"] = self.__route(read)
+        self.__routes["POST /brands/me"] = self.__route(write)
+        context = self.__context(requests=[{"method": "GET", "path": "/brands/me"},
+                                           {"method": "GET", "path": "/brands/me"},
+                                           {"method": "POST", "path": "/brands/me"},
+                                           {"method": "GET", "path": "/brands/me"},
+                                           {"method": "GET", "path": "/brands/me"}])
+        self.__sut.validate_batch(context=context)
+
+        # act
+        self.__sut.dispatch_batch(context=context)
+
+        # assert
+        assert [response["body"] for response in context.response.body["responses"]] == [{"brand_name": None},
+                                                                                           {"brand_name": None},
+                                                                                           {},
+                                                                                           {"brand_name": "written"},
+                                                                                           {"brand_name": "written"}]
+
+    def test_dispatch_batch_when_sub_request_raises(self):
+        # arrange
+        def fail(context: PinfluencerContext):
+            raise Exception("some exception")
+
+        self.__routes["POST /brands/me"] = self.__route(fail)
+        context = self.__context(requests=[{"method": "POST", "path": "/brands/me"},
+                                           {"method": "GET", "path": "/brands/me"}])
+        self.__sut.validate_batch(context=context)
+
+        # act
+        self.__sut.dispatch_batch(context=context)
+
+        # assert
+        assert [response["status_code"] for response in context.response.body["responses"]] == [500, 200]
@@ -4,6 +4,7 @@ from unittest.mock import Mock
 from simple_injection import ServiceCollection
 
 from src.app import bootstrap
+from src.web.routing import BatchSequenceBuilder, BatchDispatcher
 from src.web.controllers import ListingController, InfluencerController, BrandController, NotificationController, \
     AudienceAgeController, AudienceGenderController, BrandListingController, CollaborationController, \
     InfluencerListingController
@@ -24,7 +25,10 @@ from src.web.sequences import PreGenericUpdateCreateSubsequenceBuilder, PreUpdat
     GetAudienceGenderSequenceBuilder, UpdateAudienceGenderSequenceBuilder, CreateInfluencerProfileSequenceBuilder, \
     UpdateInfluencerProfileSequenceBuilder, GetInfluencerProfileSequenceBuilder, \
     GetBrandListingsForBrandSequenceBuilder, CreateCollaborationForInfluencerSequenceBuilder, \
-    GetListingsForInfluencerSequenceBuilder
+    GetListingsForInfluencerSequenceBuilder, CreateImageUploadForListingSequenceBuilder, \
+    ConfirmImageUploadForListingSequenceBuilder, CreateInfluencerImageUploadSequenceBuilder, \
+    ConfirmInfluencerImageUploadSequenceBuilder, CreateBrandImageUploadSequenceBuilder, \
+    ConfirmBrandImageUploadSequenceBuilder
 
 
 def setup(ioc: ServiceCollection):
@@ -120,6 +124,52 @@ class TestUpdateImageForListingSequence(TestCase):
                                               ioc.resolve(BrandBeforeHooks).validate_auth_brand,
                                               ioc.resolve(ListingBeforeHooks).validate_image_key,
                                               ioc.resolve(ListingBeforeHooks).upload_image,
+                                              ioc.resolve(CommonBeforeHooks).create_image_variants,
+                                              ioc.resolve(ListingController).update_listing_image,
+                                              ioc.resolve(ListingAfterHooks).tag_bucket_url_to_images])
+
+
+class TestCreateImageUploadForListingSequenceBuilder(TestCase):
+
+    def test_sequence(self):
+        # arrange
+        ioc = ServiceCollection()
+        setup(ioc)
+        sut = ioc.resolve(CreateImageUploadForListingSequenceBuilder)
+
+        # act
+        sut.build()
+
+        # assert
+        with self.subTest(msg="components match"):
+            self.maxDiff = None
+            self.assertEqual(sut.components, [ioc.resolve(PreGenericUpdateCreateSubsequenceBuilder),
+                                              ioc.resolve(ListingBeforeHooks).validate_id,
+                                              ioc.resolve(BrandBeforeHooks).validate_auth_brand,
+                                              ioc.resolve(ListingBeforeHooks).validate_image_key,
+                                              ioc.resolve(ListingBeforeHooks).create_image_upload])
+
+
+class TestConfirmImageUploadForListingSequenceBuilder(TestCase):
+
+    def test_sequence(self):
+        # arrange
+        ioc = ServiceCollection()
+        setup(ioc)
+        sut = ioc.resolve(ConfirmImageUploadForListingSequenceBuilder)
+
+        # act
+        sut.build()
+
+        # assert
+        with self.subTest(msg="components match"):
+            self.maxDiff = None
+            self.assertEqual(sut.components, [ioc.resolve(PreGenericUpdateCreateSubsequenceBuilder),
+                                              ioc.resolve(ListingBeforeHooks).validate_id,
+                                              ioc.resolve(BrandBeforeHooks).validate_auth_brand,
+                                              ioc.resolve(ListingBeforeHooks).validate_image_key,
+                                              ioc.resolve(ListingBeforeHooks).confirm_image_upload,
+                                              ioc.resolve(CommonBeforeHooks).create_image_variants,
                                               ioc.resolve(ListingController).update_listing_image,
                                               ioc.resolve(ListingAfterHooks).tag_bucket_url_to_images])
 
@@ -138,11 +188,11 @@ class TestUpdateListingSequenceBuilder(TestCase):
         # assert
         with self.subTest(msg="components match"):
             self.maxDiff = None
-            self.assertEqual(sut.components, [ioc.resolve(PreGenericUpdateCreateSubsequenceBuilder),
+            self.assertEqual(sut.components, [ioc.resolve(UserBeforeHooks).set_auth_user_id,
+                                              ioc.resolve(ListingBeforeHooks).set_request,
                                               ioc.resolve(ListingBeforeHooks).validate_id,
                                               ioc.resolve(ListingBeforeHooks).validate_listing,
                                               ioc.resolve(BrandBeforeHooks).validate_auth_brand,
-                                              ioc.resolve(ListingBeforeHooks).map_categories_and_values,
                                               ioc.resolve(ListingController).update_listing,
                                               ioc.resolve(ListingAfterHooks).tag_bucket_url_to_images])
 
@@ -161,10 +211,10 @@ class TestCreateListingSequenceBuilder(TestCase):
         # assert
         with self.subTest(msg="components match"):
             self.maxDiff = None
-            self.assertEqual(sut.components, [ioc.resolve(PreGenericUpdateCreateSubsequenceBuilder),
+            self.assertEqual(sut.components, [ioc.resolve(UserBeforeHooks).set_auth_user_id,
+                                              ioc.resolve(ListingBeforeHooks).set_request,
                                               ioc.resolve(ListingBeforeHooks).validate_listing,
                                               ioc.resolve(BrandBeforeHooks).validate_auth_brand,
-                                              ioc.resolve(ListingBeforeHooks).map_categories_and_values,
                                               ioc.resolve(ListingController).create_for_brand,
                                               ioc.resolve(ListingAfterHooks).save_state,
                                               ioc.resolve(ListingAfterHooks).tag_bucket_url_to_images])
@@ -185,8 +235,7 @@ class TestGetListingByIdSequenceBuilder(TestCase):
         with self.subTest(msg="components match"):
             self.maxDiff = None
             self.assertEqual(sut.components, [ioc.resolve(ListingBeforeHooks).validate_id,
-                                              ioc.resolve(ListingController).get_by_id,
-                                              ioc.resolve(ListingAfterHooks).tag_bucket_url_to_images])
+                                              ioc.resolve(ListingController).write_by_id])
 
 
 class TestGetListingsForBrandSequenceBuilder(TestCase):
@@ -205,8 +254,7 @@ class TestGetListingsForBrandSequenceBuilder(TestCase):
             self.maxDiff = None
             self.assertEqual(sut.components, [ioc.resolve(UserBeforeHooks).set_auth_user_id,
                                               ioc.resolve(BrandBeforeHooks).validate_auth_brand,
-                                              ioc.resolve(ListingController).get_for_brand,
-                                              ioc.resolve(ListingAfterHooks).tag_bucket_url_to_images_collection])
+                                              ioc.resolve(ListingController).write_for_brand])
 
 
 class TestUpdateImageForInfluencerSequenceBuilder(TestCase):
@@ -226,6 +274,49 @@ class TestUpdateImageForInfluencerSequenceBuilder(TestCase):
             self.assertEqual(sut.components, [ioc.resolve(PreGenericUpdateCreateSubsequenceBuilder),
                                               ioc.resolve(InfluencerBeforeHooks).validate_image_key,
                                               ioc.resolve(InfluencerBeforeHooks).upload_image,
+                                              ioc.resolve(CommonBeforeHooks).create_image_variants,
+                                              ioc.resolve(InfluencerController).update_image_field_for_user,
+                                              ioc.resolve(PostSingleUserSubsequenceBuilder),
+                                              ioc.resolve(InfluencerAfterHooks).tag_bucket_url_to_images])
+
+
+class TestCreateInfluencerImageUploadSequenceBuilder(TestCase):
+
+    def test_sequence(self):
+        # arrange
+        ioc = ServiceCollection()
+        setup(ioc)
+        sut = ioc.resolve(CreateInfluencerImageUploadSequenceBuilder)
+
+        # act
+        sut.build()
+
+        # assert
+        with self.subTest(msg="components match"):
+            self.maxDiff = None
+            self.assertEqual(sut.components, [ioc.resolve(PreGenericUpdateCreateSubsequenceBuilder),
+                                              ioc.resolve(InfluencerBeforeHooks).validate_image_key,
+                                              ioc.resolve(InfluencerBeforeHooks).create_image_upload])
+
+
+class TestConfirmInfluencerImageUploadSequenceBuilder(TestCase):
+
+    def test_sequence(self):
+        # arrange
+        ioc = ServiceCollection()
+        setup(ioc)
+        sut = ioc.resolve(ConfirmInfluencerImageUploadSequenceBuilder)
+
+        # act
+        sut.build()
+
+        # assert
+        with self.subTest(msg="components match"):
+            self.maxDiff = None
+            self.assertEqual(sut.components, [ioc.resolve(PreGenericUpdateCreateSubsequenceBuilder),
+                                              ioc.resolve(InfluencerBeforeHooks).validate_image_key,
+                                              ioc.resolve(InfluencerBeforeHooks).confirm_image_upload,
+                                              ioc.resolve(CommonBeforeHooks).create_image_variants,
                                               ioc.resolve(InfluencerController).update_image_field_for_user,
                                               ioc.resolve(PostSingleUserSubsequenceBuilder),
                                               ioc.resolve(InfluencerAfterHooks).tag_bucket_url_to_images])
@@ -245,8 +336,8 @@ class TestUpdateInfluencerSequenceBuilder(TestCase):
         # assert
         with self.subTest(msg="components match"):
             self.maxDiff = None
-            self.assertEqual(sut.components, [ioc.resolve(PreGenericUpdateCreateSubsequenceBuilder),
-                                              ioc.resolve(UserBeforeHooks).set_categories_and_values,
+            self.assertEqual(sut.components, [ioc.resolve(UserBeforeHooks).set_auth_user_id,
+                                              ioc.resolve(InfluencerBeforeHooks).set_request,
                                               ioc.resolve(InfluencerBeforeHooks).validate_influencer,
                                               ioc.resolve(InfluencerController).update_for_user,
                                               ioc.resolve(InfluencerAfterHooks).set_influencer_claims,
@@ -268,8 +359,8 @@ class TestCreateInfluencerSequenceBuilder(TestCase):
         # assert
         with self.subTest(msg="components match"):
             self.maxDiff = None
-            self.assertEqual(sut.components, [ioc.resolve(PreGenericUpdateCreateSubsequenceBuilder),
-                                              ioc.resolve(UserBeforeHooks).set_categories_and_values,
+            self.assertEqual(sut.components, [ioc.resolve(UserBeforeHooks).set_auth_user_id,
+                                              ioc.resolve(InfluencerBeforeHooks).set_request,
                                               ioc.resolve(InfluencerController).create,
                                               ioc.resolve(InfluencerAfterHooks).set_influencer_claims,
                                               ioc.resolve(PostSingleUserSubsequenceBuilder),
@@ -352,6 +443,49 @@ class TestUpdateBrandImageSequenceBuilder(TestCase):
             self.assertEqual(sut.components, [ioc.resolve(PreGenericUpdateCreateSubsequenceBuilder),
                                               ioc.resolve(BrandBeforeHooks).validate_image_key,
                                               ioc.resolve(BrandBeforeHooks).upload_image,
+                                              ioc.resolve(CommonBeforeHooks).create_image_variants,
+                                              ioc.resolve(BrandController).update_image_field_for_user,
+                                              ioc.resolve(PostSingleUserSubsequenceBuilder),
+                                              ioc.resolve(BrandAfterHooks).tag_bucket_url_to_images])
+
+
+class TestCreateBrandImageUploadSequenceBuilder(TestCase):
+
+    def test_sequence(self):
+        # arrange
+        ioc = ServiceCollection()
+        setup(ioc)
+        sut = ioc.resolve(CreateBrandImageUploadSequenceBuilder)
+
+        # act
+        sut.build()
+
+        # assert
+        with self.subTest(msg="components match"):
+            self.maxDiff = None
+            self.assertEqual(sut.components, [ioc.resolve(PreGenericUpdateCreateSubsequenceBuilder),
+                                              ioc.resolve(BrandBeforeHooks).validate_image_key,
+                                              ioc.resolve(BrandBeforeHooks).create_image_upload])
+
+
+class TestConfirmBrandImageUploadSequenceBuilder(TestCase):
+
+    def test_sequence(self):
+        # arrange
+        ioc = ServiceCollection()
+        setup(ioc)
+        sut = ioc.resolve(ConfirmBrandImageUploadSequenceBuilder)
+
+        # act
+        sut.build()
+
+        # assert
+        with self.subTest(msg="components match"):
+            self.maxDiff = None
+            self.assertEqual(sut.components, [ioc.resolve(PreGenericUpdateCreateSubsequenceBuilder),
+                                              ioc.resolve(BrandBeforeHooks).validate_image_key,
+                                              ioc.resolve(BrandBeforeHooks).confirm_image_upload,
+                                              ioc.resolve(CommonBeforeHooks).create_image_variants,
                                               ioc.resolve(BrandController).update_image_field_for_user,
                                               ioc.resolve(PostSingleUserSubsequenceBuilder),
                                               ioc.resolve(BrandAfterHooks).tag_bucket_url_to_images])
@@ -371,8 +505,8 @@ class TestUpdateBrandSequenceBuilder(TestCase):
         # assert
         with self.subTest(msg="components match"):
             self.maxDiff = None
-            self.assertEqual(sut.components, [ioc.resolve(PreGenericUpdateCreateSubsequenceBuilder),
-                                              ioc.resolve(UserBeforeHooks).set_categories_and_values,
+            self.assertEqual(sut.components, [ioc.resolve(UserBeforeHooks).set_auth_user_id,
+                                              ioc.resolve(BrandBeforeHooks).set_request,
                                               ioc.resolve(BrandBeforeHooks).validate_brand,
                                               ioc.resolve(BrandController).update_for_user,
                                               ioc.resolve(BrandAfterHooks).set_brand_claims,
@@ -394,8 +528,8 @@ class TestCreateBrandSequenceBuilder(TestCase):
         # assert
         with self.subTest(msg="components match"):
             self.maxDiff = None
-            self.assertEqual(sut.components, [ioc.resolve(PreGenericUpdateCreateSubsequenceBuilder),
-                                              ioc.resolve(UserBeforeHooks).set_categories_and_values,
+            self.assertEqual(sut.components, [ioc.resolve(UserBeforeHooks).set_auth_user_id,
+                                              ioc.resolve(BrandBeforeHooks).set_request,
                                               # ioc.resolve(BrandBeforeHooks).validate_brand,
                                               ioc.resolve(BrandController).create,
                                               ioc.resolve(BrandAfterHooks).set_brand_claims,
@@ -710,12 +844,14 @@ class TestGetInfluencerProfileSequenceBuilder(TestCase):
             self.maxDiff = None
             self.assertEqual(sut.components, [
                 ioc.resolve(UserBeforeHooks).set_auth_user_id,
-                ioc.resolve(AudienceGenderController).get_for_influencer,
-                ioc.resolve(InfluencerOnBoardingAfterHooks).cache_audience_gender_data,
-                ioc.resolve(AudienceAgeController).get_for_influencer,
-                ioc.resolve(InfluencerOnBoardingAfterHooks).cache_audience_age_data,
-                ioc.resolve(InfluencerController).get,
-                ioc.resolve(InfluencerOnBoardingAfterHooks).cache_influencer_data,
+                [
+                    [ioc.resolve(AudienceGenderController).get_for_influencer,
+                     ioc.resolve(InfluencerOnBoardingAfterHooks).cache_audience_gender_data],
+                    [ioc.resolve(AudienceAgeController).get_for_influencer,
+                     ioc.resolve(InfluencerOnBoardingAfterHooks).cache_audience_age_data],
+                    [ioc.resolve(InfluencerController).get,
+                     ioc.resolve(InfluencerOnBoardingAfterHooks).cache_influencer_data]
+                ],
                 ioc.resolve(InfluencerOnBoardingAfterHooks).merge_influencer_cache,
                 ioc.resolve(PostSingleUserSubsequenceBuilder)
             ])
@@ -738,8 +874,7 @@ class TestGetBrandListingsForBrandSequenceBuilder(TestCase):
             self.assertEqual(sut.components, [
                 ioc.resolve(UserBeforeHooks).set_auth_user_id,
                 ioc.resolve(BrandBeforeHooks).validate_brand,
-                ioc.resolve(BrandListingController).get_for_brand,
-                ioc.resolve(ListingAfterHooks).tag_bucket_url_to_images_collection
+                ioc.resolve(BrandListingController).write_for_brand
             ])
 
 
@@ -781,5 +916,22 @@ class TestGetListingsForInfluencerSequenceBuilder(TestCase):
         with self.subTest(msg="components match"):
             self.maxDiff = None
             self.assertEqual(sut.components, [
-                ioc.resolve(InfluencerListingController).get_all
-            ])
\ No newline at end of file
+                ioc.resolve(InfluencerListingController).write_all
+            ])
+
+
+class TestBatchSequenceBuilder(TestCase):
+
+    def test_sequence(self):
+        # arrange
+        ioc = ServiceCollection()
+        setup(ioc)
+        sut = ioc.resolve(BatchSequenceBuilder)
+
+        # act
+        sut.build()
+
+        # assert
+        with self.subTest(msg="components match"):
+            self.assertEqual(sut.components, [ioc.resolve(BatchDispatcher).validate_batch,
+                                              ioc.resolve(BatchDispatcher).dispatch_batch])
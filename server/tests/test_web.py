@@ -1,9 +1,20 @@
+import base64
+import gzip
+import json
+import os
+from dataclasses import FrozenInstanceError
+from threading import Barrier
 from unittest import TestCase
+from unittest.mock import Mock, patch
 
 from ddt import ddt, data
 
-from src.crosscutting import JsonSnakeToCamelSerializer
-from src.web import PinfluencerResponse
+from src.crosscutting import JsonSnakeToCamelSerializer, server_timing
+from src.web import PinfluencerResponse, FluentSequenceBuilder, PinfluencerContext, command_name, \
+    server_timing_requested, ParallelGroup, requested_fields, project_fields
+from src.web.error_capsules import BrandNotFoundErrorCapsule
+from src.web.metrics import PipelineMetrics
+from src.web.middleware import MiddlewarePipeline
 
 @ddt
 class TestPinfluencerResponse(TestCase):
@@ -40,3 +51,399 @@ class TestPinfluencerResponse(TestCase):
 
         # act/assert
         assert pinf_response.as_json(serializer=JsonSnakeToCamelSerializer()) == expected_json
+
+    def test_to_json_when_compressed(self):
+        # arrange
+        pinf_response = PinfluencerResponse(body=[{"brand_name": f"brand {index}"} for index in range(100)])
+        uncompressed = JsonSnakeToCamelSerializer().serialize(pinf_response.body)
+
+        # act
+        actual = pinf_response.as_json(serializer=JsonSnakeToCamelSerializer(), accept_encoding="gzip")
+
+        # assert
+        with self.subTest(msg="body is base64 encoded gzip"):
+            assert actual["isBase64Encoded"] == True
+            assert gzip.decompress(base64.b64decode(actual["body"])).decode("utf-8") == uncompressed
+        with self.subTest(msg="encoding headers are set"):
+            assert actual["headers"]["Content-Encoding"] == "gzip"
+            assert actual["headers"]["Vary"] == "Accept-Encoding"
+
+    @data("", "identity")
+    def test_to_json_when_compression_is_not_accepted(self, accept_encoding):
+        # arrange
+        pinf_response = PinfluencerResponse(body=[{"brand_name": f"brand {index}"} for index in range(100)])
+
+        # act
+        actual = pinf_response.as_json(serializer=JsonSnakeToCamelSerializer(), accept_encoding=accept_encoding)
+
+        # assert
+        with self.subTest(msg="body is plain json"):
+            assert "isBase64Encoded" not in actual
+            assert actual["body"] == JsonSnakeToCamelSerializer().serialize(pinf_response.body)
+        with self.subTest(msg="response still varies on encoding"):
+            assert "Content-Encoding" not in actual["headers"]
+            assert actual["headers"]["Vary"] == "Accept-Encoding"
+
+    def test_to_json_when_body_is_below_compression_threshold(self):
+        # act
+        actual = PinfluencerResponse(body={"brand_name": "brand"}).as_json(serializer=JsonSnakeToCamelSerializer(),
+                                                                           accept_encoding="gzip")
+
+        # assert
+        assert actual["body"] == '{"brandName": "brand"}'
+
+    def test_to_json_when_server_timing_enabled(self):
+        # arrange
+        server_timing.begin(enabled=True)
+        self.addCleanup(server_timing.begin, enabled=False)
+        with server_timing.measure(phase="db"):
+            ...
+
+        # act
+        headers = PinfluencerResponse(body={}).as_json(serializer=JsonSnakeToCamelSerializer())["headers"]
+
+        # assert
+        with self.subTest(msg="phases are reported"):
+            assert [entry.split(";")[0] for entry in headers["Server-Timing"].split(", ")] == ["db",
+                                                                                           "serialization",
+                                                                                           "total"]
+        with self.subTest(msg="timings are exposed to other origins"):
+            assert headers["Timing-Allow-Origin"] == "*"
+
+
+class TestPinfluencerContext(TestCase):
+
+    def test_context_is_slotted(self):
+        # act
+        context = PinfluencerContext(response=PinfluencerResponse(), body={"brand_name": "name"})
+
+        # assert
+        with self.subTest(msg="context has no dict"):
+            assert not hasattr(context, "__dict__")
+        with self.subTest(msg="response has no dict"):
+            assert not hasattr(context.response, "__dict__")
+        with self.subTest(msg="defaults are not shared between contexts"):
+            assert PinfluencerContext().body == {} and PinfluencerContext().body is not PinfluencerContext().body
+        with self.subTest(msg="unknown attributes are rejected"):
+            with self.assertRaises(AttributeError):
+                context.unknown = "value"
+
+
+@ddt
+class TestServerTimingRequested(TestCase):
+
+    @data(({}, {}, False),
+          ({"headers": {"x-server-timing": "1"}}, {}, True),
+          ({"headers": {"x-server-timing": "true"}}, {}, True),
+          ({"headers": {"x-server-timing": "0"}}, {}, False),
+          ({"headers": None}, {"SERVER_TIMING": "true"}, True),
+          ({}, {"SERVER_TIMING": "false"}, False))
+    def test_server_timing_requested(self, case):
+        # arrange
+        (event, environment, expected) = case
+
+        # act
+        with patch.dict(os.environ, environment):
+            actual = server_timing_requested(event=event)
+
+        # assert
+        assert actual == expected
+
+
+@ddt
+class TestRequestedFields(TestCase):
+
+    @data(({}, None),
+          ({"queryStringParameters": None}, None),
+          ({"queryStringParameters": {"fields": " , "}}, None),
+          ({"queryStringParameters": {"fields": "firstName,email"}}, {"first_name": None, "email": None}),
+          ({"queryStringParameters": {"fields": "brand.brandName,brand.logo"}},
+           {"brand": {"brand_name": None, "logo": None}}),
+          ({"queryStringParameters": {"fields": "brand.brandName,brand"}}, {"brand": None}),
+          ({"queryStringParameters": {"fields": "brand,brand.brandName"}}, {"brand": None}))
+    def test_requested_fields(self, case):
+        # arrange
+        (event, expected) = case
+
+        # act
+        actual = requested_fields(event=event)
+
+        # assert
+        assert actual == expected
+
+    def test_project_fields(self):
+        # arrange
+        body = [{"id": "1", "first_name": "Aidan", "email": None, "brand": {"brand_name": "Pinfluencer", "logo": "a"}},
+                {"id": "2", "first_name": "Rhys", "email": "rhys@gmail.com", "brand": None}]
+
+        # act
+        actual = project_fields(body=body, fields={"first_name": None, "email": None, "brand": {"brand_name": None}})
+
+        # assert
+        assert actual == [{"first_name": "Aidan", "brand": {"brand_name": "Pinfluencer"}},
+                          {"first_name": "Rhys", "email": "rhys@gmail.com"}]
+
+
+class StubSequenceBuilder(FluentSequenceBuilder):
+
+    def __init__(self, *components):
+        super().__init__()
+        self.build_calls = 0
+        self.__components = components
+
+    def build(self):
+        self.build_calls += 1
+        for component in self.__components:
+            if isinstance(component, FluentSequenceBuilder):
+                self._add_sequence_builder(component)
+            elif isinstance(component, list):
+                self._add_parallel_group(branches=component)
+            else:
+                self._add_command(component)
+
+
+class TestFluentSequenceBuilder(TestCase):
+
+    def test_compile_builds_once(self):
+        # arrange
+        sut = StubSequenceBuilder(command_one, command_two)
+
+        # act
+        first = sut.compile()
+        second = sut.compile()
+
+        # assert
+        with self.subTest(msg="plan is cached"):
+            assert first is second
+        with self.subTest(msg="build was only called once"):
+            assert sut.build_calls == 1
+        with self.subTest(msg="commands are not duplicated"):
+            assert sut.generate_sequence() == [command_one, command_two]
+
+    def test_compile_inlines_sub_sequences(self):
+        # arrange
+        sub_sequence = StubSequenceBuilder(command_two)
+        sut = StubSequenceBuilder(command_one, sub_sequence, command_one)
+
+        # act
+        plan = sut.compile()
+
+        # assert
+        with self.subTest(msg="sub sequence is flattened in order"):
+            assert plan.commands == (command_one, command_two, command_one)
+        with self.subTest(msg="command names are precomputed"):
+            assert [name for (name, _) in plan.steps] == [f"{__name__}.command_one",
+                                                        f"{__name__}.command_two",
+                                                        f"{__name__}.command_one"]
+
+    def test_compile_parallel_group(self):
+        # arrange
+        sut = StubSequenceBuilder(command_one, [[command_two, StubSequenceBuilder(command_one)], [command_one]])
+
+        # act
+        plan = sut.compile()
+
+        # assert
+        (name, group) = plan.steps[1]
+        with self.subTest(msg="group is a single step"):
+            assert len(plan.steps) == 2
+            assert isinstance(group, ParallelGroup)
+        with self.subTest(msg="branches are compiled"):
+            assert [branch.commands for branch in group.branches] == [(command_two, command_one), (command_one,)]
+        with self.subTest(msg="group is named after its branches"):
+            assert name == f"parallel[{__name__}.command_two|{__name__}.command_one]"
+        with self.subTest(msg="commands are flattened in declaration order"):
+            assert plan.commands == (command_one, command_two, command_one, command_one)
+
+    def test_plan_is_immutable(self):
+        # arrange
+        plan = StubSequenceBuilder(command_one).compile()
+
+        # act/assert
+        with self.assertRaises(FrozenInstanceError):
+            plan.steps = ()
+
+    def test_command_name(self):
+        # arrange
+        class Hooks:
+            def hook(self, context):
+                ...
+
+        # act
+        name = command_name(command=Hooks().hook)
+
+        # assert
+        with self.subTest(msg="bound methods are named after their function"):
+            assert name == f"{__name__}.hook"
+        with self.subTest(msg="objects without a name are anonymous"):
+            assert command_name(command=object()) == "anonymous"
+
+
+@ddt
+class TestMiddlewarePipeline(TestCase):
+
+    def setUp(self) -> None:
+        self.__sut = MiddlewarePipeline(logger=Mock())
+
+    def test_execute_middleware(self):
+        # arrange
+        calls = []
+        sequence = StubSequenceBuilder(lambda context: calls.append(1), lambda context: calls.append(2))
+        context = PinfluencerContext(short_circuit=False, response=PinfluencerResponse())
+
+        # act
+        self.__sut.execute_middleware(context=context, sequence=sequence)
+        self.__sut.execute_middleware(context=context, sequence=sequence)
+
+        # assert
+        assert calls == [1, 2, 1, 2]
+
+    @data((200, {"first_name": "Aidan"}),
+          (404, {"message": "not found", "first_name": "Aidan", "email": None}))
+    def test_execute_middleware_projects_requested_fields(self, case):
+        # arrange
+        (status_code, expected) = case
+
+        def respond(context: PinfluencerContext):
+            context.response.status_code = status_code
+            context.response.body = {"message": "not found", "first_name": "Aidan", "email": None}
+
+        context = PinfluencerContext(short_circuit=False,
+                                     response=PinfluencerResponse(),
+                                     fields={"first_name": None, "email": None})
+
+        # act
+        self.__sut.execute_middleware(context=context, sequence=StubSequenceBuilder(respond))
+
+        # assert
+        assert context.response.body == expected
+
+    def test_execute_middleware_records_timings(self):
+        # arrange
+        records = []
+        sut = MiddlewarePipeline(logger=Mock(), metrics=PipelineMetrics(sink=records.append))
+        sequence = StubSequenceBuilder(command_one, command_two)
+
+        # act
+        sut.execute_middleware(context=PinfluencerContext(short_circuit=False,
+                                                          response=PinfluencerResponse(),
+                                                          route_key="GET /brands"),
+                               sequence=sequence)
+        sut.emit_metrics()
+
+        # assert
+        record = json.loads(records[0])
+        with self.subTest(msg="record is for route"):
+            assert record["Route"] == "GET /brands"
+        with self.subTest(msg="each command and the total are timed"):
+            assert [metric["Name"] for metric in record["_aws"]["CloudWatchMetrics"][0]["Metrics"]] == [
+                f"{__name__}.command_one", f"{__name__}.command_two", "total"]
+
+    def test_execute_middleware_runs_parallel_group_concurrently(self):
+        # arrange
+        barrier = Barrier(3, timeout=5)
+        calls = []
+
+        def branch(key):
+            def fetch(context: PinfluencerContext):
+                barrier.wait()
+                context.response.body = {key: True}
+
+            def cache(context: PinfluencerContext):
+                context.cached_values[key] = context.response.body
+
+            return [fetch, cache]
+
+        sequence = StubSequenceBuilder([branch("gender"), branch("age"), branch("influencer")],
+                                       lambda context: calls.append(dict(context.cached_values)))
+        context = PinfluencerContext(short_circuit=False, response=PinfluencerResponse())
+
+        # act
+        self.__sut.execute_middleware(context=context, sequence=sequence)
+
+        # assert
+        with self.subTest(msg="branch results are merged before the next step"):
+            assert calls == [{"gender": {"gender": True}, "age": {"age": True}, "influencer": {"influencer": True}}]
+        with self.subTest(msg="response is from the last branch"):
+            assert context.response.body == {"influencer": True}
+        with self.subTest(msg="pipeline was not shorted"):
+            assert context.short_circuit == False
+
+    def test_execute_middleware_removes_branch_sessions(self):
+        # arrange
+        data_manager = Mock()
+        sut = MiddlewarePipeline(logger=Mock(), data_manager=data_manager)
+
+        def cache(key):
+            return lambda context: context.cached_values.update({key: True})
+
+        sequence = StubSequenceBuilder([[cache("first")], [cache("second")]], lambda context: None)
+        context = PinfluencerContext(short_circuit=False, response=PinfluencerResponse())
+
+        # act
+        sut.execute_middleware(context=context, sequence=sequence)
+
+        # assert
+        with self.subTest(msg="session of each branch thread is removed"):
+            assert data_manager.remove_session.call_count == 2
+
+    def test_execute_middleware_short_circuits_on_error_in_parallel_group(self):
+        # arrange
+        calls = []
+
+        def cache(key):
+            return lambda context: context.cached_values.update({key: True})
+
+        def fail(context: PinfluencerContext):
+            context.error_capsule.append(BrandNotFoundErrorCapsule(auth_user_id="1234"))
+
+        sequence = StubSequenceBuilder([[cache("first")], [fail, cache("second")], [cache("third")]],
+                                       lambda context: calls.append(1))
+        context = PinfluencerContext(short_circuit=False, response=PinfluencerResponse())
+
+        # act
+        self.__sut.execute_middleware(context=context, sequence=sequence)
+
+        # assert
+        with self.subTest(msg="remaining steps are skipped"):
+            assert calls == []
+        with self.subTest(msg="short circuit is set"):
+            assert context.short_circuit == True
+        with self.subTest(msg="response is set from error"):
+            assert context.response.status_code == 404
+            assert context.response.body == {"message": "brand 1234 not found"}
+        with self.subTest(msg="only branches before the failure are merged"):
+            assert context.cached_values == {"first": True}
+        with self.subTest(msg="error capsule is merged"):
+            assert len(context.error_capsule) == 1
+
+    def test_execute_middleware_short_circuits_on_error(self):
+        # arrange
+        calls = []
+
+        def fail(context: PinfluencerContext):
+            context.error_capsule.append(BrandNotFoundErrorCapsule(auth_user_id="1234"))
+
+        sequence = StubSequenceBuilder(fail, lambda context: calls.append(1))
+        context = PinfluencerContext(short_circuit=False, response=PinfluencerResponse())
+
+        # act
+        self.__sut.execute_middleware(context=context, sequence=sequence)
+
+        # assert
+        with self.subTest(msg="remaining commands are skipped"):
+            assert calls == []
+        with self.subTest(msg="short circuit is set"):
+            assert context.short_circuit == True
+        with self.subTest(msg="response status is set from error"):
+            assert context.response.status_code == 404
+        with self.subTest(msg="response body is set from error"):
+            assert context.response.body == {"message": "brand 1234 not found"}
+
+
+def command_one(context: PinfluencerContext):
+    ...
+
+
+def command_two(context: PinfluencerContext):
+    ...
@@ -0,0 +1,102 @@
+import json
+from unittest import TestCase
+
+from ddt import ddt, data
+
+from src.crosscutting import AutoFixture, JsonSnakeToCamelSerializer, SerializedJson
+from src.domain.models import Listing, BrandListing, InfluencerListing
+from src.web import PinfluencerContext, PinfluencerResponse, project_fields
+from src.web.hooks import CommonAfterHooks
+from src.web.views import ListingResponseDto, BrandListingResponseDto, InfluencerListingResponseDto
+from src.web.writers import EntityJsonWriter
+from tests import test_mapper
+
+
+@ddt
+class TestEntityJsonWriter(TestCase):
+
+    def setUp(self):
+        self.__mapper = test_mapper()
+        self.__serializer = JsonSnakeToCamelSerializer()
+        self.__sut = EntityJsonWriter(mapper=self.__mapper)
+
+    def __mapped_json(self, entity, to, fields):
+        body = self.__mapper.map_to_dict(_from=entity, to=to, fields=fields)
+        context = PinfluencerContext(response=PinfluencerResponse(body=body), fields=fields)
+        CommonAfterHooks().set_image_url(context=context, image_fields=["product_image"])
+        return self.__serializer.serialize(project_fields(body=context.response.body, fields=fields))
+
+    @data((Listing, ListingResponseDto, None),
+          (Listing, ListingResponseDto, {"title": None, "product_image_variants": None, "values": None}),
+          (BrandListing, BrandListingResponseDto, None),
+          (BrandListing, BrandListingResponseDto, {"applied_collaborations": {"content_proposal": None}}),
+          (InfluencerListing, InfluencerListingResponseDto, None),
+          (InfluencerListing, InfluencerListingResponseDto, {"brand": {"brand_name": None, "values": None},
+                                                             "product_image": None}))
+    def test_write_matches_mapped_response(self, case):
+        # arrange
+        (model, response, fields) = case
+        entity = AutoFixture().create(dto=model, list_limit=3)
+        expected = self.__mapped_json(entity=entity, to=response, fields=fields)
+
+        # act
+        actual = self.__serializer.serialize(self.__sut.write(_from=entity,
+                                                              to=response,
+                                                              image_fields=["product_image"],
+                                                              fields=fields))
+
+        # assert
+        assert actual == expected
+
+    def test_write_collection(self):
+        # arrange
+        entities = AutoFixture().create_many(dto=Listing, ammount=3, list_limit=3)
+        expected = [json.loads(self.__mapped_json(entity=entity, to=ListingResponseDto, fields=None))
+                    for entity in entities]
+
+        # act
+        actual = self.__sut.write_collection(_from=entities, to=ListingResponseDto, image_fields=["product_image"])
+
+        # assert
+        with self.subTest(msg="collection is written item by item"):
+            assert json.loads(actual.text()) == expected
+        with self.subTest(msg="collection is chunked item by item for compression"):
+            assert len(actual.chunks) == len(entities) + 2
+            assert (actual.chunks[0], actual.chunks[-1]) == ("[", "]")
+
+    def test_write_collection_empty(self):
+        # act
+        actual = self.__sut.write_collection(_from=[], to=ListingResponseDto)
+
+        # assert
+        assert actual.text() == "[]"
+
+    def test_write_ignoring_none(self):
+        # arrange
+        entity = AutoFixture().create(dto=Listing, list_limit=3)
+        entity.product_image = None
+        entity.title = None
+
+        # act
+        actual = json.loads(self.__sut.write(_from=entity,
+                                             to=ListingResponseDto,
+                                             image_fields=["product_image"],
+                                             ignore_none=True).text())
+
+        # assert
+        with self.subTest(msg="null fields are stripped"):
+            assert "title" not in actual and "productImage" not in actual
+        with self.subTest(msg="image variants are not written for a missing image"):
+            assert "productImageVariants" not in actual
+        with self.subTest(msg="enums are formatted"):
+            assert actual["values"] == [value.value.value for value in entity.values]
+
+    def test_written_body_nested_in_another_response(self):
+        # arrange
+        written = SerializedJson(chunks=("[", '{"brandName": "Pinfluencer"}', "]"))
+
+        # act
+        actual = self.__serializer.serialize({"responses": [{"status_code": 200, "body": written}]})
+
+        # assert
+        assert json.loads(actual) == {"responses": [{"statusCode": 200, "body": [{"brandName": "Pinfluencer"}]}]}